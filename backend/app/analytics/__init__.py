@@ -0,0 +1,9 @@
+"""In-process analytics engines that answer /ask templates without Postgres."""
+
+from .approximate import SketchStore
+from .columnar import ColumnarMirror
+
+__all__ = [
+    "ColumnarMirror",
+    "SketchStore",
+]
@@ -0,0 +1,344 @@
+"""
+Approximate answers to /ask templates from streaming sketches.
+
+SketchStore reads new orders by order_id watermark, the same way as the
+columnar mirror, but folds each batch into fixed-size sketches and keeps
+no per-order rows. Memory and query time depend on the sketch parameters,
+not on the number of orders. Every answer comes with error bounds:
+
+- repeat_purchase_rate: share of repeat buyers in a uniform sample of
+  customers (exact order counts per sampled customer), with a 95% Wilson
+  interval. Distinct buyers come from a HyperLogLog. Both are exact while
+  the sample still holds every customer.
+- top_customers_ltv: a SpaceSaving summary over order totals. Each value
+  lies between the summary's lower bound and the smaller of its count and
+  a count-min estimate; the bounds are guaranteed, not probabilistic.
+- top_products_last_90_days: one SpaceSaving summary per order day, merged
+  at query time. The day containing the window start is partial, so the
+  lower bound leaves it out and the upper bound includes all of it.
+
+Like the mirror, rows committed late below the watermark are missed until
+the store is rebuilt.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+
+from ..db import DatabaseManager
+from ..queries import QueryType
+from .numeric import from_cents, pg_numeric_div, to_cents
+from .sketches import CountMinSketch, HyperLogLog, KeySample, SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+# Normal quantile for the sampled and HyperLogLog intervals
+_Z = 1.96
+_CONFIDENCE = 0.95
+
+# Whole days of product buckets kept: the 90-day window plus its partial first day
+_PRODUCT_DAYS = 91
+
+
+class SketchStore:
+    """Incrementally maintained sketches answering a subset of /ask templates."""
+
+    SUPPORTED = frozenset({
+        QueryType.REPEAT_PURCHASE_RATE,
+        QueryType.TOP_CUSTOMERS_LTV,
+        QueryType.TOP_PRODUCTS_LAST_90_DAYS,
+    })
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        batch_size: int = 50_000,
+        hll_precision: int = 14,
+        sample_size: int = 16_384,
+        customer_capacity: int = 4096,
+        product_capacity: int = 1024,
+        cm_width: int = 1 << 16,
+        cm_depth: int = 4,
+    ):
+        self._db = db
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._clock_offset = timedelta(0)
+        self.watermark = 0
+        self.orders_seen = 0
+        self.refreshed_at: float | None = None
+
+        self.customers = HyperLogLog(hll_precision)
+        self.customer_sample = KeySample(sample_size)
+        self.customer_ltv = SpaceSaving(customer_capacity)
+        self.customer_ltv_cm = CountMinSketch(cm_width, cm_depth)
+        self._product_capacity = product_capacity
+        # Day number (days since the epoch) -> product revenue summary
+        self.product_days: dict[int, SpaceSaving] = {}
+
+        self.customer_names: dict[int, str | None] = {}
+        self.product_names: dict[int, str] = {}
+
+    def supports(self, query: QueryType) -> bool:
+        """Whether run() can answer the template."""
+        return query in self.SUPPORTED
+
+    @property
+    def ready(self) -> bool:
+        """True once the store has completed at least one refresh."""
+        return self.refreshed_at is not None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def refresh(self) -> int:
+        """
+        Fold orders newer than the watermark into the sketches.
+
+        Returns:
+            Number of new orders added
+        """
+        start = time.perf_counter()
+        db_now = self._db.execute_query("SELECT LOCALTIMESTAMP AS now")[0]["now"]
+        self._clock_offset = db_now - datetime.now()
+        first_day = _day_number(db_now - timedelta(days=_PRODUCT_DAYS - 1))
+
+        new_orders = 0
+        while True:
+            orders = self._db.execute_query(
+                "SELECT order_id, customer_id, order_date, total_amount FROM orders "
+                "WHERE order_id > :after ORDER BY order_id LIMIT :batch",
+                {"after": self.watermark, "batch": self._batch_size},
+            )
+            if not orders:
+                break
+            high = orders[-1]["order_id"]
+            items = self._db.execute_query(
+                "SELECT order_id, product_id, quantity, unit_price FROM order_items "
+                "WHERE order_id > :after AND order_id <= :high",
+                {"after": self.watermark, "high": high},
+            )
+            self._add_batch(orders, items, first_day, high)
+            new_orders += len(orders)
+
+        products = self._db.execute_query("SELECT product_id, name FROM products")
+        with self._lock:
+            tracked = self.customer_ltv.keys.tolist()
+        customers = self._db.execute_query(
+            "SELECT customer_id, first_name, last_name FROM customers WHERE customer_id = ANY(:ids)",
+            {"ids": tracked},
+        ) if tracked else []
+
+        with self._lock:
+            for day in [d for d in self.product_days if d < first_day]:
+                del self.product_days[day]
+            self.product_names = {r["product_id"]: r["name"] for r in products}
+            self.customer_names = {
+                r["customer_id"]: f"{r['first_name']} {r['last_name']}"
+                if r["first_name"] is not None and r["last_name"] is not None else None
+                for r in customers
+            }
+            self.refreshed_at = time.time()
+
+        logger.info(
+            "Sketch store refreshed: %d new orders, %d total, watermark %d (%.1f ms)",
+            new_orders, self.orders_seen, self.watermark, (time.perf_counter() - start) * 1000,
+        )
+        return new_orders
+
+    def _add_batch(
+        self,
+        orders: list[dict[str, Any]],
+        items: list[dict[str, Any]],
+        first_day: int,
+        high: int,
+    ) -> None:
+        order_ids = np.array([r["order_id"] for r in orders], dtype=np.int64)
+        customer_ids = np.array([r["customer_id"] for r in orders], dtype=np.int64)
+        order_days = np.array([r["order_date"] for r in orders], dtype="datetime64[D]").astype(np.int64)
+        total_cents = to_cents(r["total_amount"] for r in orders)
+
+        item_order_ids = np.array([r["order_id"] for r in items], dtype=np.int64)
+        item_product_ids = np.array([r["product_id"] for r in items], dtype=np.int64)
+        quantities = np.array([r["quantity"] for r in items], dtype=np.int64)
+        item_cents = quantities * to_cents(r["unit_price"] for r in items)
+        item_days = order_days[np.searchsorted(order_ids, item_order_ids)] if len(items) else order_days[:0]
+
+        with self._lock:
+            self.customers.add(customer_ids)
+            self.customer_sample.add(customer_ids)
+            self.customer_ltv.add(customer_ids, total_cents)
+            self.customer_ltv_cm.add(customer_ids, total_cents)
+            recent = item_days >= first_day
+            for day in np.unique(item_days[recent]).tolist():
+                on_day = recent & (item_days == day)
+                summary = self.product_days.setdefault(day, SpaceSaving(self._product_capacity))
+                summary.add(item_product_ids[on_day], item_cents[on_day])
+            self.orders_seen += len(orders)
+            self.watermark = high
+
+    def start(self, interval: float) -> None:
+        """Refresh on a background thread every interval seconds."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval,), name="sketch-store", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning("Sketch store refresh failed: %s", e)
+            self._stop.wait(interval)
+
+    # ------------------------------------------------------------------
+    # Query evaluation
+    # ------------------------------------------------------------------
+    def now(self) -> datetime:
+        """Current time on the database clock."""
+        return datetime.now() + self._clock_offset
+
+    def nbytes(self) -> int:
+        """Memory held by the sketches, excluding the name caches."""
+        with self._lock:
+            summaries = [self.customer_ltv, *self.product_days.values()]
+            sample = self.customer_sample
+            return (
+                self.customers.registers.nbytes
+                + self.customer_ltv_cm.table.nbytes
+                + sum(s.keys.nbytes + s.counts.nbytes + s.errors.nbytes for s in summaries)
+                + sum(a.nbytes for a in (sample.keys, sample.hashes, sample.counts))
+            )
+
+    def run(
+        self, query: QueryType, params: dict[str, Any], now: datetime | None = None
+    ) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        """
+        Answer a template approximately.
+
+        Args:
+            query: Template to answer
+            params: Validated parameters from build_query
+            now: Reference time for relative windows (defaults to the DB clock)
+
+        Returns:
+            (rows, approximation): rows have the template's columns; approximation
+            describes the method, per-row bounds and how much data was covered
+        """
+        now = now or self.now()
+        with self._lock:
+            if query == QueryType.REPEAT_PURCHASE_RATE:
+                rows, details = self._repeat_purchase_rate()
+            elif query == QueryType.TOP_CUSTOMERS_LTV:
+                rows, details = self._top_customers_ltv(params["limit"])
+            elif query == QueryType.TOP_PRODUCTS_LAST_90_DAYS:
+                rows, details = self._top_products(now - timedelta(days=90), params["limit"])
+            else:
+                raise ValueError(f"Unsupported query type for approximate engine: {query}")
+            details.update({"orders": self.orders_seen, "watermark": self.watermark})
+        return rows, details
+
+    def _distinct_customers(self) -> tuple[int, int, int]:
+        if self.customer_sample.complete:
+            exact = len(self.customer_sample.keys)
+            return exact, exact, exact
+        estimate = self.customers.estimate()
+        margin = _Z * self.customers.relative_error * estimate
+        return round(estimate), round(estimate - margin), round(estimate + margin)
+
+    def _repeat_purchase_rate(self) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        sample = self.customer_sample
+        distinct, distinct_low, distinct_high = self._distinct_customers()
+        repeat = sample.counts > 1
+        _, low, high = sample.proportion(repeat, distinct, _Z)
+        rate = (
+            pg_numeric_div(Decimal(int(np.count_nonzero(repeat))) * Decimal("1.0"), Decimal(len(sample.counts)))
+            if len(sample.counts) else None
+        )
+        return [{"repeat_purchase_rate": rate}], {
+            "method": "exact" if sample.complete else "customer sample + hyperloglog",
+            "confidence": 1.0 if sample.complete else _CONFIDENCE,
+            "bounds": [{"repeat_purchase_rate": [round(low, 4), round(high, 4)]}],
+            "sampled_customers": len(sample.counts),
+            "distinct_customers": {"estimate": distinct, "bounds": [distinct_low, distinct_high]},
+        }
+
+    def _top_customers_ltv(self, limit: int) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        summary = self.customer_ltv
+        keys = summary.keys
+        upper = np.minimum(summary.counts, self.customer_ltv_cm.estimate(keys)) if len(keys) else summary.counts
+        lower = summary.counts - summary.errors
+        estimate = (upper + lower) // 2
+        top = np.lexsort((keys, -estimate))[:limit]
+        rows = [
+            {
+                "customer_id": int(keys[i]),
+                "customer_name": self.customer_names.get(int(keys[i])),
+                "lifetime_value": from_cents(estimate[i]),
+            }
+            for i in top
+        ]
+        return rows, {
+            "method": "space-saving + count-min",
+            "confidence": 1.0,
+            "bounds": [{"lifetime_value": [from_cents(lower[i]), from_cents(upper[i])]} for i in top],
+            # No customer missing from the summary has a larger lifetime value
+            "unlisted_max": from_cents(summary.floor()),
+        }
+
+    def _top_products(self, since: datetime, limit: int) -> tuple[list[dict[str, Any]], dict[str, Any]]:
+        first_day = _day_number(since)
+        full_days = [s for day, s in self.product_days.items() if day > first_day]
+        partial_day = self.product_days.get(first_day)
+        inner = SpaceSaving.merge(full_days, self._product_capacity)
+        outer = SpaceSaving.merge(full_days + [partial_day], self._product_capacity) if partial_day else inner
+
+        keys = outer.keys
+        upper = outer.counts
+        lower = np.zeros(len(keys), dtype=np.int64)
+        if len(inner):
+            order = np.argsort(inner.keys)
+            sorted_keys = inner.keys[order]
+            positions = np.searchsorted(sorted_keys, keys).clip(max=len(sorted_keys) - 1)
+            found = sorted_keys[positions] == keys
+            matched = order[positions[found]]
+            lower[found] = inner.counts[matched] - inner.errors[matched]
+        estimate = (upper + lower) // 2
+        top = np.lexsort((keys, -estimate))[:limit]
+        rows = [
+            {
+                "product_id": int(keys[i]),
+                "product_name": self.product_names.get(int(keys[i])),
+                "revenue": from_cents(estimate[i]),
+            }
+            for i in top
+        ]
+        return rows, {
+            "method": "daily space-saving",
+            "confidence": 1.0,
+            "bounds": [{"revenue": [from_cents(lower[i]), from_cents(upper[i])]} for i in top],
+            "unlisted_max": from_cents(outer.floor()),
+            "window_start": since,
+        }
+
+
+def _day_number(moment: datetime) -> int:
+    return int(np.datetime64(moment, "D").astype(np.int64))
@@ -0,0 +1,380 @@
+"""
+In-memory columnar mirror of the sales tables.
+
+Keeps NumPy column arrays for orders, order_items, products and customers
+and evaluates the /ask templates with vectorized group-bys instead of
+round-tripping to Postgres.
+
+Refresh model:
+    - products and customers are small and mutable (names, is_premium), so
+      they are reloaded in full on every refresh.
+    - orders and order_items are append-only facts and are loaded
+      incrementally by order_id watermark, in keyset-paginated batches.
+      Incremental refreshes never reconcile rows below the watermark: an
+      order committed late with a lower order_id (a long transaction
+      overtaken by a shorter one), or an order/item updated or deleted
+      after it was loaded, is only reflected after a full rebuild.
+      start() therefore also rebuilds every rebuild_interval seconds.
+
+Money is held as int64 cents so sums are exact; averages and ratios are
+computed with PostgreSQL's NUMERIC division rules so results are identical
+to the SQL templates. Relative time windows use the database clock (the
+offset to LOCALTIMESTAMP is sampled on every refresh).
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+
+from ..db import DatabaseManager
+from ..queries import RANGE_QUERIES, QueryType
+from .cube import RevenueCube
+from .numeric import from_cents, pg_numeric_div, sum_cents, to_cents
+
+logger = logging.getLogger(__name__)
+
+# is_premium is nullable; encode it as a small integer group key
+_SEGMENT_CODES = {False: 0, True: 1, None: 2}
+_SEGMENT_VALUES = [False, True, None]
+
+
+class ColumnarMirror:
+    """Columnar copy of the sales tables answering the /ask templates."""
+
+    SUPPORTED = frozenset({
+        QueryType.TOP_PRODUCTS_LAST_90_DAYS,
+        QueryType.MONTHLY_REVENUE_LAST_12M,
+        QueryType.REPEAT_PURCHASE_RATE,
+        QueryType.AOV_BY_SEGMENT,
+        QueryType.TOP_CUSTOMERS_LTV,
+    })
+
+    def __init__(self, db: DatabaseManager, batch_size: int = 50_000, revenue_cube: bool = True):
+        self._db = db
+        self.cube = RevenueCube() if revenue_cube else None
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._clock_offset = timedelta(0)
+        self.watermark = 0
+        self.refreshed_at: float | None = None
+
+        # Dimensions
+        self.product_ids = np.empty(0, dtype=np.int64)
+        self.product_names: list[str] = []
+        self.product_categories: list[str | None] = []
+        self.customer_ids = np.empty(0, dtype=np.int64)
+        self.customer_names: list[str | None] = []
+        self.customer_countries: list[str | None] = []
+        self.customer_segment = np.empty(0, dtype=np.int8)
+
+        # Facts (sorted by order_id / load order)
+        self.order_ids = np.empty(0, dtype=np.int64)
+        self.order_customer_ids = np.empty(0, dtype=np.int64)
+        self.order_dates = np.empty(0, dtype="datetime64[us]")
+        self.order_total_cents = np.empty(0, dtype=np.int64)
+        self.item_order_ids = np.empty(0, dtype=np.int64)
+        self.item_product_ids = np.empty(0, dtype=np.int64)
+        self.item_revenue_cents = np.empty(0, dtype=np.int64)
+
+        # Derived join indexes, rebuilt after each refresh
+        self.order_customer_idx = np.empty(0, dtype=np.int64)
+        self.item_order_idx = np.empty(0, dtype=np.int64)
+        self.item_product_idx = np.empty(0, dtype=np.int64)
+        self.item_dates = np.empty(0, dtype="datetime64[us]")
+
+    def supports(self, query: QueryType) -> bool:
+        """Whether run() can evaluate the template."""
+        return query in self.SUPPORTED or (self.cube is not None and query in RANGE_QUERIES)
+
+    @property
+    def ready(self) -> bool:
+        """True once the mirror has completed at least one refresh."""
+        return self.refreshed_at is not None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def refresh(self, full: bool = False) -> int:
+        """
+        Reload dimensions and append orders newer than the watermark.
+
+        Args:
+            full: Reload every order from scratch, picking up late commits
+                and changes below the watermark
+
+        Returns:
+            Number of new orders loaded
+        """
+        start = time.perf_counter()
+        db_now = self._db.execute_query("SELECT LOCALTIMESTAMP AS now")[0]["now"]
+        clock_offset = db_now - datetime.now()
+
+        products = self._db.execute_query(
+            "SELECT product_id, name, category FROM products ORDER BY product_id"
+        )
+        customers = self._db.execute_query(
+            "SELECT customer_id, first_name, last_name, country, is_premium "
+            "FROM customers ORDER BY customer_id"
+        )
+        facts, watermark = self._load_facts(0 if full else self.watermark)
+
+        with self._lock:
+            self.product_ids = np.array([r["product_id"] for r in products], dtype=np.int64)
+            self.product_names = [r["name"] for r in products]
+            self.product_categories = [r["category"] for r in products]
+            self.customer_ids = np.array([r["customer_id"] for r in customers], dtype=np.int64)
+            self.customer_names = [
+                f"{r['first_name']} {r['last_name']}"
+                if r["first_name"] is not None and r["last_name"] is not None else None
+                for r in customers
+            ]
+            self.customer_countries = [r["country"] for r in customers]
+            self.customer_segment = np.array(
+                [_SEGMENT_CODES[r["is_premium"]] for r in customers], dtype=np.int8
+            )
+            for name, chunks in facts.items():
+                base = getattr(self, name)[:0] if full else getattr(self, name)
+                setattr(self, name, np.concatenate([base, *chunks]))
+            self.watermark = watermark
+            self._clock_offset = clock_offset
+            self._rebuild_indexes()
+            if self.cube is not None:
+                if full:
+                    self.cube = RevenueCube()
+                self.cube.update(self)
+            self.refreshed_at = time.time()
+
+        new_orders = sum(len(chunk) for chunk in facts["order_ids"])
+        logger.info(
+            "Columnar mirror %s: %d new orders, %d total, watermark %d (%.1f ms)",
+            "rebuilt" if full else "refreshed", new_orders, len(self.order_ids), self.watermark,
+            (time.perf_counter() - start) * 1000,
+        )
+        return new_orders
+
+    def _load_facts(self, watermark: int) -> tuple[dict[str, list[np.ndarray]], int]:
+        """Load orders and their items above watermark in keyset-paginated batches."""
+        facts: dict[str, list[np.ndarray]] = {
+            "order_ids": [],
+            "order_customer_ids": [],
+            "order_dates": [],
+            "order_total_cents": [],
+            "item_order_ids": [],
+            "item_product_ids": [],
+            "item_revenue_cents": [],
+        }
+        while True:
+            orders = self._db.execute_query(
+                "SELECT order_id, customer_id, order_date, total_amount FROM orders "
+                "WHERE order_id > :after ORDER BY order_id LIMIT :batch",
+                {"after": watermark, "batch": self._batch_size},
+            )
+            if not orders:
+                return facts, watermark
+
+            high = orders[-1]["order_id"]
+            items = self._db.execute_query(
+                "SELECT order_id, product_id, quantity, unit_price FROM order_items "
+                "WHERE order_id > :after AND order_id <= :high ORDER BY order_item_id",
+                {"after": watermark, "high": high},
+            )
+
+            quantities = np.array([r["quantity"] for r in items], dtype=np.int64)
+            facts["order_ids"].append(np.array([r["order_id"] for r in orders], dtype=np.int64))
+            facts["order_customer_ids"].append(np.array([r["customer_id"] for r in orders], dtype=np.int64))
+            facts["order_dates"].append(np.array([r["order_date"] for r in orders], dtype="datetime64[us]"))
+            facts["order_total_cents"].append(to_cents(r["total_amount"] for r in orders))
+            facts["item_order_ids"].append(np.array([r["order_id"] for r in items], dtype=np.int64))
+            facts["item_product_ids"].append(np.array([r["product_id"] for r in items], dtype=np.int64))
+            facts["item_revenue_cents"].append(quantities * to_cents(r["unit_price"] for r in items))
+            watermark = high
+
+    def _rebuild_indexes(self) -> None:
+        self.order_customer_idx = np.searchsorted(self.customer_ids, self.order_customer_ids)
+        self.item_order_idx = np.searchsorted(self.order_ids, self.item_order_ids)
+        self.item_product_idx = np.searchsorted(self.product_ids, self.item_product_ids)
+        self.item_dates = self.order_dates[self.item_order_idx]
+
+    def start(self, interval: float, rebuild_interval: float | None = None) -> None:
+        """
+        Refresh on a background thread every interval seconds.
+
+        Args:
+            interval: Seconds between incremental refreshes
+            rebuild_interval: Seconds between full rebuilds (None = never)
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(interval, rebuild_interval), name="columnar-mirror", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self, interval: float, rebuild_interval: float | None) -> None:
+        rebuilt_at = time.monotonic()
+        while not self._stop.is_set():
+            full = rebuild_interval is not None and time.monotonic() - rebuilt_at >= rebuild_interval
+            try:
+                self.refresh(full=full)
+                if full:
+                    rebuilt_at = time.monotonic()
+            except Exception as e:
+                logger.warning("Columnar mirror refresh failed: %s", e)
+            self._stop.wait(interval)
+
+    # ------------------------------------------------------------------
+    # Query evaluation
+    # ------------------------------------------------------------------
+    def now(self) -> datetime:
+        """Current time on the database clock."""
+        return datetime.now() + self._clock_offset
+
+    def run(self, query: QueryType, params: dict[str, Any], now: datetime | None = None) -> list[dict[str, Any]]:
+        """
+        Evaluate a template against the mirror.
+
+        Args:
+            query: Template to evaluate
+            params: Validated parameters from build_query
+            now: Reference time for relative windows (defaults to the DB clock)
+
+        Returns:
+            Rows with the same columns and values as the SQL template
+        """
+        now = now or self.now()
+        with self._lock:
+            if query == QueryType.TOP_PRODUCTS_LAST_90_DAYS:
+                return self._top_products(now - timedelta(days=90), params["limit"])
+            if query == QueryType.MONTHLY_REVENUE_LAST_12M:
+                return self._monthly_revenue(datetime(now.year - 1, now.month, 1))
+            if query == QueryType.REPEAT_PURCHASE_RATE:
+                return self._repeat_purchase_rate()
+            if query == QueryType.AOV_BY_SEGMENT:
+                return self._aov_by_segment()
+            if query == QueryType.TOP_CUSTOMERS_LTV:
+                return self._top_customers_ltv(params["limit"])
+            if self.cube is not None and query in RANGE_QUERIES:
+                return self._range_ranking(query, params)
+        raise ValueError(f"Unsupported query type for columnar engine: {query}")
+
+    def _top_products(self, since: datetime, limit: int) -> list[dict[str, Any]]:
+        mask = self.item_dates >= np.datetime64(since, "us")
+        product_idx = self.item_product_idx[mask]
+        n = len(self.product_ids)
+        revenue = sum_cents(product_idx, self.item_revenue_cents[mask], n)
+        sold = np.flatnonzero(np.bincount(product_idx, minlength=n))
+
+        top = sold[_top_k(revenue[sold], self.product_ids[sold], limit)]
+        return [
+            {
+                "product_id": int(self.product_ids[i]),
+                "product_name": self.product_names[i],
+                "revenue": from_cents(revenue[i]),
+            }
+            for i in top
+        ]
+
+    def _monthly_revenue(self, since: datetime) -> list[dict[str, Any]]:
+        mask = self.order_dates >= np.datetime64(since, "us")
+        months, inverse = np.unique(self.order_dates[mask].astype("datetime64[M]"), return_inverse=True)
+        revenue = sum_cents(inverse, self.order_total_cents[mask], len(months))
+        return [
+            {
+                "month": month.astype("datetime64[us]").item(),
+                "revenue": from_cents(cents),
+            }
+            for month, cents in zip(months, revenue)
+        ]
+
+    def _repeat_purchase_rate(self) -> list[dict[str, Any]]:
+        counts = np.bincount(self.order_customer_idx, minlength=len(self.customer_ids))
+        buyers = int(np.count_nonzero(counts))
+        repeat = int(np.count_nonzero(counts > 1))
+        rate = pg_numeric_div(Decimal(repeat) * Decimal("1.0"), Decimal(buyers))
+        return [{"repeat_purchase_rate": rate}]
+
+    def _aov_by_segment(self) -> list[dict[str, Any]]:
+        segments = self.customer_segment[self.order_customer_idx]
+        totals = sum_cents(segments, self.order_total_cents, len(_SEGMENT_VALUES))
+        counts = np.bincount(segments, minlength=len(_SEGMENT_VALUES))
+        return [
+            {
+                "is_premium": _SEGMENT_VALUES[code],
+                "avg_order_value": pg_numeric_div(from_cents(totals[code]), Decimal(int(counts[code]))),
+            }
+            for code in np.flatnonzero(counts)
+        ]
+
+    def _top_customers_ltv(self, limit: int) -> list[dict[str, Any]]:
+        n = len(self.customer_ids)
+        ltv = sum_cents(self.order_customer_idx, self.order_total_cents, n)
+        buyers = np.flatnonzero(np.bincount(self.order_customer_idx, minlength=n))
+
+        top = buyers[_top_k(ltv[buyers], self.customer_ids[buyers], limit)]
+        return [
+            {
+                "customer_id": int(self.customer_ids[i]),
+                "customer_name": self.customer_names[i],
+                "lifetime_value": from_cents(ltv[i]),
+            }
+            for i in top
+        ]
+
+    def _range_ranking(self, query: QueryType, params: dict[str, Any]) -> list[dict[str, Any]]:
+        start, end, limit = params["start"], params["end"], params["limit"]
+        if query == QueryType.TOP_PRODUCTS_BY_RANGE:
+            revenue = self.cube.product_window(start, end)
+            sold = np.flatnonzero(self.cube.product_items_window(start, end))
+            top = sold[_top_k(revenue[sold], self.product_ids[sold], limit)]
+            return [
+                {
+                    "product_id": int(self.product_ids[i]),
+                    "product_name": self.product_names[i],
+                    "revenue": from_cents(revenue[i]),
+                }
+                for i in top
+            ]
+
+        if query == QueryType.TOP_CATEGORIES_BY_RANGE:
+            categories = sorted(set(self.product_categories), key=lambda c: (c is None, c or ""))
+            codes = {category: i for i, category in enumerate(categories)}
+            product_codes = np.fromiter(
+                (codes[c] for c in self.product_categories), dtype=np.int64, count=len(self.product_categories)
+            )
+            product_revenue = self.cube.product_window(start, end)
+            revenue = sum_cents(product_codes, product_revenue, len(categories))
+            items = sum_cents(product_codes, self.cube.product_items_window(start, end), len(categories))
+            column, labels = "category", categories
+        else:
+            revenue = self.cube.country_window(start, end)
+            items = self.cube.country_items_window(start, end)
+            column, labels = "country", self.cube.countries
+
+        # Groups with rows in the window, as GROUP BY returns them, even at zero revenue
+        sold = np.flatnonzero(items)
+        top = sold[_top_k(revenue[sold], sold, limit)]
+        return [{column: labels[i], "revenue": from_cents(revenue[i])} for i in top]
+
+
+def _top_k(values: np.ndarray, tiebreak: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest values, descending, ties broken by tiebreak."""
+    if len(values) > k:
+        candidates = np.argpartition(-values, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.lexsort((tiebreak[candidates], -values[candidates]))]
@@ -0,0 +1,83 @@
+"""Exact money arithmetic matching PostgreSQL NUMERIC results."""
+
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+from typing import Iterable
+
+import numpy as np
+
+# PostgreSQL numeric.c constants
+_NBASE_DIGITS = 4           # DEC_DIGITS: decimal digits per base-10000 digit
+_MIN_SIG_DIGITS = 16        # NUMERIC_MIN_SIG_DIGITS
+_MAX_DISPLAY_SCALE = 1000   # NUMERIC_MAX_DISPLAY_SCALE
+
+
+def to_cents(values: Iterable[Decimal | float | int | None]) -> np.ndarray:
+    """Convert NUMERIC(_, 2) values to an int64 array of cents (NULL -> 0)."""
+    return np.fromiter(
+        (int(Decimal(v).scaleb(2)) if v is not None else 0 for v in values),
+        dtype=np.int64,
+    )
+
+
+def sum_cents(groups: np.ndarray, cents: np.ndarray, size: int) -> np.ndarray:
+    """
+    Sum int64 cents per group index, exactly.
+
+    np.bincount(weights=...) accumulates in float64, which drops cents once
+    a group's total passes 2**53; np.add.at keeps int64 arithmetic.
+    """
+    totals = np.zeros(size, dtype=np.int64)
+    np.add.at(totals, groups, cents)
+    return totals
+
+
+def from_cents(cents: int | float) -> Decimal:
+    """Convert a cent amount back to a Decimal with scale 2, as SUM() returns it."""
+    return Decimal(int(round(cents))).scaleb(-2)
+
+
+def _dscale(value: Decimal) -> int:
+    return max(0, -value.as_tuple().exponent)
+
+
+def _weight_and_first_digit(value: Decimal) -> tuple[int, int]:
+    """Return (weight, first digit) of value in PostgreSQL's base-10000 form."""
+    if value == 0:
+        return 0, 0
+    value = abs(value)
+    weight = value.adjusted() // _NBASE_DIGITS
+    return weight, int(value.scaleb(-_NBASE_DIGITS * weight))
+
+
+def pg_numeric_div(dividend: Decimal, divisor: Decimal) -> Decimal:
+    """
+    Divide two NUMERIC values exactly as PostgreSQL's numeric_div does.
+
+    PostgreSQL picks the result scale from the operands (select_div_scale)
+    so the quotient has at least 16 significant digits, then rounds half
+    away from zero. AVG(numeric) is computed the same way, as sum / count.
+
+    Args:
+        dividend: Numerator
+        divisor: Denominator
+
+    Returns:
+        Quotient with PostgreSQL's result scale
+
+    Raises:
+        decimal.DivisionByZero: If divisor is zero
+    """
+    weight1, first1 = _weight_and_first_digit(dividend)
+    weight2, first2 = _weight_and_first_digit(divisor)
+
+    qweight = weight1 - weight2
+    if first1 <= first2:
+        qweight -= 1
+
+    rscale = _MIN_SIG_DIGITS - qweight * _NBASE_DIGITS
+    rscale = max(rscale, _dscale(dividend), _dscale(divisor), 0)
+    rscale = min(rscale, _MAX_DISPLAY_SCALE)
+
+    with localcontext() as ctx:
+        ctx.prec = rscale + max(weight1 - weight2, 0) * _NBASE_DIGITS + 2 * _MIN_SIG_DIGITS
+        return (dividend / divisor).quantize(Decimal(1).scaleb(-rscale), rounding=ROUND_HALF_UP)
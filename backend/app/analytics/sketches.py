@@ -0,0 +1,247 @@
+"""
+Streaming sketches for approximate analytics.
+
+Every sketch takes NumPy arrays of int64 keys, is updated in vectorised
+batches and uses memory fixed by its parameters, however long the stream:
+
+- HyperLogLog: distinct count with relative standard error 1.04 / sqrt(2^p).
+- CountMinSketch: weighted point estimates that never underestimate and
+  overestimate by at most e / width * total weight, with probability
+  1 - exp(-depth).
+- SpaceSaving: the keys with the largest total weights. Each tracked count
+  overestimates the true total by at most its recorded error, and no
+  untracked key exceeds floor(). Summaries are mergeable, so per-period
+  summaries can be combined at query time.
+- KeySample: exact per-key counts for a uniform sample of distinct keys
+  (the keys with the smallest hashes), for proportions over distinct keys.
+"""
+
+import math
+
+import numpy as np
+
+_MASK64 = (1 << 64) - 1
+
+
+def mix64(keys: np.ndarray, seed: int = 0) -> np.ndarray:
+    """Hash int64 keys to well-mixed uint64 values (SplitMix64 finaliser)."""
+    z = np.asarray(keys, dtype=np.int64).astype(np.uint64)
+    z = z + np.uint64((0x9E3779B97F4A7C15 * (seed + 1)) & _MASK64)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return z ^ (z >> np.uint64(31))
+
+
+def _sum_by_key(keys: np.ndarray, weights: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Return the unique keys and the total weight of each."""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.rint(np.bincount(inverse, weights=weights, minlength=len(unique))).astype(np.int64)
+
+
+class HyperLogLog:
+    """Distinct-count sketch with 2^p one-byte registers."""
+
+    _SEED = 101
+
+    def __init__(self, p: int = 14):
+        if not 4 <= p <= 18:
+            raise ValueError("p must be between 4 and 18")
+        self.p = p
+        self.m = 1 << p
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of estimate()."""
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, keys: np.ndarray) -> None:
+        if not len(keys):
+            return
+        hashes = mix64(keys, self._SEED)
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Rank of the first 1 bit in the remaining 64 - p bits; rest < 2^53 so the float is exact
+        bit_length = np.frexp(rest.astype(np.float64))[1]
+        rank = (64 - self.p + 1 - bit_length).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> float:
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        raw = alpha * self.m * self.m / float(np.sum(np.exp2(-self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * self.m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            return self.m * math.log(self.m / zeros)
+        return raw
+
+    def merge(self, other: "HyperLogLog") -> None:
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+
+class CountMinSketch:
+    """Weighted frequency sketch: depth rows of width int64 counters."""
+
+    def __init__(self, width: int = 1 << 16, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def epsilon(self) -> float:
+        """Overestimates stay within epsilon * total weight with probability 1 - delta."""
+        return math.e / self.width
+
+    @property
+    def delta(self) -> float:
+        return math.exp(-self.depth)
+
+    def _columns(self, keys: np.ndarray, row: int) -> np.ndarray:
+        return (mix64(keys, row + 1) % np.uint64(self.width)).astype(np.intp)
+
+    def add(self, keys: np.ndarray, weights: np.ndarray) -> None:
+        if not len(keys):
+            return
+        for row in range(self.depth):
+            counts = np.bincount(self._columns(keys, row), weights=weights, minlength=self.width)
+            self.table[row] += np.rint(counts).astype(np.int64)
+        self.total += int(np.sum(weights))
+
+    def estimate(self, keys: np.ndarray) -> np.ndarray:
+        """Upper bounds on the total weight of each key."""
+        keys = np.asarray(keys, dtype=np.int64)
+        return np.min([self.table[row, self._columns(keys, row)] for row in range(self.depth)], axis=0)
+
+
+class SpaceSaving:
+    """
+    Weighted heavy-hitter summary tracking at most capacity keys.
+
+    Batches are aggregated exactly and merged as error-free summaries: a key
+    missing from one side is charged that side's floor, both as count and
+    as error, then only the capacity largest counts are kept.
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self.capacity = capacity
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.errors = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def floor(self) -> int:
+        """Upper bound on the total weight of any key that is not tracked."""
+        return int(self.counts.min()) if len(self.keys) >= self.capacity else 0
+
+    def add(self, keys: np.ndarray, weights: np.ndarray) -> None:
+        if not len(keys):
+            return
+        batch = SpaceSaving(capacity=len(keys))
+        batch.keys, batch.counts = _sum_by_key(np.asarray(keys, dtype=np.int64), weights)
+        batch.errors = np.zeros(len(batch.keys), dtype=np.int64)
+        merged = SpaceSaving.merge([self, batch], self.capacity)
+        self.keys, self.counts, self.errors = merged.keys, merged.counts, merged.errors
+
+    @staticmethod
+    def merge(summaries: list["SpaceSaving"], capacity: int) -> "SpaceSaving":
+        """Combine summaries of disjoint streams into one of the given capacity."""
+        merged = SpaceSaving(capacity)
+        summaries = [s for s in summaries if len(s)]
+        if not summaries:
+            return merged
+        keys, inverse = np.unique(np.concatenate([s.keys for s in summaries]), return_inverse=True)
+        counts = np.zeros(len(keys), dtype=np.int64)
+        errors = np.zeros(len(keys), dtype=np.int64)
+        offset = 0
+        for summary in summaries:
+            rows = inverse[offset:offset + len(summary)]
+            offset += len(summary)
+            floor = summary.floor()
+            missing = np.ones(len(keys), dtype=bool)
+            missing[rows] = False
+            counts[rows] += summary.counts
+            errors[rows] += summary.errors
+            counts[missing] += floor
+            errors[missing] += floor
+        if len(keys) > capacity:
+            keep = np.argpartition(-counts, capacity - 1)[:capacity]
+            keys, counts, errors = keys[keep], counts[keep], errors[keep]
+        merged.keys, merged.counts, merged.errors = keys, counts, errors
+        return merged
+
+    def top(self, n: int) -> np.ndarray:
+        """Indices of the n largest counts, descending, ties broken by key."""
+        order = np.lexsort((self.keys, -self.counts))
+        return order[:n]
+
+
+class KeySample:
+    """
+    Exact occurrence counts for a uniform sample of at most capacity distinct keys.
+
+    The sample holds the keys with the smallest hashes seen so far. A key
+    enters the sample on its first occurrence or never, so every sampled
+    key's count covers its whole history.
+    """
+
+    _SEED = 202
+
+    def __init__(self, capacity: int = 16384):
+        self.capacity = capacity
+        self.keys = np.empty(0, dtype=np.int64)
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+        # Set once the sample is full; only keys hashing at or below it qualify
+        self.threshold: int | None = None
+
+    @property
+    def complete(self) -> bool:
+        """True while every distinct key seen is in the sample."""
+        return self.threshold is None
+
+    def add(self, keys: np.ndarray) -> None:
+        keys = np.asarray(keys, dtype=np.int64)
+        hashes = mix64(keys, self._SEED)
+        if self.threshold is not None:
+            keep = hashes <= np.uint64(self.threshold)
+            keys, hashes = keys[keep], hashes[keep]
+        if not len(keys):
+            return
+        all_keys, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, np.ones(len(keys))]))
+        all_hashes = np.zeros(len(all_keys), dtype=np.uint64)
+        all_hashes[inverse] = np.concatenate([self.hashes, hashes])
+        if len(all_keys) > self.capacity:
+            keep = np.argpartition(all_hashes, self.capacity - 1)[:self.capacity]
+            all_keys, all_hashes, counts = all_keys[keep], all_hashes[keep], counts[keep]
+            self.threshold = int(all_hashes.max())
+        self.keys, self.hashes, self.counts = all_keys, all_hashes, np.rint(counts).astype(np.int64)
+
+    def proportion(self, mask: np.ndarray, population: float, z: float = 1.96) -> tuple[float, float, float]:
+        """
+        Estimate the share of distinct keys for which mask (over self.counts) holds.
+
+        Args:
+            mask: Boolean array aligned with self.counts
+            population: Number of distinct keys in the stream
+            z: Normal quantile for the interval (1.96 = 95%)
+
+        Returns:
+            (estimate, lower, upper); exact while the sample is complete
+        """
+        n = len(self.counts)
+        if not n:
+            return 0.0, 0.0, 0.0
+        share = float(np.count_nonzero(mask)) / n
+        if self.complete:
+            return share, share, share
+        # Wilson score interval (does not collapse at 0 or 1), narrowed by the
+        # finite population correction since keys are sampled without replacement
+        correction = math.sqrt(max(0.0, (population - n) / max(1.0, population - 1)))
+        scale = 1 + z * z / n
+        centre = (share + z * z / (2 * n)) / scale
+        margin = z / scale * math.sqrt(share * (1 - share) / n + z * z / (4 * n * n)) * correction
+        return share, max(0.0, min(share, centre - margin)), min(1.0, max(share, centre + margin))
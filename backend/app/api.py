@@ -1,16 +1,33 @@
 """API router for RAG-powered chat endpoints."""
 
+import asyncio
 import logging
 import os
+import sys
 import time
-from typing import Any, Dict, List, Optional
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Literal, Optional
 
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, Field, validator
-from openai import OpenAI
+from sqlalchemy.exc import SQLAlchemyError
 
-from .rag.retriever import search
-from .rag.vectorstore import get_vectorstore
+from .llm import PRIORITY_INTERACTIVE, LLMExecutor, LLMOverloadedError, is_retryable
+from .queries import RANGE_QUERIES, QueryType
+from .question_router import QuestionRouter, Route
+from .rag.embeddings import EmbeddingService, close_local_model, preload_local_model
+from .rag.jobs import DutyCycleThrottle, IngestJobManager, LatencyWindow
+from .rag.retriever import search, search_batch
+from .rag.vectorstore import close_vectorstores, get_aliased_vectorstore, get_embedding_function, warm_up
+from .serialization import FastJSONResponse
+from .singleflight import SingleFlight, make_key
+from .warmup import hot_requests
+
+if TYPE_CHECKING:
+	from openai import AsyncOpenAI
 
 
 logger = logging.getLogger(__name__)
@@ -20,33 +37,151 @@ logger = logging.getLogger(__name__)
 # Configuration
 # ----------------------------------------------------------------------------
 PERSIST_DIR = os.getenv("VECTORSTORE_DIR", "./vectordb")
+# Resolved through the alias file, so rebuilds by ingest_docs.py go live without a restart
 COLLECTION_NAME = os.getenv("VECTORSTORE_COLLECTION", "knowledge_base")
+# "chroma" queries the Chroma collection; "mmap" serves the read-only snapshot
+# published under VECTORSTORE_SNAPSHOT_DIR, mapped once and shared by every
+# worker process (see scripts/publish_snapshot.py).
+VECTORSTORE_BACKEND = os.getenv("VECTORSTORE_BACKEND", "chroma")
+SNAPSHOT_DIR = os.getenv("VECTORSTORE_SNAPSHOT_DIR", "./vectordb_snapshots")
 DEFAULT_TOP_K = int(os.getenv("RAG_TOP_K", "5"))
 MAX_TOP_K = int(os.getenv("RAG_MAX_TOP_K", "10"))
+MAX_BATCH_QUERIES = int(os.getenv("RAG_MAX_BATCH_QUERIES", "256"))
 DEFAULT_SCORE_THRESHOLD = float(os.getenv("RAG_SCORE_THRESHOLD", "0.35"))
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-
-
-def _init_collection():
-	"""Initialize vector store collection once."""
-	return get_vectorstore(persist_dir=PERSIST_DIR, collection_name=COLLECTION_NAME)
-
-
-_collection = _init_collection()
-_llm_client: Optional[OpenAI] = None
-
-
-def _get_llm_client() -> OpenAI:
-	"""Lazy-init OpenAI client."""
+# "chroma" lets the collection embed queries itself; "local" uses the shared,
+# micro-batched sentence-transformers model (same model as Chroma's default);
+# "stub" uses offline hashed embeddings (collections must be built with it).
+EMBEDDING_BACKEND = os.getenv("RAG_EMBEDDING_BACKEND", "chroma")
+RETRIEVE_TIMEOUT = float(os.getenv("RAG_RETRIEVE_TIMEOUT_SECONDS", "10"))
+GENERATE_TIMEOUT = float(os.getenv("RAG_GENERATE_TIMEOUT_SECONDS", "60"))
+# Answer analytics questions from query templates instead of RAG + LLM. Off
+# by default: calibrate RAG_ROUTER_THRESHOLD / RAG_ROUTER_MARGIN for the
+# embedding model with scripts/bench_question_router.py before enabling.
+ROUTER_ENABLED = os.getenv("RAG_ROUTER_ENABLED", "0") == "1"
+# Ingestion jobs may only read documents under this directory
+INGEST_DOCS_ROOT = os.getenv("INGEST_DOCS_ROOT", "./docs")
+
+
+def _get_collection():
+	"""Return the shared vector store collection, opening it on first use."""
+	if VECTORSTORE_BACKEND == "mmap":
+		# Imported lazily so NumPy is only loaded when the snapshot backend is used
+		from .rag.mmap_store import get_mmap_collection
+
+		return get_mmap_collection(SNAPSHOT_DIR)
+	return get_aliased_vectorstore(persist_dir=PERSIST_DIR, alias=COLLECTION_NAME)
+
+
+def _embed_queries(questions: List[str]):
+	"""Embed questions with the local or stub backend, or return None to let Chroma embed."""
+	if EMBEDDING_BACKEND not in ("local", "stub"):
+		return None
+	return EmbeddingService(model_type=EMBEDDING_BACKEND).embed_array(questions)
+
+
+def _embed_questions(questions: List[str]):
+	"""Embed questions with the model the collection is searched with."""
+	embeddings = _embed_queries(questions)
+	if embeddings is None:
+		embeddings = get_embedding_function()(questions)
+	return embeddings
+
+
+_question_router = QuestionRouter(_embed_questions)
+# Retrieval (embed + vector query) latencies; background ingestion backs off
+# when their p95 nears the target. End-to-end chat latency would mostly
+# measure the LLM, which ingestion does not slow down.
+_retrieval_latency = LatencyWindow()
+ingest_jobs = IngestJobManager(DutyCycleThrottle(_retrieval_latency))
+# Set by the application: runs a template and returns its rows
+_template_runner: Optional[Callable[[QueryType, Dict[str, Any]], Awaitable[List[Dict[str, Any]]]]] = None
+
+
+def set_template_runner(runner: Callable[[QueryType, Dict[str, Any]], Awaitable[List[Dict[str, Any]]]]) -> None:
+	"""Let /rag/chat answer routed questions through the /ask execution path."""
+	global _template_runner
+	_template_runner = runner
+
+
+def startup() -> None:
+	"""
+	Open the collection, load its index and models, and create the LLM client.
+
+	The router and LLM client are optional here: if either cannot be set up
+	(e.g. the embedding model cannot be downloaded) it is logged and left to
+	the first request that needs it.
+	"""
+	if EMBEDDING_BACKEND == "local":
+		preload_local_model()
+	warm_up(_get_collection())
+	if ROUTER_ENABLED:
+		try:
+			# Embeds the exemplars, which also loads Chroma's embedding model
+			_question_router.route("warm up")
+		except Exception as exc:
+			logger.warning("Question router warm-up failed: %s", exc)
+	if os.getenv("OPENAI_API_KEY"):
+		try:
+			_get_llm_client()
+		except Exception as exc:
+			logger.warning("LLM client setup failed: %s", exc)
+
+
+def shutdown() -> None:
+	"""Stop ingestion jobs and release vector store handles."""
+	ingest_jobs.shutdown()
+	close_vectorstores()
+	if VECTORSTORE_BACKEND == "mmap":
+		from .rag.mmap_store import close_mmap_collections
+
+		close_mmap_collections()
+	if EMBEDDING_BACKEND == "local":
+		close_local_model()
+
+
+def replay_question(question: str, top_k: int = DEFAULT_TOP_K, filters: Optional[Dict[str, Any]] = None) -> None:
+	"""Embed, route and retrieve a question as /rag/chat does, without calling the LLM (warm-up replay)."""
+	embedding = None
+	if ROUTER_ENABLED and not filters:
+		_, embedding = _route_question(question)
+	_retrieve(question, top_k, 0.0, filters or {}, embedding)
+
+
+_llm_client: Optional["AsyncOpenAI"] = None
+
+
+def _get_llm_client() -> "AsyncOpenAI":
+	"""Lazy-init OpenAI client (OPENAI_BASE_URL points it at another endpoint)."""
 	global _llm_client
 	if _llm_client is None:
 		api_key = os.getenv("OPENAI_API_KEY")
 		if not api_key:
 			raise RuntimeError("OPENAI_API_KEY is not configured")
-		_llm_client = OpenAI(api_key=api_key)
+		# openai takes ~0.4 s to import, so it is loaded with the first client
+		from openai import AsyncOpenAI
+
+		# Retries and timeouts are owned by the LLM executor
+		_llm_client = AsyncOpenAI(api_key=api_key, max_retries=0)
 	return _llm_client
 
 
+def _openai_errors(*names: str) -> tuple:
+	"""Return openai exception classes, or () while openai is not imported and nothing can raise them."""
+	openai = sys.modules.get("openai")
+	if openai is None:
+		return ()
+	return tuple(getattr(openai, name) for name in names)
+
+
+def _is_retryable_llm_error(exc: BaseException) -> bool:
+	return isinstance(exc, _openai_errors("APIConnectionError")) or is_retryable(exc)
+
+
+# Bounds concurrent LLM calls and sheds load when the provider slows down
+_llm = LLMExecutor(retryable=_is_retryable_llm_error)
+
+
 # ----------------------------------------------------------------------------
 # Schemas
 # ----------------------------------------------------------------------------
@@ -74,11 +209,65 @@ class ChatRequest(BaseModel):
 		return v
 
 
+class TemplateRoute(BaseModel):
+	query: QueryType = Field(..., description="Template the question was routed to")
+	params: Dict[str, Any] = Field(default_factory=dict, description="Parameters read from the question")
+	confidence: float = Field(..., description="Similarity to the nearest exemplar question")
+	data: List[Dict[str, Any]] = Field(..., description="Rows returned by the template, as from /ask")
+
+
 class ChatResponse(BaseModel):
 	answer: str
 	sources: List[SourceChunk]
 	latency_ms: int
 	context: Optional[str] = None
+	route: Optional[TemplateRoute] = Field(None, description="Set when answered from a query template")
+
+
+class SearchRequest(BaseModel):
+	questions: List[str] = Field(..., min_items=1, max_items=MAX_BATCH_QUERIES)
+	top_k: int = Field(default=DEFAULT_TOP_K, ge=1, le=MAX_TOP_K)
+	score_threshold: float = Field(default=DEFAULT_SCORE_THRESHOLD, ge=0, le=1)
+	filters: Dict[str, Any] = Field(
+		default_factory=dict,
+		description="Optional metadata filters applied to every question",
+	)
+
+	@validator("questions", each_item=True)
+	def ensure_question_length(cls, v: str) -> str:
+		if not 5 <= len(v) <= 500:
+			raise ValueError("each question must be between 5 and 500 characters")
+		return v
+
+	@validator("filters")
+	def ensure_filters_dict(cls, v: Dict[str, Any]) -> Dict[str, Any]:
+		if v is None:
+			return {}
+		if not isinstance(v, dict):
+			raise ValueError("filters must be an object")
+		return v
+
+
+class IngestJobRequest(BaseModel):
+	docs_dir: str = Field(default=".", description="Documents directory, relative to INGEST_DOCS_ROOT")
+	mode: Literal["rebuild", "in_place"] = Field(
+		default="rebuild",
+		description="Build a new collection version and switch to it, or add to the live collection",
+	)
+	chunk_size: int = Field(default=500, ge=100, le=4000)
+	dedup: bool = Field(default=True, description="Drop near-duplicate chunks")
+	shard_by: Optional[str] = Field(None, description="Metadata key to shard a rebuilt version by")
+	tickets: bool = Field(default=False, description="Also stream support tickets from Postgres")
+
+
+class SearchResult(BaseModel):
+	question: str
+	sources: List[SourceChunk]
+
+
+class SearchResponse(BaseModel):
+	results: List[SearchResult]
+	latency_ms: int
 
 
 # ----------------------------------------------------------------------------
@@ -91,7 +280,12 @@ def _build_prompt(question: str, contexts: List[Dict[str, Any]]) -> str:
 	"""Compose a grounded prompt with cited context."""
 	parts = []
 	for item in contexts:
-		source = item.get("metadata", {}).get("source", "unknown")
+		metadata = item.get("metadata", {})
+		source = metadata.get("source", "unknown")
+		# Deduplicated chunks list every document they appear in; cite one
+		duplicates = len(metadata.get("sources") or ()) - 1
+		if duplicates > 0:
+			source = f"{source} (+{duplicates} more)"
 		parts.append(f"[Source: {source}]\n{item['text']}")
 
 	context_block = "\n\n".join(parts)
@@ -105,9 +299,7 @@ def _build_prompt(question: str, contexts: List[Dict[str, Any]]) -> str:
 	)
 
 
-def _retrieve(question: str, top_k: int, score_threshold: float, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-	results = search(_collection, question, n_results=top_k, where=filters or None)
-
+def _apply_threshold(results: List[Dict[str, Any]], score_threshold: float) -> List[Dict[str, Any]]:
 	filtered = []
 	for item in results:
 		distance = item.get("distance", 0.0)
@@ -117,51 +309,228 @@ def _retrieve(question: str, top_k: int, score_threshold: float, filters: Dict[s
 	return filtered
 
 
-def _generate_answer(prompt: str) -> str:
+def _retrieve(
+	question: str, top_k: int, score_threshold: float, filters: Dict[str, Any], query_embedding=None
+) -> List[Dict[str, Any]]:
+	start = time.perf_counter()
+	try:
+		if query_embedding is None:
+			embeddings = _embed_queries([question])
+			query_embedding = embeddings[0] if embeddings is not None else None
+		results = search(
+			_get_collection(),
+			question,
+			n_results=top_k,
+			where=filters or None,
+			query_embedding=query_embedding,
+		)
+	finally:
+		# Feeds the ingestion throttle
+		_retrieval_latency.observe((time.perf_counter() - start) * 1000)
+	return _apply_threshold(results, score_threshold)
+
+
+def _retrieve_batch(
+	questions: List[str], top_k: int, score_threshold: float, filters: Dict[str, Any]
+) -> List[List[Dict[str, Any]]]:
+	start = time.perf_counter()
+	try:
+		batches = search_batch(
+			_get_collection(),
+			questions,
+			n_results=top_k,
+			where=filters or None,
+			query_embeddings=_embed_queries(questions),
+		)
+	finally:
+		_retrieval_latency.observe((time.perf_counter() - start) * 1000)
+	return [_apply_threshold(results, score_threshold) for results in batches]
+
+
+def _to_sources(retrievals: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+	"""Shape retrievals like SourceChunk without building (and revalidating) models."""
+	return [
+		{
+			"source": item.get("metadata", {}).get("source"),
+			"score": item.get("score"),
+			"text": item.get("text", ""),
+		}
+		for item in retrievals
+	]
+
+
+async def _generate_answer(prompt: str) -> str:
 	client = _get_llm_client()
-	response = client.chat.completions.create(
-		model=OPENAI_MODEL,
-		messages=[
-			{"role": "system", "content": "You are a concise, factual sales insights assistant."},
-			{"role": "user", "content": prompt},
-		],
-		temperature=0.2,
-		max_tokens=400,
+
+	async def call(timeout: float) -> str:
+		response = await client.chat.completions.create(
+			model=OPENAI_MODEL,
+			messages=[
+				{"role": "system", "content": "You are a concise, factual sales insights assistant."},
+				{"role": "user", "content": prompt},
+			],
+			temperature=0.2,
+			max_tokens=400,
+			timeout=timeout,
+		)
+		return response.choices[0].message.content.strip()
+
+	return await _llm.run(call, priority=PRIORITY_INTERACTIVE, deadline=time.monotonic() + GENERATE_TIMEOUT)
+
+
+# Concurrent identical retrievals and prompts share one execution
+_inflight = SingleFlight("rag")
+
+
+async def _retrieve_shared(request: ChatRequest, query_embedding=None) -> List[Dict[str, Any]]:
+	key = make_key("retrieve", request.question, request.top_k, request.score_threshold, request.filters)
+	return await _inflight.do(
+		key,
+		lambda: run_in_threadpool(
+			_retrieve, request.question, request.top_k, request.score_threshold, request.filters, query_embedding
+		),
+		timeout=RETRIEVE_TIMEOUT,
+	)
+
+
+def _route_question(question: str):
+	"""Embed a question and route it; the embedding is reused if it falls through to RAG."""
+	embedding = _embed_questions([question])[0]
+	return _question_router.route(question, embedding=embedding), embedding
+
+
+_TEMPLATE_TITLES = {
+	QueryType.TOP_PRODUCTS_LAST_90_DAYS: "Top products by revenue over the last 90 days",
+	QueryType.MONTHLY_REVENUE_LAST_12M: "Monthly revenue over the last 12 months",
+	QueryType.REPEAT_PURCHASE_RATE: "Repeat purchase rate",
+	QueryType.AOV_BY_SEGMENT: "Average order value by customer segment",
+	QueryType.TOP_CUSTOMERS_LTV: "Top customers by lifetime value",
+	QueryType.TOP_PRODUCTS_BY_RANGE: "Top products by revenue",
+	QueryType.TOP_CATEGORIES_BY_RANGE: "Top categories by revenue",
+	QueryType.TOP_COUNTRIES_BY_RANGE: "Top countries by revenue",
+}
+
+
+def _format_value(value: Any) -> str:
+	if isinstance(value, datetime):
+		return value.date().isoformat()
+	if isinstance(value, (Decimal, float)):
+		return f"{value:,.2f}"
+	if isinstance(value, date):
+		return value.isoformat()
+	return str(value)
+
+
+def _format_template_answer(route: Route, rows: List[Dict[str, Any]]) -> str:
+	"""Render template rows as a short plain-text answer."""
+	title = _TEMPLATE_TITLES[route.query]
+	if route.query in RANGE_QUERIES:
+		last_day = date.fromisoformat(route.params["end"]) - timedelta(days=1)
+		title += f", {route.params['start']} to {last_day.isoformat()}"
+	if not rows:
+		return f"{title}: no data for this period."
+	lines = [
+		"; ".join(f"{column.replace('_', ' ')}: {_format_value(value)}" for column, value in row.items())
+		for row in rows
+	]
+	if len(lines) == 1:
+		return f"{title}: {lines[0]}"
+	return f"{title}:\n" + "\n".join(f"{i}. {line}" for i, line in enumerate(lines, 1))
+
+
+async def _answer_from_template(route: Route, start: float) -> Optional[FastJSONResponse]:
+	"""
+	Run a routed template.
+
+	Returns None, so RAG answers instead, when the template rejects its
+	parameters or cannot run (database down or busy, query timed out).
+	"""
+	try:
+		rows = await _template_runner(route.query, route.params)
+	except HTTPException as exc:
+		if exc.status_code in (400, 422):
+			logger.info("Routed %s rejected its params (%s), using RAG", route.query.value, exc.detail)
+		else:
+			logger.warning("Routed %s failed (HTTP %d: %s), using RAG", route.query.value, exc.status_code, exc.detail)
+		return None
+	except (SQLAlchemyError, asyncio.TimeoutError) as exc:
+		logger.warning("Routed %s failed (%s), using RAG", route.query.value, exc.__class__.__name__)
+		return None
+
+	return FastJSONResponse({
+		"answer": _format_template_answer(route, rows),
+		"sources": [],
+		"latency_ms": int((time.time() - start) * 1000),
+		"context": None,
+		"route": {
+			"query": route.query.value,
+			"params": route.params,
+			"confidence": route.confidence,
+			"data": rows,
+		},
+	})
+
+
+async def _generate_answer_shared(prompt: str) -> str:
+	return await _inflight.do(
+		make_key("generate", prompt),
+		lambda: _generate_answer(prompt),
+		timeout=GENERATE_TIMEOUT,
 	)
-	return response.choices[0].message.content.strip()
 
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest) -> ChatResponse:
-	"""RAG chat endpoint returning grounded answers with citations."""
+async def chat(request: ChatRequest) -> FastJSONResponse:
+	"""
+	RAG chat endpoint returning grounded answers with citations.
+
+	Analytics questions the question router recognises (and that carry no
+	filters) are answered from the matching /ask template instead, with the
+	rows in "route" and no LLM call.
+	"""
 	start = time.time()
+	hot_requests.record("chat", question=request.question, top_k=request.top_k, filters=request.filters)
 	try:
-		retrievals = _retrieve(request.question, request.top_k, request.score_threshold, request.filters)
+		query_embedding = None
+		if ROUTER_ENABLED and _template_runner is not None and not request.filters:
+			route, query_embedding = await run_in_threadpool(_route_question, request.question)
+			if route is not None:
+				logger.info("Routed question to %s (%.2f)", route.query.value, route.confidence)
+				response = await _answer_from_template(route, start)
+				if response is not None:
+					return response
+
+		retrievals = await _retrieve_shared(request, query_embedding)
 
 		if not retrievals:
 			raise HTTPException(status_code=404, detail="No relevant context found")
 
 		prompt = _build_prompt(request.question, retrievals)
-		answer = _generate_answer(prompt)
+		answer = await _generate_answer_shared(prompt)
 
 		latency_ms = int((time.time() - start) * 1000)
-		sources = [
-			SourceChunk(
-				source=item.get("metadata", {}).get("source"),
-				score=item.get("score"),
-				text=item.get("text", ""),
-			)
-			for item in retrievals
-		]
 
-		return ChatResponse(
-			answer=answer,
-			sources=sources,
-			latency_ms=latency_ms,
-			context=None,
-		)
+		# Same shape as ChatResponse, encoded without revalidating the model
+		return FastJSONResponse({
+			"answer": answer,
+			"sources": _to_sources(retrievals),
+			"latency_ms": latency_ms,
+			"context": None,
+		})
 	except HTTPException:
 		raise
+	except LLMOverloadedError as exc:
+		raise HTTPException(
+			status_code=503,
+			detail="Answer generation is overloaded, retry later",
+			headers={"Retry-After": "2"},
+		) from exc
+	except _openai_errors("APIError") as exc:
+		logger.error("LLM provider failed after retries: %s", exc)
+		raise HTTPException(status_code=502, detail="LLM provider error") from exc
+	except asyncio.TimeoutError as exc:
+		logger.warning("RAG chat timed out")
+		raise HTTPException(status_code=504, detail="RAG pipeline timed out") from exc
 	except RuntimeError as exc:
 		logger.error("Configuration error: %s", exc)
 		raise HTTPException(status_code=500, detail=str(exc)) from exc
@@ -169,3 +538,86 @@ async def chat(request: ChatRequest) -> ChatResponse:
 		logger.error("RAG chat failed: %s", exc, exc_info=True)
 		raise HTTPException(status_code=500, detail="RAG pipeline failed") from exc
 
+
+@router.post("/search", response_model=SearchResponse)
+async def search_many(request: SearchRequest) -> FastJSONResponse:
+	"""Batch retrieval endpoint: one multi-query vector search, per-question results."""
+	start = time.time()
+	try:
+		# Embedding and the vector query block; keep them off the event loop
+		batches = await run_in_threadpool(
+			_retrieve_batch, request.questions, request.top_k, request.score_threshold, request.filters
+		)
+		results = [
+			{"question": question, "sources": _to_sources(retrievals)}
+			for question, retrievals in zip(request.questions, batches)
+		]
+		latency_ms = int((time.time() - start) * 1000)
+		return FastJSONResponse({"results": results, "latency_ms": latency_ms})
+	except HTTPException:
+		raise
+	except Exception as exc:  # pragma: no cover
+		logger.error("RAG batch search failed: %s", exc, exc_info=True)
+		raise HTTPException(status_code=500, detail="RAG search failed") from exc
+
+
+def _resolve_docs_dir(docs_dir: str) -> Path:
+	"""Resolve a requested documents directory, refusing paths outside INGEST_DOCS_ROOT."""
+	root = Path(INGEST_DOCS_ROOT).resolve()
+	path = (root / docs_dir).resolve()
+	if path != root and root not in path.parents:
+		raise HTTPException(status_code=400, detail="docs_dir must be inside the documents root")
+	return path
+
+
+@router.post("/ingest/jobs", status_code=202)
+async def submit_ingest_job(request: IngestJobRequest) -> FastJSONResponse:
+	"""
+	Queue a background ingestion job into the served collection.
+
+	The job runs on the ingestion worker pool, throttled so the p95 of
+	retrieval (embedding plus vector query) stays under INGEST_TARGET_P95_MS;
+	poll its status for progress and ETA.
+	"""
+	if VECTORSTORE_BACKEND != "chroma":
+		raise HTTPException(status_code=409, detail="Ingestion jobs need VECTORSTORE_BACKEND=chroma")
+	try:
+		job = ingest_jobs.submit(
+			_resolve_docs_dir(request.docs_dir),
+			persist_dir=PERSIST_DIR,
+			alias=COLLECTION_NAME,
+			mode=request.mode,
+			chunk_size=request.chunk_size,
+			# Must match the embedding queries are served with
+			embedding=EMBEDDING_BACKEND,
+			dedup=request.dedup,
+			shard_by=request.shard_by,
+			tickets=request.tickets,
+		)
+	except ValueError as exc:
+		raise HTTPException(status_code=400, detail=str(exc)) from exc
+	return FastJSONResponse(job.to_dict(), status_code=202)
+
+
+@router.get("/ingest/jobs")
+async def list_ingest_jobs() -> FastJSONResponse:
+	"""Recent ingestion jobs, newest first."""
+	return FastJSONResponse({"jobs": [job.to_dict() for job in ingest_jobs.list()]})
+
+
+@router.get("/ingest/jobs/{job_id}")
+async def get_ingest_job(job_id: str) -> FastJSONResponse:
+	"""Status, progress, throughput and ETA of an ingestion job."""
+	job = ingest_jobs.get(job_id)
+	if job is None:
+		raise HTTPException(status_code=404, detail="Unknown ingestion job")
+	return FastJSONResponse(job.to_dict())
+
+
+@router.post("/ingest/jobs/{job_id}/cancel")
+async def cancel_ingest_job(job_id: str) -> FastJSONResponse:
+	"""Cancel an ingestion job; a running job stops at its next file."""
+	job = ingest_jobs.cancel(job_id)
+	if job is None:
+		raise HTTPException(status_code=404, detail="Unknown ingestion job")
+	return FastJSONResponse(job.to_dict())
@@ -2,8 +2,9 @@
 
 import logging
 import os
+import threading
 from contextlib import contextmanager
-from typing import Any
+from typing import Any, Iterator
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine, text
@@ -34,12 +35,45 @@ class DatabaseConfig:
         return f"postgresql://{self.user}:{self.password}@{self.host}:{self.port}/{self.database}"
 
 
+class CancelHandle:
+    """
+    Cancels the statement running on a connection from another thread.
+
+    execute_query attaches the connection while its statement runs and
+    detaches it before the connection goes back to the pool, so a late
+    cancel() can never hit another request's query.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._connection: Any = None
+        self.cancelled = False
+
+    def attach(self, dbapi_connection: Any) -> None:
+        with self._lock:
+            if self.cancelled:
+                raise RuntimeError("Query cancelled before it started")
+            self._connection = dbapi_connection
+
+    def detach(self) -> None:
+        with self._lock:
+            self._connection = None
+
+    def cancel(self) -> None:
+        """Ask the server to abort the running statement, if any."""
+        with self._lock:
+            self.cancelled = True
+            if self._connection is not None:
+                self._connection.cancel()
+
+
 class DatabaseManager:
     """
     Manages database connections with read-only access enforcement.
     
     Uses connection pooling for efficient resource management and
-    enforces read-only transactions for security.
+    enforces read-only transactions for security. The engine is created on
+    first use, so importing this module does not load the database driver.
     """
     
     _instance: "DatabaseManager | None" = None
@@ -52,9 +86,18 @@ class DatabaseManager:
         return cls._instance
     
     def __init__(self):
-        if self._engine is None:
+        if not hasattr(self, "_config"):
             self._config = DatabaseConfig()
-            self._initialize_engine()
+            self._engine_lock = threading.Lock()
+    
+    @property
+    def engine(self) -> Engine:
+        """The pooled engine, created on first use (and again after close())."""
+        if self._engine is None:
+            with self._engine_lock:
+                if self._engine is None:
+                    self._initialize_engine()
+        return self._engine
     
     def _initialize_engine(self) -> None:
         """Initialize SQLAlchemy engine with connection pooling."""
@@ -74,20 +117,27 @@ class DatabaseManager:
             raise
     
     @contextmanager
-    def get_readonly_connection(self):
+    def get_readonly_connection(self, statement_timeout: float | None = None):
         """
         Context manager for read-only database connections.
         
         Sets the transaction to read-only mode at the database level
         for an extra layer of security.
-        """
-        if self._engine is None:
-            raise RuntimeError("Database engine not initialized")
         
-        connection = self._engine.connect()
+        Args:
+            statement_timeout: Seconds after which the server aborts any
+                statement in this transaction (None = server default)
+        """
+        connection = self.engine.connect()
         try:
             # Set transaction to read-only mode
             connection.execute(text("SET TRANSACTION READ ONLY"))
+            if statement_timeout is not None:
+                # is_local=true scopes it to this transaction, not the pooled connection
+                connection.execute(
+                    text("SELECT set_config('statement_timeout', :timeout, true)"),
+                    {"timeout": str(max(1, int(statement_timeout * 1000)))},
+                )
             yield connection
             connection.commit()
         except SQLAlchemyError as e:
@@ -101,6 +151,8 @@ class DatabaseManager:
         self,
         query: str,
         params: dict[str, Any] | None = None,
+        statement_timeout: float | None = None,
+        cancel_handle: CancelHandle | None = None,
     ) -> list[dict[str, Any]]:
         """
         Execute a read-only SQL query and return results as list of dicts.
@@ -108,6 +160,8 @@ class DatabaseManager:
         Args:
             query: SQL query string (should use :param syntax for parameters)
             params: Dictionary of query parameters
+            statement_timeout: Server-side limit in seconds for the query
+            cancel_handle: Handle another thread may use to abort the query
         
         Returns:
             List of dictionaries representing rows
@@ -121,17 +175,68 @@ class DatabaseManager:
         
         params = params or {}
         
-        logger.debug(f"Executing query: {query[:100]}...")
+        logger.debug("Executing query: %.100s...", query)
         
-        with self.get_readonly_connection() as conn:
-            result = conn.execute(text(query), params)
-            
-            # Convert to list of dicts
-            columns = result.keys()
-            rows = [dict(zip(columns, row)) for row in result.fetchall()]
+        with self.get_readonly_connection(statement_timeout) as conn:
+            if cancel_handle is not None:
+                cancel_handle.attach(conn.connection.dbapi_connection)
+            try:
+                result = conn.execute(text(query), params)
+                
+                # Convert to list of dicts
+                columns = result.keys()
+                rows = [dict(zip(columns, row)) for row in result.fetchall()]
+            finally:
+                if cancel_handle is not None:
+                    cancel_handle.detach()
             
-            logger.info(f"Query returned {len(rows)} rows")
+            logger.info("Query returned %d rows", len(rows), extra={"rows": len(rows)})
             return rows
+
+    def stream_query(
+        self,
+        query: str,
+        params: dict[str, Any] | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Execute a read-only SQL query and yield its rows in batches.
+
+        Rows are read through a server-side (named) cursor, so at most
+        batch_size rows are held in memory regardless of the result size.
+        The connection stays checked out until the generator is exhausted
+        or closed.
+
+        Args:
+            query: SQL query string (should use :param syntax for parameters)
+            params: Dictionary of query parameters
+            batch_size: Rows fetched from the server per round trip
+
+        Yields:
+            Lists of up to batch_size row dicts
+        """
+        self._validate_readonly_query(query)
+
+        with self.get_readonly_connection() as conn:
+            result = conn.execute(
+                text(query),
+                params or {},
+                execution_options={"stream_results": True, "yield_per": batch_size},
+            )
+            for partition in result.mappings().partitions(batch_size):
+                yield [dict(row) for row in partition]
+
+    def explain_cost(self, query: str, params: dict[str, Any] | None = None) -> float:
+        """
+        Return the planner's estimated total cost for a read-only query.
+        
+        Runs EXPLAIN without ANALYZE, so the query itself is not executed.
+        """
+        self._validate_readonly_query(query)
+        
+        with self.get_readonly_connection() as conn:
+            plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {query}"), params or {}).scalar()
+            return float(plan[0]["Plan"]["Total Cost"])
     
     def _validate_readonly_query(self, query: str) -> None:
         """
@@ -160,7 +265,26 @@ class DatabaseManager:
         except Exception as e:
             logger.error(f"Database health check failed: {e}")
             return False
-    
+
+    def warm_pool(self, connections: int | None = None) -> int:
+        """
+        Open pooled connections now so early requests do not pay for connecting.
+
+        Args:
+            connections: Connections to open (defaults to the pool size)
+
+        Returns:
+            Number of connections opened and returned to the pool
+        """
+        opened = []
+        try:
+            for _ in range(connections or self._config.pool_size):
+                opened.append(self.engine.connect())
+        finally:
+            for connection in opened:
+                connection.close()
+        return len(opened)
+
     def close(self) -> None:
         """Close the database engine and connection pool."""
         if self._engine:
@@ -0,0 +1,177 @@
+"""
+Query governor for /ask: statement timeouts, cancellation and admission control.
+
+Every template query runs with a server-side statement_timeout and a
+CancelHandle, so a query whose caller went away is aborted in Postgres
+instead of holding a pooled connection until it finishes.
+
+Templates whose EXPLAIN cost exceeds a threshold are "heavy" and share a
+small number of execution slots. Heavy queries beyond that wait in a
+bounded queue: a full queue is rejected with 429 and a queue wait that
+outlasts its budget is shed with 503, both with Retry-After. Cheap
+queries are never queued.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Hashable
+
+from fastapi import HTTPException
+
+from .db import CancelHandle, DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# Planner cost above which a query counts as heavy
+HEAVY_QUERY_COST = float(os.getenv("ASK_HEAVY_QUERY_COST", "50000"))
+# Heavy queries allowed to run at once; keep well below DB_POOL_SIZE
+MAX_HEAVY_QUERIES = int(os.getenv("ASK_MAX_HEAVY_QUERIES", "2"))
+# Heavy queries allowed to wait for a slot before new ones get 429
+MAX_QUEUED_HEAVY_QUERIES = int(os.getenv("ASK_MAX_QUEUED_HEAVY_QUERIES", "8"))
+# Seconds a heavy query may wait for a slot before it is shed with 503
+HEAVY_QUEUE_TIMEOUT = float(os.getenv("ASK_HEAVY_QUEUE_TIMEOUT_SECONDS", "5"))
+# Seconds an EXPLAIN cost estimate is reused for the same template and params
+COST_CACHE_SECONDS = float(os.getenv("ASK_COST_CACHE_SECONDS", "300"))
+
+# SQLSTATE query_canceled: statement_timeout or an explicit cancel
+_QUERY_CANCELED = "57014"
+
+
+def is_query_canceled(exc: BaseException) -> bool:
+    """True if exc is Postgres aborting a statement (timeout or cancel)."""
+    return getattr(getattr(exc, "orig", None), "pgcode", None) == _QUERY_CANCELED
+
+
+class QueryGovernor:
+    """
+    Bounds /ask queries by time, client liveness and estimated cost.
+
+    Args:
+        db: Database manager used for EXPLAIN and execution
+        heavy_cost: Planner cost at or above which a query is heavy
+        max_heavy: Heavy queries executing concurrently
+        max_queued: Heavy queries waiting for a slot
+        queue_timeout: Seconds a heavy query may wait for a slot
+        cost_ttl: Seconds a cost estimate stays cached
+    """
+
+    def __init__(
+        self,
+        db: DatabaseManager,
+        heavy_cost: float = HEAVY_QUERY_COST,
+        max_heavy: int = MAX_HEAVY_QUERIES,
+        max_queued: int = MAX_QUEUED_HEAVY_QUERIES,
+        queue_timeout: float = HEAVY_QUEUE_TIMEOUT,
+        cost_ttl: float = COST_CACHE_SECONDS,
+    ):
+        self._db = db
+        self.heavy_cost = heavy_cost
+        self.max_heavy = max_heavy
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.cost_ttl = cost_ttl
+        self._slots = asyncio.Semaphore(max_heavy)
+        self._running = 0
+        self._queued = 0
+        self._costs: dict[Hashable, tuple[float, float]] = {}
+        self._costs_lock = threading.Lock()
+
+    def stats(self) -> dict[str, Any]:
+        """Current heavy-query occupancy, for health and debugging."""
+        return {
+            "heavy_running": self._running,
+            "heavy_queued": self._queued,
+            "max_heavy": self.max_heavy,
+            "max_queued": self.max_queued,
+        }
+
+    def estimate_cost(self, key: Hashable, sql: str, params: dict[str, Any]) -> float:
+        """Planner cost of sql, cached per key for cost_ttl seconds."""
+        now = time.monotonic()
+        with self._costs_lock:
+            cached = self._costs.get(key)
+        if cached is not None and now - cached[1] < self.cost_ttl:
+            return cached[0]
+
+        cost = self._db.explain_cost(sql, params)
+        with self._costs_lock:
+            self._costs[key] = (cost, now)
+        return cost
+
+    async def execute(
+        self,
+        key: Hashable,
+        sql: str,
+        params: dict[str, Any],
+        statement_timeout: float,
+    ) -> list[dict[str, Any]]:
+        """
+        Run a template query under admission control and a statement timeout.
+
+        Cancelling the awaiting task cancels the statement in Postgres.
+
+        Args:
+            key: Identity of the template and params, used for the cost cache
+            sql: Template SQL
+            params: Validated parameters
+            statement_timeout: Server-side limit in seconds
+
+        Raises:
+            HTTPException: 429 when the heavy queue is full, 503 when a heavy
+                query waited too long for a slot
+        """
+        loop = asyncio.get_running_loop()
+        cost = await loop.run_in_executor(None, self.estimate_cost, key, sql, params)
+        if cost < self.heavy_cost:
+            return await self._run(sql, params, statement_timeout)
+
+        await self._acquire(cost)
+        self._running += 1
+        try:
+            return await self._run(sql, params, statement_timeout)
+        finally:
+            self._running -= 1
+            self._slots.release()
+
+    async def _acquire(self, cost: float) -> None:
+        if self._slots.locked() and self._queued >= self.max_queued:
+            logger.warning("Rejecting heavy query (cost %.0f): queue full", cost)
+            raise HTTPException(
+                status_code=429,
+                detail="Too many expensive queries in progress, retry later",
+                headers={"Retry-After": str(int(self.queue_timeout) or 1)},
+            )
+
+        self._queued += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Shedding heavy query (cost %.0f): no slot within %.1fs", cost, self.queue_timeout)
+            raise HTTPException(
+                status_code=503,
+                detail="Database is busy with expensive queries, retry later",
+                headers={"Retry-After": str(int(self.queue_timeout) or 1)},
+            ) from None
+        finally:
+            self._queued -= 1
+
+    async def _run(self, sql: str, params: dict[str, Any], statement_timeout: float) -> list[dict[str, Any]]:
+        handle = CancelHandle()
+        # run_in_executor rather than run_in_threadpool: anyio defers
+        # cancellation until the thread returns, which would keep us from
+        # cancelling the statement while it is still running.
+        future = asyncio.get_running_loop().run_in_executor(
+            None,
+            lambda: self._db.execute_query(
+                sql, params, statement_timeout=statement_timeout, cancel_handle=handle
+            ),
+        )
+        try:
+            return await future
+        except asyncio.CancelledError:
+            handle.cancel()
+            logger.info("Cancelled running query: caller went away")
+            raise
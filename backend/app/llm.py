@@ -0,0 +1,281 @@
+"""
+LLM execution layer: bounded concurrency, prioritized queueing, timeouts,
+retries and hedging.
+
+At most max_concurrency calls run at once. Callers beyond that wait in a
+priority queue (lower value first, then earliest deadline). A caller is
+shed with LLMOverloadedError instead of queueing when the queue is full,
+when the estimated wait already exceeds its deadline, or when the deadline
+passes while it is still queued. That way a provider slowdown turns into
+fast 503s rather than a growing pile of requests.
+
+Each attempt gets a timeout bounded by the caller's deadline. Retryable
+failures (timeouts, connection errors, 408/409/429/5xx) are retried with
+full-jitter exponential backoff while the deadline allows. The slot is
+held during backoff so retries cannot exceed the concurrency bound.
+
+With hedging enabled, an attempt that runs longer than the configured
+latency percentile of recent calls gets a second, concurrent attempt if a
+slot is free right now; the first success wins and the other is cancelled.
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import math
+import os
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", "20"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.25"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP_SECONDS", "4"))
+# Hedge attempts slower than this percentile of recent latencies (0 disables)
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504})
+# Latency samples needed before estimates (shedding, hedging) are trusted
+_MIN_SAMPLES = 20
+
+
+class LLMOverloadedError(Exception):
+    """The call was shed: queue full or its deadline cannot be met."""
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Default retry policy: timeouts, connection errors and transient HTTP statuses."""
+    if isinstance(exc, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS
+
+
+class LLMExecutor:
+    """
+    Runs LLM calls under a concurrency bound with queueing, retries and hedging.
+
+    A call is a coroutine factory: call(timeout) performs one attempt and
+    should give up after timeout seconds.
+
+    Args:
+        max_concurrency: Calls (including hedges) in flight at once
+        max_queue: Callers allowed to wait for a slot
+        call_timeout: Upper bound in seconds for a single attempt
+        max_retries: Extra attempts after the first failure
+        backoff_base: Initial backoff in seconds, doubled per retry
+        backoff_cap: Maximum backoff in seconds
+        hedge_percentile: Latency percentile (0-1) after which to hedge; 0 disables
+        retryable: Predicate deciding whether an exception is worth retrying
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_queue: int = LLM_MAX_QUEUE,
+        call_timeout: float = LLM_CALL_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        backoff_base: float = LLM_BACKOFF_BASE,
+        backoff_cap: float = LLM_BACKOFF_CAP,
+        hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+        retryable: Callable[[BaseException], bool] = is_retryable,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.hedge_percentile = hedge_percentile
+        self._retryable = retryable
+        self._running = 0
+        self._queue: list[tuple[int, float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._latencies: deque[float] = deque(maxlen=256)
+        self._counters = {"calls": 0, "shed": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+
+    def stats(self) -> dict[str, Any]:
+        """Occupancy, counters and recent latency percentiles."""
+        return {
+            "running": self._running,
+            "queued": len(self._queue),
+            **self._counters,
+            "p50_ms": self._percentile_ms(0.5),
+            "p95_ms": self._percentile_ms(0.95),
+        }
+
+    async def run(
+        self,
+        call: Callable[[float], Awaitable[T]],
+        priority: int = PRIORITY_INTERACTIVE,
+        deadline: float | None = None,
+    ) -> T:
+        """
+        Execute call under the executor's limits.
+
+        Args:
+            call: Coroutine factory performing one attempt within a timeout
+            priority: Queue priority, lower runs first
+            deadline: time.monotonic() by which the result is needed
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            LLMOverloadedError: If the call was shed
+            asyncio.TimeoutError: If the deadline passed during execution
+            Exception: The last attempt's error when it is not retryable
+                or retries are exhausted
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.call_timeout * (self.max_retries + 1)
+        self._counters["calls"] += 1
+
+        await self._acquire(priority, deadline)
+        try:
+            attempt = 0
+            while True:
+                try:
+                    return await self._hedged(call, deadline)
+                except Exception as exc:
+                    if attempt >= self.max_retries or not self._retryable(exc):
+                        raise
+                    backoff = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+                    if time.monotonic() + backoff >= deadline:
+                        raise
+                    attempt += 1
+                    self._counters["retries"] += 1
+                    logger.warning("LLM call failed (%s: %s), retry %d in %.2fs", exc.__class__.__name__, exc, attempt, backoff)
+                    await asyncio.sleep(backoff)
+        finally:
+            self._release()
+
+    # ------------------------------------------------------------------
+    # Slots and queue
+    # ------------------------------------------------------------------
+    def _shed(self, reason: str) -> LLMOverloadedError:
+        self._counters["shed"] += 1
+        logger.warning("Shedding LLM call: %s", reason)
+        return LLMOverloadedError(reason)
+
+    def _try_acquire(self) -> bool:
+        if self._running < self.max_concurrency and not self._queue:
+            self._running += 1
+            return True
+        return False
+
+    async def _acquire(self, priority: int, deadline: float) -> None:
+        if self._try_acquire():
+            return
+
+        remaining = deadline - time.monotonic()
+        if len(self._queue) >= self.max_queue:
+            raise self._shed("queue full")
+        median = self._percentile(0.5)
+        if median is not None:
+            expected_wait = math.ceil((len(self._queue) + 1) / self.max_concurrency) * median
+            if expected_wait >= remaining:
+                raise self._shed(f"expected wait {expected_wait:.1f}s exceeds deadline")
+
+        waiter = asyncio.get_running_loop().create_future()
+        entry = (priority, deadline, next(self._sequence), waiter)
+        heapq.heappush(self._queue, entry)
+        try:
+            await asyncio.wait_for(waiter, remaining)
+        except BaseException as exc:
+            if entry in self._queue:
+                # Leave the queue so a stale entry never blocks _try_acquire
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+            elif waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                # Granted a slot in the same tick we gave up; hand it on
+                self._release()
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._shed("deadline passed while queued") from None
+            raise
+
+    def _release(self) -> None:
+        """Hand the slot to the best live waiter, or free it."""
+        now = time.monotonic()
+        while self._queue:
+            _, deadline, _, waiter = heapq.heappop(self._queue)
+            if waiter.done():
+                continue
+            if deadline <= now:
+                waiter.set_exception(self._shed("deadline passed while queued"))
+                continue
+            waiter.set_result(None)
+            return
+        self._running -= 1
+
+    # ------------------------------------------------------------------
+    # Attempts
+    # ------------------------------------------------------------------
+    async def _attempt(self, call: Callable[[float], Awaitable[T]], deadline: float) -> T:
+        timeout = min(self.call_timeout, deadline - time.monotonic())
+        if timeout <= 0:
+            raise asyncio.TimeoutError()
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(call(timeout), timeout)
+        except asyncio.TimeoutError:
+            # A timeout is a sample of at least the timeout; leaving it out
+            # would keep the percentiles low exactly when the provider is slow
+            self._latencies.append(timeout)
+            raise
+        self._latencies.append(time.monotonic() - start)
+        return result
+
+    async def _hedged(self, call: Callable[[float], Awaitable[T]], deadline: float) -> T:
+        delay = self._percentile(self.hedge_percentile) if self.hedge_percentile > 0 else None
+        if delay is None:
+            return await self._attempt(call, deadline)
+
+        primary = asyncio.ensure_future(self._attempt(call, deadline))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            # Hedges only use spare capacity, they never queue
+            if done or not self._try_acquire():
+                return await primary
+
+            self._counters["hedges"] += 1
+            hedge = asyncio.ensure_future(self._attempt(call, deadline))
+            pending = {primary, hedge}
+            error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self._counters["hedge_wins"] += 1
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in (primary, hedge):
+                if task is not None and not task.done():
+                    task.cancel()
+            if hedge is not None:
+                self._release()
+
+    def _percentile(self, q: float) -> float | None:
+        if len(self._latencies) < _MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _percentile_ms(self, q: float) -> int | None:
+        value = self._percentile(q)
+        return None if value is None else int(value * 1000)
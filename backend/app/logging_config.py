@@ -0,0 +1,210 @@
+"""
+Process-wide logging setup: background handler, JSON output and sampling.
+
+configure_logging() installs a single QueueHandler on the root logger. The
+calling thread only merges the message and enqueues the record; a
+QueueListener thread formats it and writes it to stderr, so a slow or
+blocked sink never stalls a request. When the queue is full, records are
+dropped and counted rather than blocking the caller.
+
+With LOG_FORMAT=json each record is one JSON object carrying the standard
+fields plus every `extra=` field passed at the call site; the text format
+appends those fields as key=value pairs. LOG_SAMPLE_RATES keeps a fraction
+of INFO and lower records per logger (longest name prefix wins), e.g.
+"app.db=0.01,app.api=0.1"; warnings and errors are always kept, and kept
+records carry their sample_rate so counts can be scaled back up.
+"""
+
+import atexit
+import itertools
+import logging
+import logging.handlers
+import os
+import queue
+from datetime import datetime, timezone
+
+import orjson
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" (human-readable) or "json" (one object per line)
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+
+# Attributes every LogRecord has; anything else was passed through extra=
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parse "logger=rate,..." into a dict, validating each rate is in [0, 1]."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, rate = item.partition("=")
+        value = float(rate)
+        if not 0 <= value <= 1:
+            raise ValueError(f"Sample rate for {name!r} must be between 0 and 1")
+        rates[name.strip()] = value
+    return rates
+
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS and not k.startswith("_")}
+
+
+class TextFormatter(logging.Formatter):
+    """TEXT_FORMAT followed by the record's extra= fields as key=value pairs."""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        extra = _extra_fields(record)
+        if not extra:
+            return line
+        return line + " " + " ".join(f"{key}={value}" for key, value in extra.items())
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON, including their extra= fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            **_extra_fields(record),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return orjson.dumps(entry, default=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep 1 in round(1 / rate) records at INFO or below for sampled loggers.
+
+    Counting rather than drawing random numbers keeps the kept fraction
+    exact and the filter cheap; each logger prefix has its own counter
+    (itertools.count, whose next() is atomic under the GIL). Kept records
+    carry sample_rate = 1 / every, the fraction actually kept, which differs
+    from the configured rate when 1 / rate is not an integer.
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self._rates = []
+        # Longest prefix first, so "app.db" wins over "app"
+        for prefix, rate in sorted(rates.items(), key=lambda item: len(item[0]), reverse=True):
+            every = max(1, round(1 / rate)) if rate > 0 else 0
+            self._rates.append((prefix, 1 / every if every else 0.0, every, itertools.count()))
+        self._by_logger: dict[str, tuple | None] = {}
+
+    def _match(self, name: str) -> tuple | None:
+        match = self._by_logger.get(name, False)
+        if match is False:
+            match = next(
+                (entry for entry in self._rates if name == entry[0] or name.startswith(entry[0] + ".")),
+                None,
+            )
+            self._by_logger[name] = match
+        return match
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        match = self._match(record.name)
+        if match is None:
+            return True
+        _, rate, every, counter = match
+        if every == 1:
+            return True
+        if not every or next(counter) % every:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of failing when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated after the call) but leave
+        # formatting, and extra= fields, to the listener's formatter
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    fmt: str = LOG_FORMAT,
+    sample_rates: str | dict[str, float] = LOG_SAMPLE_RATES,
+    queue_size: int = LOG_QUEUE_SIZE,
+    stream=None,
+) -> DroppingQueueHandler:
+    """
+    Route all logging through a background queue; safe to call again to reconfigure.
+
+    Args:
+        level: Root log level
+        fmt: "text" or "json"
+        sample_rates: Per-logger sample rates, as a dict or "name=rate,..." string
+        queue_size: Records buffered before new ones are dropped
+        stream: Output stream (stderr by default)
+
+    Returns:
+        The installed queue handler (its dropped attribute counts lost records)
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+    rates = parse_sample_rates(sample_rates) if isinstance(sample_rates, str) else sample_rates
+    if rates:
+        handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return handler
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -1,38 +1,79 @@
 """FastAPI application exposing a safe, read-only analytics endpoint."""
 
+import asyncio
 import logging
 import os
-from enum import Enum
-from typing import Any, Dict, Tuple
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field, validator
 
+from . import api as rag_api
 from .api import router as rag_router
 from .db import db_manager
+from .governor import QueryGovernor, is_query_canceled
+from .logging_config import configure_logging
+from .queries import QueryType, build_query
+from .serialization import FastJSONResponse, dumps
+from .singleflight import SingleFlight, make_key
+from .snapshots import SnapshotScheduler
+from .warmup import hot_requests, replay
 
 
 # ----------------------------------------------------------------------------
 # Logging configuration
 # ----------------------------------------------------------------------------
-LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
-logging.basicConfig(
-	level=LOG_LEVEL,
-	format="%(asctime)s %(levelname)s [%(name)s] %(message)s",
-)
+# LOG_LEVEL, LOG_FORMAT (text|json) and LOG_SAMPLE_RATES; records are written
+# by a background thread, see logging_config.py
+configure_logging()
 logger = logging.getLogger("app")
 
 
 # ----------------------------------------------------------------------------
-# Query templates and validation
+# Request validation
 # ----------------------------------------------------------------------------
-class QueryType(str, Enum):
-	TOP_PRODUCTS_LAST_90_DAYS = "top_products_last_90_days"
-	MONTHLY_REVENUE_LAST_12M = "monthly_revenue_last_12m"
-	REPEAT_PURCHASE_RATE = "repeat_purchase_rate"
-	AOV_BY_SEGMENT = "avg_order_value_by_segment"
-	TOP_CUSTOMERS_LTV = "top_customers_ltv"
+# Seconds a caller waits for a query result, also applied as the statement_timeout
+# in Postgres; ASK_TIMEOUT_<QUERY_TYPE> overrides the default for one template,
+# e.g. ASK_TIMEOUT_TOP_CUSTOMERS_LTV=60.
+DEFAULT_QUERY_TIMEOUT = float(os.getenv("ASK_TIMEOUT_SECONDS", "30"))
+QUERY_TIMEOUTS = {
+	query_type: float(os.getenv(f"ASK_TIMEOUT_{query_type.name}", DEFAULT_QUERY_TIMEOUT))
+	for query_type in QueryType
+}
+# How often a waiting /ask checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = float(os.getenv("ASK_DISCONNECT_POLL_SECONDS", "0.5"))
+
+
+# Parameterless templates with tiny results are served from in-memory snapshots
+SNAPSHOT_ENABLED = os.getenv("SNAPSHOT_ENABLED", "1") == "1"
+SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "300"))
+SNAPSHOT_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "900"))
+SNAPSHOT_QUERIES = (
+	QueryType.MONTHLY_REVENUE_LAST_12M,
+	QueryType.REPEAT_PURCHASE_RATE,
+	QueryType.AOV_BY_SEGMENT,
+)
+
+
+# "columnar" answers templates from an in-memory mirror of the sales tables
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "postgres")
+ANALYTICS_REFRESH_SECONDS = float(os.getenv("ANALYTICS_REFRESH_SECONDS", "60"))
+# Full reload of the mirror, reconciling rows committed below its watermark
+ANALYTICS_REBUILD_SECONDS = float(os.getenv("ANALYTICS_REBUILD_SECONDS", "3600"))
+
+# Streaming sketches answering /ask requests that pass "approximate": true
+APPROXIMATE_ENABLED = os.getenv("APPROXIMATE_ENABLED", "0") == "1"
+APPROXIMATE_REFRESH_SECONDS = float(os.getenv("APPROXIMATE_REFRESH_SECONDS", "60"))
+
+
+# Warm-up (DB pool, vector index, embedding model, LLM client, then a replay of
+# the requests that were hot before the restart, see warmup.py) runs after the
+# server starts listening and /ready reports when it is done; set to 1 to
+# finish it before the server accepts any request, /health included.
+STARTUP_WARMUP_BLOCKING = os.getenv("STARTUP_WARMUP_BLOCKING", "0") == "1"
 
 
 class AskRequest(BaseModel):
@@ -53,97 +94,179 @@ class AskRequest(BaseModel):
 
 class AskResponse(BaseModel):
 	data: list[dict[str, Any]]
-
-
-def _build_query(query: QueryType, params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
-	"""Return SQL template and validated parameters for the given query type."""
-
-	if query == QueryType.TOP_PRODUCTS_LAST_90_DAYS:
-		limit = params.get("limit", 5)
-		if not isinstance(limit, int) or limit < 1 or limit > 50:
-			raise HTTPException(status_code=422, detail="limit must be an integer between 1 and 50")
-		sql = (
-			"""
-			SELECT p.product_id,
-				   p.name AS product_name,
-				   SUM(oi.quantity * oi.unit_price) AS revenue
-			FROM order_items oi
-			JOIN products p ON p.product_id = oi.product_id
-			JOIN orders o ON o.order_id = oi.order_id
-			WHERE o.order_date >= now() - INTERVAL '90 days'
-			GROUP BY p.product_id, p.name
-			ORDER BY revenue DESC
-			LIMIT :limit
-			"""
-		)
-		return sql, {"limit": limit}
-
-	if query == QueryType.MONTHLY_REVENUE_LAST_12M:
-		sql = (
-			"""
-			SELECT date_trunc('month', o.order_date) AS month,
-				   SUM(o.total_amount) AS revenue
-			FROM orders o
-			WHERE o.order_date >= date_trunc('month', now()) - INTERVAL '12 months'
-			GROUP BY 1
-			ORDER BY 1
-			"""
-		)
-		return sql, {}
-
-	if query == QueryType.REPEAT_PURCHASE_RATE:
-		sql = (
-			"""
-			SELECT COUNT(DISTINCT CASE WHEN order_count > 1 THEN customer_id END) * 1.0 /
-				   COUNT(DISTINCT customer_id) AS repeat_purchase_rate
-			FROM (
-				SELECT customer_id, COUNT(order_id) AS order_count
-				FROM orders
-				GROUP BY customer_id
-			) subquery
-			"""
-		)
-		return sql, {}
-
-	if query == QueryType.AOV_BY_SEGMENT:
-		sql = (
-			"""
-			SELECT c.is_premium,
-				   AVG(o.total_amount) AS avg_order_value
-			FROM customers c
-			JOIN orders o ON o.customer_id = c.customer_id
-			GROUP BY c.is_premium
-			"""
-		)
-		return sql, {}
-
-	if query == QueryType.TOP_CUSTOMERS_LTV:
-		limit = params.get("limit", 10)
-		if not isinstance(limit, int) or limit < 1 or limit > 100:
-			raise HTTPException(status_code=422, detail="limit must be an integer between 1 and 100")
-		sql = (
-			"""
-			SELECT c.customer_id,
-				   c.first_name || ' ' || c.last_name AS customer_name,
-				   SUM(o.total_amount) AS lifetime_value
-			FROM customers c
-			JOIN orders o ON o.customer_id = c.customer_id
-			GROUP BY c.customer_id, c.first_name, c.last_name
-			ORDER BY lifetime_value DESC
-			LIMIT :limit
-			"""
-		)
-		return sql, {"limit": limit}
-
-	raise HTTPException(status_code=400, detail="Unsupported query type")
+	# Present when the rows are sketch estimates: method, error bounds and coverage
+	approximate: Optional[Dict[str, Any]] = None
 
 
 # ----------------------------------------------------------------------------
 # FastAPI application
 # ----------------------------------------------------------------------------
-app = FastAPI(title="Smart Insights Assistant", version="1.0.0")
+def _compute_snapshot(query: QueryType) -> list[dict[str, Any]]:
+	sql, safe_params = build_query(query, {})
+	return db_manager.execute_query(sql, safe_params, statement_timeout=QUERY_TIMEOUTS[query])
+
+
+_snapshots = SnapshotScheduler(_compute_snapshot, SNAPSHOT_QUERIES, SNAPSHOT_INTERVAL_SECONDS)
+_mirror = None
+_sketches = None
+
+
+def _start_mirror() -> None:
+	global _mirror
+	# Imported lazily so NumPy is only loaded when the engine is enabled
+	from .analytics import ColumnarMirror
+
+	_mirror = ColumnarMirror(db_manager)
+	_mirror.start(ANALYTICS_REFRESH_SECONDS, ANALYTICS_REBUILD_SECONDS)
+
+
+def _start_sketches() -> None:
+	global _sketches
+	from .analytics import SketchStore
+
+	_sketches = SketchStore(db_manager)
+	_sketches.start(APPROXIMATE_REFRESH_SECONDS)
+
+
+# Warm-up progress reported by /ready
+_startup: Dict[str, Any] = {"status": "starting", "warmup_ms": {}}
+
+
+def _replay_ask(entry: Dict[str, Any]) -> None:
+	query = QueryType(entry["query"])
+	sql, safe_params = build_query(query, entry["params"])
+	# Also fills the governor's planner-cost cache the first real request would miss
+	_governor.estimate_cost(make_key(query.value, safe_params), sql, safe_params)
+	db_manager.execute_query(sql, safe_params, statement_timeout=QUERY_TIMEOUTS[query])
+
+
+def _replay_hot_requests() -> None:
+	"""Re-run the requests that were hottest before the restart (see warmup.py)."""
+	entries = hot_requests.load()
+	_startup["replay"] = replay(entries, {
+		"ask": _replay_ask,
+		"chat": lambda entry: rag_api.replay_question(entry["question"], entry["top_k"], entry["filters"]),
+	})
+
+
+def _warm_database() -> None:
+	# An unreachable database is logged by health_check and does not block readiness
+	if db_manager.health_check():
+		db_manager.warm_pool()
+
+
+def _warm_up() -> None:
+	"""
+	Open shared resources ahead of the first request that needs them.
+
+	Every step is best-effort: a failing step (model download while offline,
+	database down) is logged and reported under "errors" in /ready, and the
+	first request that needs the resource opens it instead. Readiness itself
+	only requires the database, which /ready checks on every call.
+	"""
+	steps = (
+		("database", _warm_database),
+		("rag", rag_api.startup),
+		("replay", _replay_hot_requests),
+	)
+	started = time.perf_counter()
+	for name, step in steps:
+		start = time.perf_counter()
+		try:
+			step()
+		except Exception as exc:
+			logger.warning("Warm-up step %s failed, continuing: %s", name, exc, exc_info=True)
+			_startup.setdefault("errors", {})[name] = str(exc)
+		_startup["warmup_ms"][name] = round((time.perf_counter() - start) * 1000, 1)
+	_startup["warmup_ms"]["total"] = round((time.perf_counter() - started) * 1000, 1)
+	_startup["status"] = "ready"
+	logger.info("Warm-up finished in %.0f ms", _startup["warmup_ms"]["total"])
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+	"""Start warm-up and background refreshes; release shared resources on shutdown."""
+	warm_up = asyncio.create_task(asyncio.to_thread(_warm_up))
+	if STARTUP_WARMUP_BLOCKING:
+		await warm_up
+	if SNAPSHOT_ENABLED:
+		_snapshots.start()
+	if ANALYTICS_ENGINE == "columnar":
+		_start_mirror()
+	if APPROXIMATE_ENABLED:
+		_start_sketches()
+	hot_requests.start()
+	yield
+	# The warm-up thread cannot be interrupted; let it finish before closing what it opens
+	await warm_up
+	if _mirror is not None:
+		_mirror.stop()
+	if _sketches is not None:
+		_sketches.stop()
+	hot_requests.stop()
+	_snapshots.stop()
+	rag_api.shutdown()
+
+
+app = FastAPI(title="Smart Insights Assistant", version="1.0.0", lifespan=lifespan)
 app.include_router(rag_router)
 
+# Concurrent identical /ask requests share one database execution
+_inflight_queries = SingleFlight("ask")
+_governor = QueryGovernor(db_manager)
+
+
+async def _execute_encoded(key: str, sql: str, params: Dict[str, Any], timeout: float) -> bytes:
+	"""Run a template query and encode the response body once for every waiter."""
+	rows = await _governor.execute(key, sql, params, statement_timeout=timeout)
+	return dumps({"data": rows})
+
+
+async def _unless_disconnected(http_request: Request, awaitable):
+	"""
+	Await awaitable, cancelling it if the HTTP client disconnects first.
+
+	Cancellation leaves the shared single-flight call; when no other caller
+	is waiting on it, the governor cancels the statement in Postgres.
+	"""
+	task = asyncio.ensure_future(awaitable)
+	try:
+		while True:
+			done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+			if done:
+				return task.result()
+			if await http_request.is_disconnected():
+				logger.info("/ask client disconnected, cancelling query")
+				raise HTTPException(status_code=499, detail="Client closed request")
+	finally:
+		if not task.done():
+			task.cancel()
+
+
+async def _run_template(query: QueryType, params: Dict[str, Any]) -> list[dict[str, Any]]:
+	"""
+	Return a template's rows through the same sources /ask uses.
+
+	Called by /rag/chat for questions the question router maps to a template.
+	"""
+	sql, safe_params = build_query(query, params)
+	snapshot = _snapshots.get(query, max_age=SNAPSHOT_MAX_AGE_SECONDS) if SNAPSHOT_ENABLED else None
+	if snapshot is not None:
+		return snapshot.rows
+	if _mirror is not None and _mirror.ready and _mirror.supports(query):
+		return _mirror.run(query, safe_params)
+
+	key = make_key(query.value, safe_params)
+	timeout = QUERY_TIMEOUTS[query]
+	return await _inflight_queries.do(
+		make_key("rows", key),
+		lambda: _governor.execute(key, sql, safe_params, statement_timeout=timeout),
+		timeout=timeout,
+	)
+
+
+rag_api.set_template_runner(_run_template)
+
 
 @app.get("/health")
 async def health() -> dict[str, str]:
@@ -153,22 +276,82 @@ async def health() -> dict[str, str]:
 	return {"status": status}
 
 
+@app.get("/ready")
+async def ready() -> Response:
+	"""
+	Readiness check: 200 once warm-up has finished and the DB answers, else 503.
+
+	Unlike /health, this stays 503 while the process is still loading, so a
+	load balancer only routes traffic to it once requests will be fast.
+	"""
+	if _startup["status"] == "ready" and await asyncio.to_thread(db_manager.health_check):
+		return JSONResponse(_startup)
+	status = _startup["status"] if _startup["status"] != "ready" else "degraded"
+	return JSONResponse({**_startup, "status": status}, status_code=503)
+
+
 @app.post("/ask", response_model=AskResponse)
-async def ask(request: AskRequest) -> AskResponse:
-	"""Execute a predefined, parameterized analytics query in read-only mode."""
-	logger.info("/ask request", extra={"query": request.query, "params": request.params})
+async def ask(request: AskRequest, http_request: Request) -> Response:
+	"""
+	Execute a predefined, parameterized analytics query in read-only mode.
+
+	Rows come from our own templates, so they are encoded directly instead
+	of being revalidated against AskResponse (which still documents the shape).
+
+	With "approximate": true in params, supported templates are answered from
+	streaming sketches in constant time, with error bounds in the response's
+	"approximate" field; otherwise (or until the sketches are loaded) the
+	exact path is used and that field is absent.
+	"""
+	logger.info("/ask request", extra={"query": request.query.value, "params": request.params})
 
 	try:
-		sql, safe_params = _build_query(request.query, request.params)
-		rows = db_manager.execute_query(sql, safe_params)
-		return AskResponse(data=rows)
+		params = dict(request.params)
+		approximate = params.pop("approximate", False)
+		if not isinstance(approximate, bool):
+			raise HTTPException(status_code=422, detail="approximate must be a boolean")
+		sql, safe_params = build_query(request.query, params)
+
+		if approximate and _sketches is not None and _sketches.ready and _sketches.supports(request.query):
+			rows, approximation = _sketches.run(request.query, safe_params)
+			return FastJSONResponse({"data": rows, "approximate": approximation})
+
+		snapshot = _snapshots.get(request.query, max_age=SNAPSHOT_MAX_AGE_SECONDS) if SNAPSHOT_ENABLED else None
+		if snapshot is not None:
+			return FastJSONResponse(
+				{"data": snapshot.rows},
+				headers={"X-Snapshot-Age-Seconds": str(int(snapshot.age))},
+			)
+
+		if _mirror is not None and _mirror.ready and _mirror.supports(request.query):
+			return FastJSONResponse({"data": _mirror.run(request.query, safe_params)})
+
+		# Only requests that reach Postgres are worth replaying after a restart
+		hot_requests.record("ask", query=request.query.value, params=params)
+		key = make_key(request.query.value, safe_params)
+		timeout = QUERY_TIMEOUTS[request.query]
+		body = await _unless_disconnected(
+			http_request,
+			_inflight_queries.do(
+				key,
+				lambda: _execute_encoded(key, sql, safe_params, timeout),
+				timeout=timeout,
+			),
+		)
+		return FastJSONResponse(body)
 	except HTTPException:
 		# Let FastAPI handle HTTPException responses
 		raise
+	except asyncio.TimeoutError as exc:
+		logger.warning("/ask timed out: %s", request.query.value)
+		raise HTTPException(status_code=504, detail="Query timed out") from exc
 	except ValueError as exc:
 		logger.warning("Bad request: %s", exc)
 		raise HTTPException(status_code=400, detail=str(exc)) from exc
 	except Exception as exc:  # pragma: no cover - catch-all for unexpected issues
+		if is_query_canceled(exc):
+			logger.warning("/ask hit statement_timeout: %s", request.query.value)
+			raise HTTPException(status_code=504, detail="Query timed out") from exc
 		logger.error("/ask failed: %s", exc, exc_info=True)
 		raise HTTPException(status_code=500, detail="Internal server error") from exc
 
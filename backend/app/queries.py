@@ -0,0 +1,199 @@
+"""Predefined, parameterized analytics query templates."""
+
+import os
+from datetime import date
+from enum import Enum
+from typing import Any, Dict, Tuple
+
+from fastapi import HTTPException
+
+
+# Set when orders/order_items use the monthly partitioned layout
+# (db/schema_partitioned.sql), where order_items carries order_date.
+PARTITIONED_SCHEMA = os.getenv("DB_PARTITIONED_SCHEMA", "0") == "1"
+
+
+class QueryType(str, Enum):
+	TOP_PRODUCTS_LAST_90_DAYS = "top_products_last_90_days"
+	MONTHLY_REVENUE_LAST_12M = "monthly_revenue_last_12m"
+	REPEAT_PURCHASE_RATE = "repeat_purchase_rate"
+	AOV_BY_SEGMENT = "avg_order_value_by_segment"
+	TOP_CUSTOMERS_LTV = "top_customers_ltv"
+	TOP_PRODUCTS_BY_RANGE = "top_products_by_range"
+	TOP_CATEGORIES_BY_RANGE = "top_categories_by_range"
+	TOP_COUNTRIES_BY_RANGE = "top_countries_by_range"
+
+
+# Templates ranking revenue over an arbitrary [start, end) date window
+RANGE_QUERIES = (
+	QueryType.TOP_PRODUCTS_BY_RANGE,
+	QueryType.TOP_CATEGORIES_BY_RANGE,
+	QueryType.TOP_COUNTRIES_BY_RANGE,
+)
+
+
+def _order_date_window(condition: str) -> str:
+	"""
+	Apply a condition on the order date, written with a {date} placeholder.
+
+	On the partitioned layout the condition is repeated on oi.order_date so
+	the planner prunes order_items partitions as well as orders partitions.
+	The join itself stays on order_id alone: adding order_date to it makes
+	the planner multiply two correlated selectivities, underestimate the
+	join to a single row and pick a nested loop.
+	"""
+	clause = condition.format(date="o.order_date")
+	if PARTITIONED_SCHEMA:
+		clause += " AND " + condition.format(date="oi.order_date")
+	return clause
+
+
+def _validate_range(params: Dict[str, Any]) -> Dict[str, Any]:
+	"""Validate start/end ISO dates and limit for the range templates."""
+	try:
+		start = date.fromisoformat(params["start"])
+		end = date.fromisoformat(params["end"])
+	except (KeyError, TypeError, ValueError):
+		raise HTTPException(status_code=422, detail="start and end must be ISO dates (YYYY-MM-DD)")
+	if end <= start:
+		raise HTTPException(status_code=422, detail="end must be after start")
+	limit = params.get("limit", 10)
+	if not isinstance(limit, int) or limit < 1 or limit > 50:
+		raise HTTPException(status_code=422, detail="limit must be an integer between 1 and 50")
+	return {"start": start, "end": end, "limit": limit}
+
+
+def build_query(query: QueryType, params: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+	"""Return SQL template and validated parameters for the given query type."""
+
+	if query == QueryType.TOP_PRODUCTS_LAST_90_DAYS:
+		limit = params.get("limit", 5)
+		if not isinstance(limit, int) or limit < 1 or limit > 50:
+			raise HTTPException(status_code=422, detail="limit must be an integer between 1 and 50")
+		window = _order_date_window("{date} >= now() - INTERVAL '90 days'")
+		sql = (
+			f"""
+			SELECT p.product_id,
+				   p.name AS product_name,
+				   SUM(oi.quantity * oi.unit_price) AS revenue
+			FROM order_items oi
+			JOIN products p ON p.product_id = oi.product_id
+			JOIN orders o ON o.order_id = oi.order_id
+			WHERE {window}
+			GROUP BY p.product_id, p.name
+			ORDER BY revenue DESC
+			LIMIT :limit
+			"""
+		)
+		return sql, {"limit": limit}
+
+	if query == QueryType.MONTHLY_REVENUE_LAST_12M:
+		sql = (
+			"""
+			SELECT date_trunc('month', o.order_date) AS month,
+				   SUM(o.total_amount) AS revenue
+			FROM orders o
+			WHERE o.order_date >= date_trunc('month', now()) - INTERVAL '12 months'
+			GROUP BY 1
+			ORDER BY 1
+			"""
+		)
+		return sql, {}
+
+	if query == QueryType.REPEAT_PURCHASE_RATE:
+		sql = (
+			"""
+			SELECT COUNT(DISTINCT CASE WHEN order_count > 1 THEN customer_id END) * 1.0 /
+				   COUNT(DISTINCT customer_id) AS repeat_purchase_rate
+			FROM (
+				SELECT customer_id, COUNT(order_id) AS order_count
+				FROM orders
+				GROUP BY customer_id
+			) subquery
+			"""
+		)
+		return sql, {}
+
+	if query == QueryType.AOV_BY_SEGMENT:
+		sql = (
+			"""
+			SELECT c.is_premium,
+				   AVG(o.total_amount) AS avg_order_value
+			FROM customers c
+			JOIN orders o ON o.customer_id = c.customer_id
+			GROUP BY c.is_premium
+			"""
+		)
+		return sql, {}
+
+	if query == QueryType.TOP_CUSTOMERS_LTV:
+		limit = params.get("limit", 10)
+		if not isinstance(limit, int) or limit < 1 or limit > 100:
+			raise HTTPException(status_code=422, detail="limit must be an integer between 1 and 100")
+		sql = (
+			"""
+			SELECT c.customer_id,
+				   c.first_name || ' ' || c.last_name AS customer_name,
+				   SUM(o.total_amount) AS lifetime_value
+			FROM customers c
+			JOIN orders o ON o.customer_id = c.customer_id
+			GROUP BY c.customer_id, c.first_name, c.last_name
+			ORDER BY lifetime_value DESC
+			LIMIT :limit
+			"""
+		)
+		return sql, {"limit": limit}
+
+	if query == QueryType.TOP_PRODUCTS_BY_RANGE:
+		window = _order_date_window("{date} >= :start AND {date} < :end")
+		sql = (
+			f"""
+			SELECT p.product_id,
+				   p.name AS product_name,
+				   SUM(oi.quantity * oi.unit_price) AS revenue
+			FROM order_items oi
+			JOIN products p ON p.product_id = oi.product_id
+			JOIN orders o ON o.order_id = oi.order_id
+			WHERE {window}
+			GROUP BY p.product_id, p.name
+			ORDER BY revenue DESC
+			LIMIT :limit
+			"""
+		)
+		return sql, _validate_range(params)
+
+	if query == QueryType.TOP_CATEGORIES_BY_RANGE:
+		window = _order_date_window("{date} >= :start AND {date} < :end")
+		sql = (
+			f"""
+			SELECT p.category,
+				   SUM(oi.quantity * oi.unit_price) AS revenue
+			FROM order_items oi
+			JOIN products p ON p.product_id = oi.product_id
+			JOIN orders o ON o.order_id = oi.order_id
+			WHERE {window}
+			GROUP BY p.category
+			ORDER BY revenue DESC
+			LIMIT :limit
+			"""
+		)
+		return sql, _validate_range(params)
+
+	if query == QueryType.TOP_COUNTRIES_BY_RANGE:
+		window = _order_date_window("{date} >= :start AND {date} < :end")
+		sql = (
+			f"""
+			SELECT c.country,
+				   SUM(oi.quantity * oi.unit_price) AS revenue
+			FROM order_items oi
+			JOIN orders o ON o.order_id = oi.order_id
+			JOIN customers c ON c.customer_id = o.customer_id
+			WHERE {window}
+			GROUP BY c.country
+			ORDER BY revenue DESC
+			LIMIT :limit
+			"""
+		)
+		return sql, _validate_range(params)
+
+	raise HTTPException(status_code=400, detail="Unsupported query type")
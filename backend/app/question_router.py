@@ -0,0 +1,349 @@
+"""
+Route analytics questions to query templates without the LLM.
+
+Questions such as "what were our top products last quarter?" are answered
+far better by a template query than by RAG over docs/reports. The router
+embeds the question, compares it with exemplar phrasings for each QueryType
+and with a set of documentation questions, and accepts the best template
+when it is similar enough and clearly ahead of every other class. Dates and
+"top N" are then read from the question itself: "last quarter", "past 30
+days", "Q2 2025", "March 2025", "this year" and so on.
+
+A question is only routed when the template can answer it as asked; one
+that names a period for a template without a date window, for example,
+falls through to the RAG path.
+"""
+
+import calendar
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Any, Callable
+
+from .queries import RANGE_QUERIES, QueryType
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Cosine similarity to the nearest exemplar a question needs to be routed
+ROUTER_THRESHOLD = float(os.getenv("RAG_ROUTER_THRESHOLD", "0.75"))
+# ...and how far it must be ahead of the nearest exemplar of any other class
+ROUTER_MARGIN = float(os.getenv("RAG_ROUTER_MARGIN", "0.05"))
+
+EXEMPLARS: dict[QueryType, tuple[str, ...]] = {
+    QueryType.TOP_PRODUCTS_LAST_90_DAYS: (
+        "What are our top products?",
+        "Which products sell best right now?",
+        "Best selling products recently",
+        "Top 5 products by revenue in the last 90 days",
+        "Which items bring in the most revenue lately?",
+        "What are the highest grossing products at the moment?",
+    ),
+    QueryType.TOP_PRODUCTS_BY_RANGE: (
+        "What were our top products last quarter?",
+        "Best selling products in March 2025",
+        "Top 10 products by revenue between January and June",
+        "Which products made the most money last year?",
+        "Highest revenue products in Q2 2025",
+    ),
+    QueryType.TOP_CATEGORIES_BY_RANGE: (
+        "What are our top categories?",
+        "Which product categories made the most revenue last quarter?",
+        "Best selling categories this year",
+        "Revenue by category last month",
+        "Which category sells the most?",
+    ),
+    QueryType.TOP_COUNTRIES_BY_RANGE: (
+        "Which countries buy the most?",
+        "Top countries by revenue last quarter",
+        "Where do most of our sales come from geographically?",
+        "Revenue by country this year",
+        "What are our best markets by country?",
+    ),
+    QueryType.MONTHLY_REVENUE_LAST_12M: (
+        "What is our monthly revenue?",
+        "How has revenue trended over the past year?",
+        "Show revenue by month for the last 12 months",
+        "How much did we sell each month?",
+        "Monthly sales trend",
+    ),
+    QueryType.REPEAT_PURCHASE_RATE: (
+        "What is our repeat purchase rate?",
+        "How many customers come back to buy again?",
+        "What share of customers order more than once?",
+        "Customer retention rate for purchases",
+        "What percentage of buyers are repeat customers?",
+    ),
+    QueryType.AOV_BY_SEGMENT: (
+        "What is the average order value by segment?",
+        "Do premium customers spend more per order?",
+        "Average basket size for premium vs regular customers",
+        "AOV for premium and non-premium customers",
+        "How much does a typical order cost by customer type?",
+    ),
+    QueryType.TOP_CUSTOMERS_LTV: (
+        "Who are our most valuable customers?",
+        "Top customers by lifetime value",
+        "Which customers have spent the most overall?",
+        "List our biggest spenders",
+        "Top 20 customers by total spend",
+    ),
+}
+
+# Questions the knowledge base answers; winning here means "do not route"
+DOCUMENT_EXEMPLARS: tuple[str, ...] = (
+    "What is your return policy?",
+    "How long does shipping take?",
+    "How do I track my order?",
+    "How are refunds issued?",
+    "Do you ship internationally?",
+    "How do I reset my password?",
+    "How do I contact customer support?",
+    "What does the monthly insights report say about customer satisfaction?",
+    "Can I change my order after placing it?",
+    "What payment methods do you accept?",
+    "How do I set up the product?",
+    "What are common complaints in support tickets?",
+)
+
+# Templates whose rows are ranked and take a limit
+_LIMITED = (QueryType.TOP_PRODUCTS_LAST_90_DAYS, QueryType.TOP_CUSTOMERS_LTV, *RANGE_QUERIES)
+# Templates with a built-in trailing window, in days
+_FIXED_WINDOWS = {QueryType.TOP_PRODUCTS_LAST_90_DAYS: 90, QueryType.MONTHLY_REVENUE_LAST_12M: 365}
+DEFAULT_WINDOW_DAYS = 90
+
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_MONTH_RE = "|".join(sorted(_MONTHS, key=len, reverse=True))
+_UNITS = {"day": 1, "week": 7, "month": 30, "quarter": 91, "year": 365}
+
+_LIMIT_RE = re.compile(r"\b(?:top|best|biggest|largest)\s+(\d{1,3})\b")
+_TRAILING_RE = re.compile(r"\b(?:(?:last|past|previous|prior)\s+(\d{1,3})|past)\s+(day|week|month|quarter|year)s?\b")
+_PREVIOUS_RE = re.compile(r"\b(?:last|previous|prior)\s+(week|month|quarter|year)\b")
+_CURRENT_RE = re.compile(r"\b(?:this|current)\s+(week|month|quarter|year)\b|\b(week|month|quarter|year)[- ]to[- ]date\b|\bytd\b")
+_QUARTER_RE = re.compile(r"\bq([1-4])\s*(?:of\s+)?(\d{4})\b")
+_MONTH_YEAR_RE = re.compile(rf"\b({_MONTH_RE})\.?\s+(\d{{4}})\b")
+_YEAR_RE = re.compile(r"\b(?:in|during|for|of)\s+(\d{4})\b")
+# Time references extract_period does not resolve; "by month" is a grouping, not a period
+_PERIOD_HINT_RE = re.compile(
+    r"\b(?:since|between|until|ago|yesterday|today|season|\d{4}"
+    r"|january|february|march|april|june|july|august|september|october|november|december)\b"
+    r"|(?<!by )(?<!per )(?<!each )(?<!every )\b(?:day|week|month|quarter|year)s?\b"
+)
+
+
+@dataclass
+class Route:
+    """A question resolved to a template and its parameters."""
+
+    query: QueryType
+    params: dict[str, Any] = field(default_factory=dict)
+    confidence: float = 0.0
+
+
+def _add_months(day: date, months: int) -> date:
+    month = day.month - 1 + months
+    year = day.year + month // 12
+    return date(year, month % 12 + 1, min(day.day, calendar.monthrange(year, month % 12 + 1)[1]))
+
+
+def _period_start(today: date, unit: str) -> date:
+    if unit == "week":
+        return today - timedelta(days=today.weekday())
+    if unit == "month":
+        return today.replace(day=1)
+    if unit == "quarter":
+        return date(today.year, (today.month - 1) // 3 * 3 + 1, 1)
+    return date(today.year, 1, 1)
+
+
+def _period_end(start: date, unit: str) -> date:
+    """Return the exclusive end of the calendar period starting at start."""
+    if unit == "week":
+        return start + timedelta(days=7)
+    return _add_months(start, {"month": 1, "quarter": 3, "year": 12}[unit])
+
+
+def extract_period(question: str, today: date | None = None) -> tuple[date, date] | None:
+    """
+    Return the [start, end) date window a question asks about, if any.
+
+    Trailing periods ("past 30 days", "past year") end today; "last
+    quarter" is the previous calendar quarter and "this year" runs from
+    its start to today; "Q2 2025", "March 2025" and "in 2024" are read
+    as written.
+    """
+    text = question.lower()
+    today = today or date.today()
+    tomorrow = today + timedelta(days=1)
+
+    if match := _TRAILING_RE.search(text):
+        count, unit = int(match.group(1) or 1), match.group(2)
+        if unit in ("day", "week"):
+            return tomorrow - timedelta(days=count * _UNITS[unit]), tomorrow
+        months = count * {"month": 1, "quarter": 3, "year": 12}[unit]
+        return _add_months(tomorrow, -months), tomorrow
+    if match := _PREVIOUS_RE.search(text):
+        unit = match.group(1)
+        end = _period_start(today, unit)
+        return _period_start(end - timedelta(days=1), unit), end
+    if match := _CURRENT_RE.search(text):
+        return _period_start(today, match.group(1) or match.group(2) or "year"), tomorrow
+    if match := _QUARTER_RE.search(text):
+        start = date(int(match.group(2)), (int(match.group(1)) - 1) * 3 + 1, 1)
+        return start, _period_end(start, "quarter")
+    if match := _MONTH_YEAR_RE.search(text):
+        start = date(int(match.group(2)), _MONTHS[match.group(1)], 1)
+        return start, _period_end(start, "month")
+    if match := _YEAR_RE.search(text):
+        start = date(int(match.group(1)), 1, 1)
+        return start, _period_end(start, "year")
+    return None
+
+
+def extract_limit(question: str) -> int | None:
+    """Return N from "top N" style phrasing, if present."""
+    match = _LIMIT_RE.search(question.lower())
+    return int(match.group(1)) if match else None
+
+
+def _is_fixed_window(query: QueryType, period: tuple[date, date], today: date) -> bool:
+    """True when period is (about) the trailing window the template always uses."""
+    window = _FIXED_WINDOWS.get(query)
+    start, end = period
+    return window is not None and end == today + timedelta(days=1) and abs((end - start).days - window) <= 7
+
+
+def resolve_params(query: QueryType, question: str, today: date | None = None) -> Route | None:
+    """
+    Pick the template variant and parameters that answer question as asked.
+
+    Returns None when the question names a period the template cannot
+    apply (or one that is not understood), so the caller can fall back
+    to another path rather than answer a different question.
+    """
+    today = today or date.today()
+    period = extract_period(question, today)
+    if period is None and _PERIOD_HINT_RE.search(question.lower()):
+        return None
+
+    # "Top products" over its own 90 days is the 90-day template, otherwise the range one
+    if query in (QueryType.TOP_PRODUCTS_LAST_90_DAYS, QueryType.TOP_PRODUCTS_BY_RANGE):
+        fixed = period is None or _is_fixed_window(QueryType.TOP_PRODUCTS_LAST_90_DAYS, period, today)
+        query = QueryType.TOP_PRODUCTS_LAST_90_DAYS if fixed else QueryType.TOP_PRODUCTS_BY_RANGE
+
+    params: dict[str, Any] = {}
+    if query in RANGE_QUERIES:
+        if period is None:
+            end = today + timedelta(days=1)
+            period = end - timedelta(days=DEFAULT_WINDOW_DAYS), end
+        params = {"start": period[0].isoformat(), "end": period[1].isoformat()}
+    elif period is not None and not _is_fixed_window(query, period, today):
+        return None
+
+    limit = extract_limit(question)
+    if limit is not None:
+        if query not in _LIMITED:
+            return None
+        params["limit"] = limit
+    return Route(query=query, params=params)
+
+
+class QuestionRouter:
+    """
+    Nearest-exemplar classifier from questions to query templates.
+
+    Exemplars are embedded once, on first use, with the same embed callable
+    as the questions, so the router works with whichever embedding model the
+    vector store is searched with.
+
+    Args:
+        embed: Callable mapping a list of texts to an array of embeddings
+        threshold: Minimum cosine similarity to the best template exemplar
+        margin: Minimum lead over the best exemplar of any other class,
+            documentation questions included
+    """
+
+    def __init__(
+        self,
+        embed: Callable[[list[str]], Any],
+        threshold: float = ROUTER_THRESHOLD,
+        margin: float = ROUTER_MARGIN,
+    ):
+        self._embed = embed
+        self.threshold = threshold
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._exemplars: "np.ndarray | None" = None
+        self._labels: list[QueryType | None] = []
+
+    def embed(self, texts: list[str]) -> "np.ndarray":
+        # Imported here so importing the API does not load NumPy
+        import numpy as np
+
+        embeddings = np.asarray(self._embed(texts), dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1, norms)
+
+    def _load(self) -> "np.ndarray":
+        if self._exemplars is None:
+            with self._lock:
+                if self._exemplars is None:
+                    texts, labels = [], []
+                    for query, phrasings in EXEMPLARS.items():
+                        texts.extend(phrasings)
+                        labels.extend([query] * len(phrasings))
+                    texts.extend(DOCUMENT_EXEMPLARS)
+                    labels.extend([None] * len(DOCUMENT_EXEMPLARS))
+                    self._labels = labels
+                    self._exemplars = self.embed(texts)
+        return self._exemplars
+
+    def classify(self, embedding: "np.ndarray") -> tuple[QueryType | None, float, float]:
+        """
+        Score a normalised question embedding against every class.
+
+        Returns:
+            The best class (None for documentation questions), its score and
+            the best score of any other class
+        """
+        scores = self._load() @ embedding
+        best: dict[QueryType | None, float] = {}
+        for label, score in zip(self._labels, scores.tolist()):
+            if score > best.get(label, -1.0):
+                best[label] = score
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        label, score = ranked[0]
+        return label, score, ranked[1][1] if len(ranked) > 1 else -1.0
+
+    def route(self, question: str, embedding: "np.ndarray | None" = None, today: date | None = None) -> Route | None:
+        """
+        Return the template route for question, or None to use RAG.
+
+        Args:
+            question: User question
+            embedding: Question embedding, if already computed
+            today: Date relative periods are resolved against
+        """
+        embedding = self.embed([question])[0] if embedding is None else _normalise(embedding)
+        label, score, runner_up = self.classify(embedding)
+        if label is None or score < self.threshold or score - runner_up < self.margin:
+            logger.debug("Not routing %r: best %s at %.3f, runner-up %.3f", question, label, score, runner_up)
+            return None
+        route = resolve_params(label, question, today)
+        if route is not None:
+            route.confidence = score
+        return route
+
+
+def _normalise(embedding) -> "np.ndarray":
+    import numpy as np
+
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -1,15 +1,25 @@
 """RAG (Retrieval-Augmented Generation) module for Smart Insights Assistant."""
 
-from .chunker import chunk_document
-from .embeddings import get_embeddings
-from .vectorstore import get_vectorstore, add_documents
-from .retriever import search, retrieve_context
-
-__all__ = [
-    "chunk_document",
-    "get_embeddings",
-    "get_vectorstore",
-    "add_documents",
-    "search",
-    "retrieve_context",
-]
+import importlib
+
+# Resolved on first access, so importing one submodule (as the API does)
+# does not load the chunker's langchain dependency or chromadb.
+_EXPORTS = {
+    "chunk_document": ".chunker",
+    "get_embeddings": ".embeddings",
+    "get_vectorstore": ".vectorstore",
+    "add_documents": ".vectorstore",
+    "search": ".retriever",
+    "search_batch": ".retriever",
+    "retrieve_context": ".retriever",
+    "IngestJobManager": ".jobs",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(importlib.import_module(module, __name__), name)
@@ -0,0 +1,201 @@
+"""
+Near-duplicate chunk detection with MinHash and locality-sensitive hashing.
+
+Each chunk is reduced to a set of word shingles and summarised by a MinHash
+signature, whose agreement rate between two chunks estimates the Jaccard
+similarity of their shingle sets. Signatures are split into bands; chunks
+that share any band bucket become candidates and are compared on the full
+signature, so a new chunk is checked against a handful of earlier chunks
+rather than all of them.
+
+With the defaults (128 permutations as 16 bands of 8 rows), pairs at
+Jaccard 0.8 collide in at least one band with probability ~0.94 and pairs
+at 0.5 with probability ~0.06; the signature comparison then applies the
+actual threshold.
+"""
+
+import hashlib
+import re
+
+import numpy as np
+
+_MAX_HASH = (1 << 32) - 1
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 5) -> set[str]:
+    """Return the lower-cased word size-grams of text (the whole text if shorter)."""
+    tokens = _TOKEN_RE.findall(text.lower())
+    if len(tokens) <= size:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed, seeded set of permutations."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: the top 32 bits of (a * x + b) mod 2^64,
+        # with odd a, form a universal family and vectorise in uint64
+        self._a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.num_perm = num_perm
+
+    def signature(self, features: set[str]) -> np.ndarray:
+        if not features:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint64)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=4).digest(), "little") for f in features),
+            dtype=np.uint64,
+            count=len(features),
+        )
+        permuted = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return permuted.min(axis=0)
+
+
+class NearDuplicateIndex:
+    """
+    Incremental index answering "is this chunk a near duplicate of one seen before?".
+
+    Args:
+        threshold: Estimated Jaccard similarity at or above which two chunks
+            are duplicates
+        num_perm: MinHash signature length; must be divisible by bands
+        bands: LSH bands; more bands find lower-similarity candidates
+        shingle_size: Words per shingle
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16, shingle_size: int = 5):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self._hasher = MinHasher(num_perm)
+        self._rows = num_perm // bands
+        self._buckets: list[dict[bytes, list[str]]] = [{} for _ in range(bands)]
+        self._signatures: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _bands(self, signature: np.ndarray) -> list[bytes]:
+        return [
+            signature[i * self._rows:(i + 1) * self._rows].tobytes()
+            for i in range(len(self._buckets))
+        ]
+
+    def add(self, key: str, text: str) -> str | None:
+        """
+        Register a chunk unless it duplicates one already indexed.
+
+        Returns:
+            Key of the earlier, canonical chunk if text is a near duplicate
+            (the chunk is then not indexed), otherwise None
+        """
+        signature = self._hasher.signature(shingles(text, self.shingle_size))
+        bands = self._bands(signature)
+
+        best, best_score = None, self.threshold
+        seen = set()
+        for bucket, band in zip(self._buckets, bands):
+            for candidate in bucket.get(band, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                score = float(np.mean(self._signatures[candidate] == signature))
+                if score >= best_score:
+                    best, best_score = candidate, score
+        if best is not None:
+            return best
+
+        self._signatures[key] = signature
+        for bucket, band in zip(self._buckets, bands):
+            bucket.setdefault(band, []).append(key)
+        return None
+
+    def remove(self, key: str) -> None:
+        """Forget an indexed chunk, e.g. one whose write failed."""
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for bucket, band in zip(self._buckets, self._bands(signature)):
+            keys = bucket.get(band)
+            if keys is not None and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del bucket[band]
+
+
+class ChunkDeduplicator:
+    """
+    Drops near-duplicate chunks during ingestion, keeping the first as canonical.
+
+    Every kept chunk gets a "sources" list in its metadata; when a later
+    chunk duplicates it, that chunk's source is appended to the canonical
+    chunk's list instead of the chunk being stored. Canonical metadata is
+    kept in memory, so use one deduplicator per ingestion run.
+
+    filter() stages its changes: call commit() once the kept chunks are
+    stored, or rollback() if the write failed, so later chunks are never
+    dropped in favour of a canonical that was not written.
+    """
+
+    def __init__(self, index: NearDuplicateIndex | None = None):
+        self.index = index or NearDuplicateIndex()
+        self.dropped = 0
+        self._metadatas: dict[str, dict] = {}
+        self._changed: set[str] = set()
+        # Staged by filter(): new canonicals, (canonical, source, was changed) appends, drops
+        self._pending_keys: list[str] = []
+        self._pending_sources: list[tuple[str, str, bool]] = []
+        self._pending_dropped = 0
+
+    def filter(self, ids: list[str], chunks: list[str], metadatas: list[dict]) -> tuple[list[str], list[str], list[dict]]:
+        """Return the ids, chunks and metadatas that are not near duplicates."""
+        kept: tuple[list[str], list[str], list[dict]] = ([], [], [])
+        for chunk_id, chunk, metadata in zip(ids, chunks, metadatas):
+            canonical = self.index.add(chunk_id, chunk)
+            if canonical is None:
+                metadata["sources"] = [metadata["source"]]
+                self._metadatas[chunk_id] = metadata
+                self._pending_keys.append(chunk_id)
+                kept[0].append(chunk_id)
+                kept[1].append(chunk)
+                kept[2].append(metadata)
+                continue
+            self._pending_dropped += 1
+            sources = self._metadatas[canonical]["sources"]
+            if metadata["source"] not in sources:
+                sources.append(metadata["source"])
+                self._pending_sources.append((canonical, metadata["source"], canonical in self._changed))
+                self._changed.add(canonical)
+        return kept
+
+    def commit(self) -> None:
+        """Keep what the last filter() staged; its chunks were stored."""
+        self.dropped += self._pending_dropped
+        self._pending_keys, self._pending_sources, self._pending_dropped = [], [], 0
+
+    def rollback(self) -> None:
+        """Undo what the last filter() staged; its chunks were not stored."""
+        new = set(self._pending_keys)
+        for canonical, source, was_changed in reversed(self._pending_sources):
+            if canonical in new:
+                continue
+            self._metadatas[canonical]["sources"].remove(source)
+            if not was_changed:
+                self._changed.discard(canonical)
+        for key in self._pending_keys:
+            self.index.remove(key)
+            del self._metadatas[key]
+        self._pending_keys, self._pending_sources, self._pending_dropped = [], [], 0
+
+    def flush(self, collection) -> int:
+        """Write source lists that grew after their chunk was stored; returns the count."""
+        if not self._changed:
+            return 0
+        ids = sorted(self._changed)
+        collection.update(ids=ids, metadatas=[self._metadatas[i] for i in ids])
+        self._changed.clear()
+        return len(ids)
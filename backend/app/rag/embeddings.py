@@ -1,26 +1,327 @@
 """Embedding generation utilities."""
 
+import concurrent.futures
+import hashlib
+import itertools
+import logging
 import os
-from typing import Literal
+import queue
+import re
+import threading
+import time
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Literal
+
+if TYPE_CHECKING:
+    import numpy as np
 
 # Optional: for local embeddings without API costs
 # from sentence_transformers import SentenceTransformer
 
 
-EmbeddingModel = Literal["openai", "local"]
+logger = logging.getLogger(__name__)
+
+EmbeddingModel = Literal["openai", "local", "stub"]
+
+# Local backend configuration
+LOCAL_MODEL_NAME = os.getenv("EMBEDDING_LOCAL_MODEL", "all-MiniLM-L6-v2")
+LOCAL_NUM_THREADS = int(os.getenv("EMBEDDING_NUM_THREADS", "0"))      # 0 = torch default
+LOCAL_NUM_PROCESSES = int(os.getenv("EMBEDDING_NUM_PROCESSES", "1"))  # >1 = multi-process pool
+LOCAL_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+LOCAL_MAX_WAIT_MS = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+# Seconds a local embedding request may wait for the next of its chunks
+LOCAL_SUBMIT_TIMEOUT = float(os.getenv("EMBEDDING_SUBMIT_TIMEOUT", "60"))
+
+# MicroBatcher lanes: query embeddings go ahead of queued ingestion batches
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+# Stub backend: hashed bag of words, for running ingestion and search offline
+STUB_DIM = int(os.getenv("EMBEDDING_STUB_DIM", "384"))
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def stub_embeddings(texts: list[str], dim: int = STUB_DIM) -> "np.ndarray":
+    """
+    Deterministic, dependency-free embeddings for local development and tests.
+    
+    Each lower-cased word is hashed (blake2b, so values are stable across
+    processes) to a signed dimension; vectors are L2-normalised. Texts that
+    share words are close, which is enough to exercise ingestion and search
+    end to end, but carries no semantics.
+    """
+    # NumPy is imported where it is used, so importing this module stays cheap
+    import numpy as np
+
+    embeddings = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for token in _TOKEN_RE.findall(text.lower()):
+            digest = int.from_bytes(hashlib.blake2b(token.encode(), digest_size=8).digest(), "little")
+            embeddings[row, digest % dim] += 1.0 if digest >> 63 else -1.0
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.where(norms > 0, norms, 1.0)
+
+
+class LocalModelPool:
+    """
+    Process-wide, preloaded sentence transformer with optional CPU parallelism.
+    
+    The model is loaded once and shared by every EmbeddingService. With
+    num_processes > 1 encoding is spread over a sentence-transformers
+    multi-process pool; otherwise a single model runs with num_threads
+    intra-op threads.
+    """
+    
+    def __init__(
+        self,
+        model_name: str = LOCAL_MODEL_NAME,
+        num_threads: int = LOCAL_NUM_THREADS,
+        num_processes: int = LOCAL_NUM_PROCESSES,
+        batch_size: int = LOCAL_BATCH_SIZE,
+    ):
+        self.model_name = model_name
+        self.num_threads = num_threads
+        self.num_processes = num_processes
+        self.batch_size = batch_size
+        self._model = None
+        self._process_pool = None
+        self._lock = threading.Lock()
+    
+    def load(self):
+        """Load the model (and process pool) if not loaded yet."""
+        if self._model is not None:
+            return self._model
+        
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                
+                if self.num_threads > 0:
+                    import torch
+                    torch.set_num_threads(self.num_threads)
+                
+                start = time.perf_counter()
+                model = SentenceTransformer(self.model_name, device="cpu")
+                if self.num_processes > 1:
+                    self._process_pool = model.start_multi_process_pool(
+                        target_devices=["cpu"] * self.num_processes
+                    )
+                # Run one encode so lazy kernels are initialized before traffic
+                model.encode(["warm up"], convert_to_numpy=True)
+                self._model = model
+                logger.info(
+                    "Loaded local embedding model %s in %.1f ms",
+                    self.model_name, (time.perf_counter() - start) * 1000,
+                )
+        return self._model
+    
+    def encode(self, texts: list[str]) -> "np.ndarray":
+        """Encode texts into a float32 array of shape (len(texts), dim)."""
+        import numpy as np
+
+        model = self.load()
+        if self._process_pool is not None and len(texts) > self.batch_size:
+            embeddings = model.encode_multi_process(texts, self._process_pool, batch_size=self.batch_size)
+        else:
+            embeddings = model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+        return np.asarray(embeddings, dtype=np.float32)
+    
+    def close(self) -> None:
+        """Stop the process pool, if any, and drop the model."""
+        with self._lock:
+            if self._process_pool is not None:
+                from sentence_transformers import SentenceTransformer
+                SentenceTransformer.stop_multi_process_pool(self._process_pool)
+                self._process_pool = None
+            self._model = None
+
+
+class MicroBatcher:
+    """
+    Group concurrent embedding requests into shared model calls.
+    
+    Callers block in submit() while a background thread drains the queue,
+    waiting up to max_wait_ms for more requests to arrive (or until
+    max_batch_size texts are pending), encodes the whole group at once and
+    hands each caller its slice of the result.
+    
+    The queue is ordered by priority: interactive (query) requests go ahead
+    of queued background (ingestion) requests, and background requests are
+    split into chunks of max_batch_size texts per pool process, so a query
+    waits for at most the chunk being encoded rather than a whole batch.
+    """
+    
+    def __init__(
+        self,
+        pool: LocalModelPool,
+        max_batch_size: int = LOCAL_BATCH_SIZE,
+        max_wait_ms: float = LOCAL_MAX_WAIT_MS,
+        timeout: float = LOCAL_SUBMIT_TIMEOUT,
+    ):
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.timeout = timeout
+        # (priority, sequence, texts, future); the sequence keeps FIFO order within a priority
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+    
+    def submit(self, texts: list[str], priority: int = PRIORITY_INTERACTIVE) -> "np.ndarray":
+        """
+        Embed texts, sharing the model call with concurrent submitters.
+        
+        Raises:
+            RuntimeError: If the batcher is closed, or closes before the texts are embedded
+            TimeoutError: If a chunk of the texts waits longer than timeout seconds
+        """
+        import numpy as np
+
+        texts = list(texts)
+        step = len(texts)
+        if priority != PRIORITY_INTERACTIVE:
+            step = self.max_batch_size * max(1, self.pool.num_processes)
+        chunks = [texts[i:i + step] for i in range(0, len(texts), step)] if texts else [texts]
+
+        futures: list[Future] = []
+        # Under the lock so nothing is queued behind close()'s sentinel
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            for chunk in chunks:
+                future: Future = Future()
+                self._queue.put((priority, next(self._sequence), chunk, future))
+                futures.append(future)
+
+        parts = []
+        try:
+            for future in futures:
+                parts.append(future.result(timeout=self.timeout))
+        except concurrent.futures.TimeoutError:
+            for future in futures:
+                future.cancel()
+            raise TimeoutError(f"Local embedding of {len(texts)} texts timed out after {self.timeout:g} s") from None
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+    
+    def close(self) -> None:
+        """Stop the background worker and fail requests still queued."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Sorts ahead of every request
+            self._queue.put((-1, next(self._sequence), None, None))
+        self._worker.join(timeout=5)
+        self._fail_pending()
+    
+    def _fail_pending(self) -> None:
+        while True:
+            try:
+                _, _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if future is not None and future.set_running_or_notify_cancel():
+                future.set_exception(RuntimeError("MicroBatcher is closed"))
+    
+    def _collect(self) -> list[tuple[list[str], Future]] | None:
+        """Next group of requests, or None once the close sentinel is reached."""
+        batch: list[tuple[list[str], Future]] = []
+        pending = 0
+        deadline = None
+        while pending < self.max_batch_size:
+            try:
+                if deadline is None:
+                    item = self._queue.get()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            _, _, texts, future = item
+            if future is None:
+                # Close: serve what is already taken, the rest fails
+                self._queue.put(item)
+                return batch or None
+            if not future.set_running_or_notify_cancel():
+                # Its submitter timed out while it was queued
+                continue
+            batch.append((texts, future))
+            pending += len(texts)
+            if deadline is None:
+                deadline = time.monotonic() + self.max_wait
+        return batch
+    
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if batch is None:
+                self._fail_pending()
+                return
+            
+            texts = [text for request_texts, _ in batch for text in request_texts]
+            try:
+                embeddings = self.pool.encode(texts)
+            except Exception as exc:
+                for _, future in batch:
+                    future.set_exception(exc)
+            else:
+                offset = 0
+                for request_texts, future in batch:
+                    future.set_result(embeddings[offset:offset + len(request_texts)])
+                    offset += len(request_texts)
+
+
+_local_pool: LocalModelPool | None = None
+_local_batcher: MicroBatcher | None = None
+_local_lock = threading.Lock()
+
+
+def get_local_batcher() -> MicroBatcher:
+    """Return the process-wide micro-batcher over the shared local model."""
+    global _local_pool, _local_batcher
+    if _local_batcher is None:
+        with _local_lock:
+            if _local_batcher is None:
+                _local_pool = LocalModelPool()
+                _local_batcher = MicroBatcher(_local_pool)
+    return _local_batcher
+
+
+def preload_local_model() -> None:
+    """Load the shared local model so the first request does not pay for it."""
+    get_local_batcher().pool.load()
+
+
+def close_local_model() -> None:
+    """Stop the micro-batcher and release the shared local model."""
+    global _local_pool, _local_batcher
+    with _local_lock:
+        if _local_batcher is not None:
+            _local_batcher.close()
+            _local_pool.close()
+        _local_pool = None
+        _local_batcher = None
 
 
 class EmbeddingService:
     """Service for generating text embeddings."""
     
-    def __init__(self, model_type: EmbeddingModel = "openai"):
+    def __init__(self, model_type: EmbeddingModel = "openai", priority: int = PRIORITY_INTERACTIVE):
         """
         Initialize the embedding service.
         
         Args:
-            model_type: Type of embedding model to use ("openai" or "local")
+            model_type: Type of embedding model to use ("openai", "local" or "stub")
+            priority: Lane on the shared local model; ingestion passes
+                PRIORITY_BACKGROUND so queries are embedded first
         """
         self.model_type = model_type
+        self.priority = priority
         self._model = None
         self._client = None
     
@@ -35,11 +336,9 @@ class EmbeddingService:
         self._client = OpenAI(api_key=api_key)
     
     def _init_local(self):
-        """Initialize local sentence transformer model."""
-        from sentence_transformers import SentenceTransformer
-        
+        """Attach to the shared, preloaded local sentence transformer."""
         # all-MiniLM-L6-v2 is a good balance of speed and quality
-        self._model = SentenceTransformer("all-MiniLM-L6-v2")
+        self._model = get_local_batcher()
     
     def embed_text(self, text: str) -> list[float]:
         """
@@ -65,8 +364,31 @@ class EmbeddingService:
         """
         if self.model_type == "openai":
             return self._embed_openai(texts)
+        elif self.model_type == "stub":
+            return stub_embeddings(texts).tolist()
         else:
-            return self._embed_local(texts)
+            return self._embed_local(texts).tolist()
+    
+    def embed_array(self, texts: list[str]) -> "np.ndarray":
+        """
+        Generate embeddings for multiple texts as a NumPy array.
+        
+        Prefer this over embed_texts when the result goes straight to the
+        vector store: the local backend skips the list conversion entirely.
+        
+        Args:
+            texts: List of texts to embed
+            
+        Returns:
+            float32 array of shape (len(texts), dim)
+        """
+        if self.model_type == "openai":
+            import numpy as np
+
+            return np.asarray(self._embed_openai(texts), dtype=np.float32)
+        if self.model_type == "stub":
+            return stub_embeddings(texts)
+        return self._embed_local(texts)
     
     def _embed_openai(self, texts: list[str]) -> list[list[float]]:
         """Generate embeddings using OpenAI API."""
@@ -80,13 +402,12 @@ class EmbeddingService:
         
         return [item.embedding for item in response.data]
     
-    def _embed_local(self, texts: list[str]) -> list[list[float]]:
+    def _embed_local(self, texts: list[str]) -> "np.ndarray":
         """Generate embeddings using local model."""
         if self._model is None:
             self._init_local()
         
-        embeddings = self._model.encode(texts)
-        return embeddings.tolist()
+        return self._model.submit(texts, priority=self.priority)
 
 
 # Convenience function
@@ -99,7 +420,7 @@ def get_embeddings(
     
     Args:
         texts: List of texts to embed
-        model_type: Type of embedding model ("openai" or "local")
+        model_type: Type of embedding model ("openai", "local" or "stub")
         
     Returns:
         List of embedding vectors
@@ -0,0 +1,319 @@
+"""
+Document ingestion and blue/green rebuilds of the knowledge base.
+
+A rebuild never touches the collection that is serving traffic: documents
+are ingested into a new versioned collection, which is validated (document
+count, self-retrieval of sampled chunks, optional sample questions and query
+latency) before the alias is flipped to it. The previous version is kept so
+requests that resolved it before the flip can finish, and older versions
+are dropped.
+"""
+
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+
+from .chunker import chunk_document
+from .dedup import ChunkDeduplicator
+from .embeddings import PRIORITY_BACKGROUND, EmbeddingService
+from .tickets import TicketIngestStats, ingest_tickets
+from .vectorstore import (
+    DEFAULT_COLLECTION,
+    add_documents,
+    create_sharded_collection,
+    drop_collection,
+    get_vectorstore,
+    list_versions,
+    read_aliases,
+    set_alias,
+    version_name,
+)
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_EXTENSIONS = {".md", ".txt", ".html"}
+# Documents directly under docs_dir; others take their top-level subfolder
+DEFAULT_CATEGORY = "general"
+
+
+class CollectionValidationError(Exception):
+    """A rebuilt collection failed validation and was not published."""
+
+
+@dataclass
+class IngestStats:
+    files: int = 0
+    chunks: int = 0
+    duplicates: int = 0
+    failed: list[str] = field(default_factory=list)
+
+
+def load_document(filepath: Path) -> str:
+    """Load a document from file."""
+    return filepath.read_text(encoding="utf-8")
+
+
+def ingest_file(
+    collection,
+    filepath: Path,
+    chunk_size: int = 500,
+    embedder: EmbeddingService | None = None,
+    dedup: ChunkDeduplicator | None = None,
+    category: str = DEFAULT_CATEGORY,
+) -> int:
+    """Ingest a single file into the vector store and return the number of chunks stored."""
+    text = load_document(filepath)
+    chunks = chunk_document(text, chunk_size=chunk_size)
+
+    # Generate unique IDs and metadata for each chunk
+    ids = [f"{filepath.stem}_{i}" for i in range(len(chunks))]
+    metadatas = [
+        {
+            "source": str(filepath),
+            "filename": filepath.name,
+            "category": category,
+            "chunk_index": i,
+            "total_chunks": len(chunks),
+        }
+        for i in range(len(chunks))
+    ]
+    if dedup is None:
+        _store_chunks(collection, chunks, metadatas, ids, embedder)
+        return len(chunks)
+
+    ids, chunks, metadatas = dedup.filter(ids, chunks, metadatas)
+    try:
+        _store_chunks(collection, chunks, metadatas, ids, embedder)
+    except BaseException:
+        # Later duplicates must not fold into canonicals that were never written
+        dedup.rollback()
+        raise
+    dedup.commit()
+    return len(chunks)
+
+
+def _store_chunks(collection, chunks: list[str], metadatas: list[dict], ids: list[str], embedder) -> None:
+    if not chunks:
+        # Every chunk duplicated an earlier one (e.g. an article quoting a
+        # policy); Chroma rejects an empty add
+        return
+    # Local embeddings stay a NumPy array all the way into the collection
+    embeddings = embedder.embed_array(chunks) if embedder else None
+    add_documents(collection, chunks, metadatas, ids, embeddings)
+
+
+def list_documents(docs_dir: Path) -> list[Path]:
+    """Supported documents under docs_dir, in the order ingest_directory reads them."""
+    return [path for ext in sorted(SUPPORTED_EXTENSIONS) for path in sorted(docs_dir.rglob(f"*{ext}"))]
+
+
+def ingest_directory(
+    collection,
+    docs_dir: Path,
+    chunk_size: int = 500,
+    embedder: EmbeddingService | None = None,
+    dedup: bool = True,
+    on_file: Callable[[Path, IngestStats], None] | None = None,
+) -> IngestStats:
+    """
+    Ingest every supported document under docs_dir into a collection.
+
+    Each chunk's "category" is the top-level subfolder it came from (e.g.
+    policies, support_articles), the natural shard key. With dedup, chunks
+    that nearly duplicate an earlier chunk (quoted policy paragraphs,
+    boilerplate) are not stored; the canonical chunk lists every file it
+    appears in under "sources". Files that fail are logged and skipped;
+    they are listed in the result.
+
+    on_file, if given, is called after each file (ingested or failed) with
+    the running stats; it may sleep to throttle the run or raise to abort it.
+    """
+    stats = IngestStats()
+    deduplicator = ChunkDeduplicator() if dedup else None
+    for filepath in list_documents(docs_dir):
+        try:
+            parts = filepath.relative_to(docs_dir).parts
+            category = parts[0] if len(parts) > 1 else DEFAULT_CATEGORY
+            num_chunks = ingest_file(collection, filepath, chunk_size, embedder, deduplicator, category)
+        except Exception as e:
+            logger.error("Failed to ingest %s: %s", filepath, e)
+            stats.failed.append(str(filepath))
+        else:
+            stats.files += 1
+            stats.chunks += num_chunks
+            logger.info("Ingested %s: %d chunks", filepath, num_chunks)
+        if on_file is not None:
+            on_file(filepath, stats)
+    if deduplicator is not None:
+        stats.duplicates = deduplicator.dropped
+        deduplicator.flush(collection)
+        logger.info("Dropped %d near-duplicate chunks", stats.duplicates)
+    return stats
+
+
+def validate_collection(
+    collection,
+    expected_count: int,
+    sample_size: int = 20,
+    min_self_recall: float = 0.9,
+    max_p95_ms: float = 250.0,
+    questions: Iterable[str] = (),
+    embedder: EmbeddingService | None = None,
+) -> dict:
+    """
+    Check that a freshly built collection can serve traffic.
+
+    Sampled chunks are queried with their own stored embeddings and must come
+    back as the top hit (or an identical duplicate), which exercises the
+    index without an embedding model. Each sample question must return at
+    least one result, and the p95 of all these queries must stay within
+    max_p95_ms.
+
+    Raises:
+        CollectionValidationError: Listing every check that failed
+
+    Returns:
+        Dict with count, self_recall and p95_ms
+    """
+    problems = []
+    count = collection.count()
+    if count == 0:
+        problems.append("collection is empty")
+    elif count != expected_count:
+        problems.append(f"count is {count}, expected {expected_count}")
+
+    latencies: list[float] = []
+    hits = samples = 0
+    for offset in sorted({int(o) for o in np.linspace(0, max(count - 1, 0), min(sample_size, count))}):
+        sample = collection.get(limit=1, offset=offset, include=["embeddings"])
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1, include=["distances"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        samples += 1
+        if result["ids"][0] and (result["ids"][0][0] == sample["ids"][0] or result["distances"][0][0] < 1e-6):
+            hits += 1
+    self_recall = hits / samples if samples else 0.0
+    if samples and self_recall < min_self_recall:
+        problems.append(f"self-retrieval recall {self_recall:.2f} < {min_self_recall:.2f}")
+
+    for question in questions:
+        start = time.perf_counter()
+        if embedder is not None:
+            result = collection.query(query_embeddings=embedder.embed_array([question]), n_results=1)
+        else:
+            result = collection.query(query_texts=[question], n_results=1)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not result["ids"][0]:
+            problems.append(f"no results for {question!r}")
+
+    p95_ms = sorted(latencies)[math.ceil(0.95 * len(latencies)) - 1] if latencies else 0.0
+    if p95_ms > max_p95_ms:
+        problems.append(f"p95 query latency {p95_ms:.1f} ms > {max_p95_ms:.1f} ms")
+
+    if problems:
+        raise CollectionValidationError(f"{collection.name}: " + "; ".join(problems))
+    return {"count": count, "self_recall": self_recall, "p95_ms": p95_ms}
+
+
+def collect_garbage(persist_dir: str, alias: str, keep: int = 2) -> list[str]:
+    """
+    Drop all but the newest keep versions of an alias.
+
+    The live version is never dropped. Keep at least 2 so the version that was
+    live before the last flip survives requests still running against it.
+    """
+    live = read_aliases(persist_dir).get(alias)
+    versions = list_versions(persist_dir, alias)
+    stale = [name for name in versions[:-max(keep, 1)] if name != live]
+    for name in stale:
+        drop_collection(persist_dir, name)
+    return stale
+
+
+def rebuild_collection(
+    docs_dir: Path,
+    persist_dir: str = "./vectordb",
+    alias: str = DEFAULT_COLLECTION,
+    chunk_size: int = 500,
+    embedding: str = "chroma",
+    keep: int = 2,
+    questions: Iterable[str] = (),
+    max_p95_ms: float = 250.0,
+    db=None,
+    dedup: bool = True,
+    shard_by: str | None = None,
+    on_file: Callable[[Path, IngestStats], None] | None = None,
+    on_batch: Callable[[TicketIngestStats], None] | None = None,
+) -> dict:
+    """
+    Build a new version of an aliased collection and switch readers to it.
+
+    Args:
+        docs_dir: Directory containing documents
+        persist_dir: Directory of the vector database
+        alias: Alias readers resolve, e.g. "knowledge_base"
+        chunk_size: Size of text chunks
+        embedding: "chroma" to let the collection embed, "local" to use
+            the shared sentence-transformers model, or "stub" for offline
+            hashed embeddings
+        keep: Versions to retain after the flip, including the new one
+        questions: Sample questions that must return results
+        max_p95_ms: Query latency budget for validation
+        db: If given, support tickets are streamed from this DatabaseManager
+            into the new version as well
+        dedup: Drop near-duplicate document chunks
+        shard_by: Metadata key (e.g. "category") to shard the new version by
+        on_file: Per-file progress callback, see ingest_directory; raising
+            from it drops the new version
+        on_batch: Per-batch progress callback for the ticket stream, see
+            ingest_tickets; raising from it drops the new version
+
+    Raises:
+        CollectionValidationError: The new version was dropped and the
+            alias left unchanged
+
+    Returns:
+        Dict describing the new version, the previous one and dropped versions
+    """
+    embedder = EmbeddingService(model_type=embedding, priority=PRIORITY_BACKGROUND) if embedding in ("local", "stub") else None
+    name = version_name(alias)
+    if shard_by:
+        collection = create_sharded_collection(persist_dir, name, shard_by)
+    else:
+        collection = get_vectorstore(persist_dir, name)
+    logger.info("Building %s from %s", name, docs_dir)
+
+    start = time.perf_counter()
+    try:
+        stats = ingest_directory(collection, docs_dir, chunk_size, embedder, dedup, on_file)
+        ticket_chunks = 0
+        if db is not None:
+            ticket_chunks = ingest_tickets(
+                db, collection, persist_dir, on_batch, chunk_size=chunk_size, embedder=embedder
+            ).chunks
+        report = validate_collection(
+            collection, stats.chunks + ticket_chunks, questions=questions, max_p95_ms=max_p95_ms, embedder=embedder
+        )
+    except BaseException:
+        drop_collection(persist_dir, name)
+        raise
+
+    previous = set_alias(persist_dir, alias, name)
+    dropped = collect_garbage(persist_dir, alias, keep)
+    return {
+        "collection": name,
+        "previous": previous,
+        "dropped": dropped,
+        "files": stats.files,
+        "chunks": stats.chunks,
+        "duplicates": stats.duplicates,
+        "ticket_chunks": ticket_chunks,
+        "failed": stats.failed,
+        "build_seconds": time.perf_counter() - start,
+        **report,
+    }
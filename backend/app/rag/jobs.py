@@ -0,0 +1,374 @@
+"""
+Background ingestion jobs with progress reporting and latency-aware throttling.
+
+IngestJobManager runs document ingestion (a blue/green rebuild or an
+in-place add, see ingest.py), optionally followed by the support-ticket
+stream (tickets.py), on a small worker pool inside the serving process, so
+it can be submitted, watched and cancelled over the API.
+
+Throttling: serving records retrieval latencies (query embedding plus
+vector query, the part of a request ingestion competes with) in a
+LatencyWindow; end-to-end chat latency is dominated by the LLM and would
+hide the contention. After each file and each ticket batch a job asks the
+DutyCycleThrottle how long to pause. The throttle keeps a duty cycle, the
+share of wall time ingestion may spend working, which halves whenever the
+window's p95 is above target and recovers additively once it is
+comfortably below. Pauses come after every embedding and collection write,
+so they free both CPU (and the GIL) and the vector store's SQLite write
+lock for serving.
+
+Cancellation takes effect at the next file, ticket batch or pause. A
+cancelled rebuild drops its half-built version and leaves the alias
+unchanged; a cancelled in-place run keeps what it already added.
+"""
+
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+# Retrieval p95 (embedding + vector query) that ingestion must not push serving above
+INGEST_TARGET_P95_MS = float(os.getenv("INGEST_TARGET_P95_MS", "250"))
+INGEST_LATENCY_WINDOW_SECONDS = float(os.getenv("INGEST_LATENCY_WINDOW_SECONDS", "30"))
+# Lowest share of time a throttled job keeps working, so it always progresses
+INGEST_MIN_DUTY_CYCLE = float(os.getenv("INGEST_MIN_DUTY_CYCLE", "0.05"))
+# Finished jobs kept for status queries
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "50"))
+
+JOB_STATES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+
+class IngestCancelled(Exception):
+    """Raised inside a running job to stop it at the next file or ticket batch."""
+
+
+class LatencyWindow:
+    """Latencies observed over the last few seconds, for a rolling p95."""
+
+    def __init__(self, seconds: float = INGEST_LATENCY_WINDOW_SECONDS, min_samples: int = 5, max_samples: int = 4096):
+        self.seconds = seconds
+        self.min_samples = min_samples
+        self._samples: deque[tuple[float, float]] = deque(maxlen=max_samples)
+        self._lock = threading.Lock()
+
+    def observe(self, latency_ms: float) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), latency_ms))
+
+    def p95(self) -> float | None:
+        """p95 of the window, or None when there are too few samples to judge."""
+        cutoff = time.monotonic() - self.seconds
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            latencies = sorted(ms for _, ms in self._samples)
+        if len(latencies) < self.min_samples:
+            return None
+        return latencies[math.ceil(0.95 * len(latencies)) - 1]
+
+
+class DutyCycleThrottle:
+    """AIMD duty cycle for background work, steered by a serving latency target."""
+
+    def __init__(
+        self,
+        window: LatencyWindow,
+        target_p95_ms: float = INGEST_TARGET_P95_MS,
+        min_duty: float = INGEST_MIN_DUTY_CYCLE,
+        step: float = 0.1,
+    ):
+        self.window = window
+        self.target_p95_ms = target_p95_ms
+        self.min_duty = min_duty
+        self.step = step
+        self.duty = 1.0
+        self._lock = threading.Lock()
+
+    def pause_after(self, busy_seconds: float) -> float:
+        """
+        Update the duty cycle from the latest p95 and return the pause owed for busy_seconds of work.
+
+        With no recent traffic (p95 None) the duty cycle recovers as if under target.
+        """
+        p95 = self.window.p95()
+        with self._lock:
+            if p95 is not None and p95 > self.target_p95_ms:
+                self.duty = max(self.min_duty, self.duty / 2)
+            elif p95 is None or p95 < 0.8 * self.target_p95_ms:
+                self.duty = min(1.0, self.duty + self.step)
+            duty = self.duty
+        return busy_seconds * (1 - duty) / duty
+
+
+@dataclass
+class IngestJob:
+    """State and progress of one ingestion job."""
+
+    id: str
+    docs_dir: str
+    mode: str
+    persist_dir: str
+    alias: str
+    chunk_size: int = 500
+    embedding: str = "chroma"
+    dedup: bool = True
+    shard_by: str | None = None
+    tickets: bool = False
+    status: str = "queued"
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    files_total: int = 0
+    files_done: int = 0
+    files_failed: list[str] = field(default_factory=list)
+    chunks: int = 0
+    tickets_done: int = 0
+    paused_seconds: float = 0.0
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    cancel_event: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def to_dict(self) -> dict[str, Any]:
+        """Status document with throughput and an ETA derived from progress so far."""
+        end = self.finished_at or time.time()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        files_per_second = self.files_done / elapsed if elapsed > 0 else 0.0
+        remaining = self.files_total - self.files_done
+        eta = remaining / files_per_second if self.status == "running" and files_per_second > 0 else None
+        return {
+            "id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "docs_dir": self.docs_dir,
+            "alias": self.alias,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {
+                "files_total": self.files_total,
+                "files_done": self.files_done,
+                "files_failed": len(self.files_failed),
+                "chunks": self.chunks,
+                "tickets": self.tickets_done,
+                "percent": round(100 * self.files_done / self.files_total, 1) if self.files_total else None,
+            },
+            "throughput": {
+                "elapsed_seconds": round(elapsed, 3),
+                "paused_seconds": round(self.paused_seconds, 3),
+                "files_per_second": round(files_per_second, 3),
+                "chunks_per_second": round(self.chunks / elapsed, 3) if elapsed > 0 else 0.0,
+                "eta_seconds": round(eta, 1) if eta is not None else None,
+            },
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class IngestJobManager:
+    """
+    Run ingestion jobs on a worker pool, throttled against serving latency.
+
+    Jobs targeting the same collection alias run one at a time, in
+    submission order; jobs for different aliases may run concurrently up to
+    the pool size.
+    """
+
+    def __init__(self, throttle: DutyCycleThrottle, workers: int = INGEST_WORKERS, history: int = INGEST_JOB_HISTORY):
+        self.throttle = throttle
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="ingest")
+        self._jobs: dict[str, IngestJob] = {}
+        self._lock = threading.Lock()
+        self._alias_locks: dict[tuple[str, str], threading.Lock] = {}
+        self._ids = itertools.count(1)
+
+    def submit(
+        self,
+        docs_dir: Path,
+        persist_dir: str,
+        alias: str,
+        mode: str = "rebuild",
+        chunk_size: int = 500,
+        embedding: str = "chroma",
+        dedup: bool = True,
+        shard_by: str | None = None,
+        tickets: bool = False,
+    ) -> IngestJob:
+        """
+        Queue an ingestion job.
+
+        With tickets, support tickets are streamed from Postgres into the
+        collection after the documents.
+
+        Raises:
+            ValueError: If docs_dir is not a directory or mode is unknown
+        """
+        if mode not in ("rebuild", "in_place"):
+            raise ValueError(f"Unknown ingestion mode: {mode}")
+        if not docs_dir.is_dir():
+            raise ValueError(f"Not a directory: {docs_dir}")
+
+        with self._lock:
+            job = IngestJob(
+                id=f"ingest-{int(time.time())}-{next(self._ids)}",
+                docs_dir=str(docs_dir),
+                mode=mode,
+                persist_dir=persist_dir,
+                alias=alias,
+                chunk_size=chunk_size,
+                embedding=embedding,
+                dedup=dedup,
+                shard_by=shard_by,
+                tickets=tickets,
+            )
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self._executor.submit(self._run, job)
+        logger.info("Queued ingestion job %s (%s of %s)", job.id, mode, docs_dir)
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self._jobs.get(job_id)
+
+    def list(self) -> list[IngestJob]:
+        """All known jobs, newest first."""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.submitted_at, reverse=True)
+
+    def cancel(self, job_id: str) -> IngestJob | None:
+        """Ask a job to stop; a queued job is cancelled before it starts. Returns None if unknown."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.cancel_event.set()
+        with self._lock:
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.time()
+        return job
+
+    def shutdown(self) -> None:
+        """Cancel every job and wait for running ones to stop."""
+        for job in list(self._jobs.values()):
+            if not job.finished:
+                self.cancel(job.id)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _forget_old_jobs(self) -> None:
+        finished = sorted((job for job in self._jobs.values() if job.finished), key=lambda job: job.submitted_at)
+        for job in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job.id]
+
+    def _alias_lock(self, job: IngestJob) -> threading.Lock:
+        with self._lock:
+            return self._alias_locks.setdefault((job.persist_dir, job.alias), threading.Lock())
+
+    def _run(self, job: IngestJob) -> None:
+        with self._alias_lock(job):
+            with self._lock:
+                if job.status != "queued":
+                    return
+                job.status = "running"
+                job.started_at = time.time()
+            try:
+                job.result = self._ingest(job)
+                job.status = "succeeded"
+            except IngestCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                logger.error("Ingestion job %s failed: %s", job.id, e, exc_info=True)
+                job.status, job.error = "failed", str(e)
+            finally:
+                job.finished_at = time.time()
+        logger.info("Ingestion job %s %s after %.1f s", job.id, job.status, job.finished_at - job.started_at)
+
+    def _ingest(self, job: IngestJob) -> dict[str, Any]:
+        # Imported here: the chunker pulls in langchain, which the API does not otherwise need at startup
+        from .embeddings import PRIORITY_BACKGROUND, EmbeddingService
+        from .ingest import ingest_directory, list_documents, rebuild_collection
+        from .tickets import ingest_tickets
+        from .vectorstore import get_aliased_vectorstore
+
+        db = None
+        if job.tickets:
+            # Imported here: document-only jobs never touch Postgres
+            from ..db import db_manager as db
+
+        docs_dir = Path(job.docs_dir)
+        job.files_total = len(list_documents(docs_dir))
+        on_file, on_batch = self._progress_callbacks(job)
+
+        if job.mode == "rebuild":
+            result = rebuild_collection(
+                docs_dir,
+                persist_dir=job.persist_dir,
+                alias=job.alias,
+                chunk_size=job.chunk_size,
+                embedding=job.embedding,
+                dedup=job.dedup,
+                shard_by=job.shard_by,
+                db=db,
+                on_file=on_file,
+                on_batch=on_batch,
+            )
+            result.pop("failed", None)
+            return result
+
+        collection = get_aliased_vectorstore(job.persist_dir, job.alias)
+        embedder = EmbeddingService(model_type=job.embedding, priority=PRIORITY_BACKGROUND) if job.embedding in ("local", "stub") else None
+        stats = ingest_directory(collection, docs_dir, job.chunk_size, embedder, job.dedup, on_file)
+        ticket_chunks = 0
+        if db is not None:
+            ticket_chunks = ingest_tickets(
+                db, collection, job.persist_dir, on_batch, chunk_size=job.chunk_size, embedder=embedder
+            ).chunks
+        return {
+            "files": stats.files,
+            "chunks": stats.chunks,
+            "duplicates": stats.duplicates,
+            "ticket_chunks": ticket_chunks,
+            "count": collection.count(),
+        }
+
+    def _progress_callbacks(self, job: IngestJob):
+        """Per-file and per-ticket-batch callbacks that record progress and pause as the throttle asks."""
+        last = time.monotonic()
+
+        def pace() -> None:
+            nonlocal last
+            if job.cancel_event.is_set():
+                raise IngestCancelled(job.id)
+
+            pause = self.throttle.pause_after(time.monotonic() - last)
+            if pause > 0:
+                # Interrupted by cancel(), so a throttled job still stops promptly
+                if job.cancel_event.wait(pause):
+                    raise IngestCancelled(job.id)
+                job.paused_seconds += pause
+            last = time.monotonic()
+
+        def on_file(path: Path, stats) -> None:
+            job.files_done = stats.files + len(stats.failed)
+            job.files_failed = list(stats.failed)
+            job.chunks = stats.chunks
+            pace()
+
+        def on_batch(stats) -> None:
+            job.tickets_done = stats.tickets
+            pace()
+
+        return on_file, on_batch
@@ -0,0 +1,483 @@
+"""
+Read-only, memory-mapped snapshots of a vector collection.
+
+A snapshot root holds immutable versions plus a pointer to the live one:
+
+    CURRENT                  name of the live version, replaced atomically
+    v20260101T120000000000/  one directory per published version
+        manifest.json        count, dim, metric, source collection
+        embeddings.npy       float32 [count, dim], L2-normalised
+        ids.bin              UTF-8 blobs, row i at offsets[i]:offsets[i + 1]
+        ids.offsets.npy      int64 [count + 1]
+        ids.order.npy        int64 [count], rows sorted by id, for lookups
+        documents.*          same layout
+        metadatas.*          same layout, one JSON object per row
+        metadata_index/      inverted index over metadata:
+            keys.json        metadata key -> file number
+            <n>.json         [JSON value, start, stop] per distinct value
+            rows.npy         int64 rows holding each value, at start:stop
+
+Every worker process maps the same files read-only, so embeddings and texts
+live once in the OS page cache instead of once per worker, and the private
+memory of a worker no longer grows with the collection. Search is exact
+(inner product over the mapped matrix) rather than HNSW, which keeps the
+format trivially shareable; at knowledge-base sizes a query is a single
+matrix-vector product. Where filters are answered from the inverted
+metadata index, so they cost one comparison per distinct value rather than a
+JSON decode per row; a key's values are read on its first filter.
+get(ids=...) binary-searches the mapped id order. Nothing is built per
+worker on open, so opening or switching a version costs the same whatever
+the collection size.
+
+Readers re-check CURRENT at most every check_interval seconds and swap to a
+new version between queries; a query that is already running finishes on
+the version it started with. Old versions are garbage collected by the
+publisher; workers still mapping a removed version keep reading it until
+they switch, because unlinked files stay valid while mapped.
+"""
+
+import json
+import logging
+import mmap
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+FORMAT_VERSION = 2
+_EXPORT_PAGE_SIZE = 5000
+
+
+# ----------------------------------------------------------------------------
+# Publishing
+# ----------------------------------------------------------------------------
+def _write_blobs(base: Path, items: Iterable[bytes]) -> None:
+    offsets = [0]
+    with open(f"{base}.bin", "wb") as f:
+        for item in items:
+            f.write(item)
+            offsets.append(offsets[-1] + len(item))
+    np.save(f"{base}.offsets.npy", np.asarray(offsets, dtype=np.int64), allow_pickle=False)
+
+
+def _write_metadata_index(path: Path, metadatas: Iterable[dict]) -> None:
+    """Group rows by metadata key and JSON-encoded value, one file per key (see _MetadataIndex)."""
+    postings: dict[str, dict[str, list[int]]] = {}
+    for row, metadata in enumerate(metadatas):
+        for key, value in (metadata or {}).items():
+            postings.setdefault(key, {}).setdefault(json.dumps(value, sort_keys=True), []).append(row)
+    path.mkdir()
+    keys: dict[str, int] = {}
+    rows: list[int] = []
+    for number, (key, values) in enumerate(postings.items()):
+        entries = []
+        for value, value_rows in values.items():
+            entries.append([value, len(rows), len(rows) + len(value_rows)])
+            rows.extend(value_rows)
+        (path / f"{number}.json").write_text(json.dumps(entries))
+        keys[key] = number
+    (path / "keys.json").write_text(json.dumps(keys))
+    np.save(path / "rows.npy", np.asarray(rows, dtype=np.int64), allow_pickle=False)
+
+
+def _export(collection, path: Path) -> dict:
+    ids, documents, metadatas, chunks = [], [], [], []
+    offset = 0
+    while True:
+        page = collection.get(
+            limit=_EXPORT_PAGE_SIZE,
+            offset=offset,
+            include=["documents", "metadatas", "embeddings"],
+        )
+        if not page["ids"]:
+            break
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        chunks.append(np.asarray(page["embeddings"], dtype=np.float32))
+        offset += len(page["ids"])
+
+    embeddings = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.where(norms == 0, 1, norms)
+    np.save(path / "embeddings.npy", embeddings, allow_pickle=False)
+
+    encoded_ids = [i.encode("utf-8") for i in ids]
+    _write_blobs(path / "ids", encoded_ids)
+    order = sorted(range(len(encoded_ids)), key=encoded_ids.__getitem__)
+    np.save(path / "ids.order.npy", np.asarray(order, dtype=np.int64), allow_pickle=False)
+    _write_blobs(path / "documents", ((d or "").encode("utf-8") for d in documents))
+    _write_blobs(path / "metadatas", (json.dumps(m or {}).encode("utf-8") for m in metadatas))
+    _write_metadata_index(path / "metadata_index", metadatas)
+
+    manifest = {
+        "format": FORMAT_VERSION,
+        "collection": collection.name,
+        "metric": "cosine",
+        "count": len(ids),
+        "dim": int(embeddings.shape[1]) if len(ids) else 0,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    (path / "manifest.json").write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def _versions(root: Path) -> list[Path]:
+    return sorted(p for p in root.iterdir() if p.is_dir() and p.name.startswith("v"))
+
+
+def publish_snapshot(collection, root: str | Path, keep: int = 2) -> Path:
+    """
+    Export a Chroma collection as a new snapshot version and make it live.
+
+    The version is written to a temporary directory, renamed into place and
+    then published by atomically replacing CURRENT, so readers only ever see
+    complete versions.
+
+    Args:
+        collection: ChromaDB collection (cosine space) to export
+        root: Snapshot root directory, created if missing
+        keep: Number of most recent versions to retain
+
+    Returns:
+        Path of the published version directory
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    version = datetime.now(timezone.utc).strftime("v%Y%m%dT%H%M%S%f")
+    staging = root / f".staging-{version}"
+    staging.mkdir()
+    try:
+        start = time.perf_counter()
+        manifest = _export(collection, staging)
+        target = root / version
+        os.rename(staging, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    pointer = root / f".{CURRENT_FILE}.tmp"
+    pointer.write_text(version)
+    os.replace(pointer, root / CURRENT_FILE)
+    logger.info(
+        "Published snapshot %s (%d vectors) in %.0f ms",
+        version, manifest["count"], (time.perf_counter() - start) * 1000,
+    )
+
+    for old in _versions(root)[:-keep] if keep > 0 else []:
+        if old.name != version:
+            shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+# ----------------------------------------------------------------------------
+# Reading
+# ----------------------------------------------------------------------------
+class _Blobs:
+    """Variable-length byte strings addressed by row through an offset array."""
+
+    def __init__(self, base: Path):
+        self._offsets = np.load(f"{base}.offsets.npy", mmap_mode="r", allow_pickle=False)
+        with open(f"{base}.bin", "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def raw(self, row: int) -> bytes:
+        return self._data[int(self._offsets[row]):int(self._offsets[row + 1])]
+
+    def __getitem__(self, row: int) -> str:
+        return self.raw(row).decode("utf-8")
+
+
+class _Version:
+    """One immutable, mapped snapshot version."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        self.manifest = json.loads((path / "manifest.json").read_text())
+        if self.manifest["format"] != FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported snapshot format {self.manifest['format']} in {path}; "
+                "republish it with scripts/publish_snapshot.py"
+            )
+        self.embeddings = np.load(path / "embeddings.npy", mmap_mode="r", allow_pickle=False)
+        self.ids = _Blobs(path / "ids")
+        self.id_order = np.load(path / "ids.order.npy", mmap_mode="r", allow_pickle=False)
+        self.documents = _Blobs(path / "documents")
+        self.metadatas = _Blobs(path / "metadatas")
+        self.metadata_index = _MetadataIndex(path / "metadata_index", self.count)
+
+    @property
+    def count(self) -> int:
+        return self.manifest["count"]
+
+    def metadata(self, row: int) -> dict:
+        return json.loads(self.metadatas[row])
+
+    def row_of(self, id_: str) -> int | None:
+        """Row holding id_, by binary search over the sorted id order (None if absent)."""
+        target = id_.encode("utf-8")
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.ids.raw(int(self.id_order[mid])) < target:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.count and self.ids.raw(int(self.id_order[low])) == target:
+            return int(self.id_order[low])
+        return None
+
+
+_COMPARATORS: dict[str, Callable[[Any, Any], bool]] = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+    "$contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+class _MetadataIndex:
+    """
+    Inverted index over a version's metadata, answering Chroma-style where filters.
+
+    A condition is evaluated once per distinct value of its key and the
+    matching rows are OR-ed into a mask; rows without the key compare as
+    None, exactly as if each row's metadata were decoded and tested. Only
+    the keys a filter names are read, on first use.
+    """
+
+    def __init__(self, path: Path, count: int):
+        self.path = path
+        self.count = count
+        self._keys: dict[str, int] = json.loads((path / "keys.json").read_text())
+        self._rows = np.load(path / "rows.npy", mmap_mode="r", allow_pickle=False)
+        self._postings: dict[str, list[tuple[Any, np.ndarray]]] = {}
+        self._present: dict[str, np.ndarray] = {}
+
+    def select(self, where: dict) -> np.ndarray:
+        """Boolean mask of the rows matching a where filter."""
+        mask = np.ones(self.count, dtype=bool)
+        for key, condition in where.items():
+            if key == "$and":
+                for clause in condition:
+                    mask &= self.select(clause)
+            elif key == "$or":
+                matched = np.zeros(self.count, dtype=bool)
+                for clause in condition:
+                    matched |= self.select(clause)
+                mask &= matched
+            elif isinstance(condition, dict):
+                for op, operand in condition.items():
+                    if op not in _COMPARATORS:
+                        raise ValueError(f"Unsupported where operator: {op}")
+                    mask &= self._rows_where(key, _COMPARATORS[op], operand)
+            else:
+                mask &= self._rows_where(key, _COMPARATORS["$eq"], condition)
+        return mask
+
+    def _postings_for(self, key: str) -> list[tuple[Any, np.ndarray]]:
+        postings = self._postings.get(key)
+        if postings is None:
+            postings = []
+            if key in self._keys:
+                entries = json.loads((self.path / f"{self._keys[key]}.json").read_text())
+                postings = [(json.loads(value), self._rows[start:stop]) for value, start, stop in entries]
+            self._postings[key] = postings
+        return postings
+
+    def _rows_where(self, key: str, compare: Callable[[Any, Any], bool], operand: Any) -> np.ndarray:
+        mask = np.zeros(self.count, dtype=bool)
+        postings = self._postings_for(key)
+        for value, rows in postings:
+            if compare(value, operand):
+                mask[rows] = True
+        if compare(None, operand):
+            mask |= ~self._has_key(key)
+        return mask
+
+    def _has_key(self, key: str) -> np.ndarray:
+        present = self._present.get(key)
+        if present is None:
+            present = np.zeros(self.count, dtype=bool)
+            for _, rows in self._postings_for(key):
+                present[rows] = True
+            self._present[key] = present
+        return present
+
+
+class MmapCollection:
+    """
+    Read-only collection served from a memory-mapped snapshot root.
+
+    Implements the subset of the Chroma collection API used by the
+    retriever and warm-up: name, metadata, count(), get() and query().
+
+    Args:
+        root: Snapshot root written by publish_snapshot
+        embedding_function: Embeds query_texts; defaults to Chroma's default
+            function, the same model the collection was built with
+        check_interval: Seconds between checks for a newly published version
+    """
+
+    def __init__(self, root: str | Path, embedding_function=None, check_interval: float = 1.0):
+        self.root = Path(root)
+        self.check_interval = check_interval
+        self._embedding_function = embedding_function
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._version = self._open_current()
+
+    def _open_current(self) -> _Version:
+        name = (self.root / CURRENT_FILE).read_text().strip()
+        start = time.perf_counter()
+        version = _Version(self.root / name)
+        logger.info(
+            "Mapped snapshot %s (%d vectors) in %.1f ms",
+            name, version.count, (time.perf_counter() - start) * 1000,
+        )
+        return version
+
+    def _current(self) -> _Version:
+        now = time.monotonic()
+        if now - self._checked_at < self.check_interval:
+            return self._version
+        with self._lock:
+            if now - self._checked_at >= self.check_interval:
+                self._checked_at = now
+                try:
+                    name = (self.root / CURRENT_FILE).read_text().strip()
+                    if name != self._version.name:
+                        self._version = self._open_current()
+                except (OSError, ValueError) as e:
+                    logger.error("Keeping snapshot %s, cannot switch: %s", self._version.name, e)
+        return self._version
+
+    @property
+    def name(self) -> str:
+        return self._version.manifest["collection"]
+
+    @property
+    def metadata(self) -> dict:
+        return {"hnsw:space": self._version.manifest["metric"], "snapshot": self._version.name}
+
+    @property
+    def version(self) -> str:
+        return self._current().name
+
+    def count(self) -> int:
+        return self._current().count
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        version = self._current()
+        include = include or ["documents", "metadatas"]
+        if ids is not None:
+            found = (version.row_of(i) for i in dict.fromkeys(ids))
+            rows = [row for row in found if row is not None]
+        else:
+            stop = version.count if limit is None else min(version.count, offset + limit)
+            rows = list(range(offset, stop))
+        return self._rows(version, rows, include)
+
+    def query(
+        self,
+        query_embeddings=None,
+        query_texts: list[str] | None = None,
+        n_results: int = 10,
+        where: dict | None = None,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        version = self._current()
+        include = include or ["documents", "metadatas", "distances"]
+        if query_embeddings is None:
+            query_embeddings = self._embed(query_texts or [])
+        if version.count == 0:
+            # An empty snapshot has dim 0; nothing to score
+            empty = [[] for _ in range(len(query_embeddings))]
+            return {
+                "ids": empty,
+                "documents": empty if "documents" in include else None,
+                "metadatas": empty if "metadatas" in include else None,
+                "distances": empty if "distances" in include else None,
+                "embeddings": empty if "embeddings" in include else None,
+            }
+        queries = np.asarray(query_embeddings, dtype=np.float32).reshape(-1, version.manifest["dim"])
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        if where:
+            candidates = np.flatnonzero(version.metadata_index.select(where))
+            matrix = version.embeddings[candidates]
+        else:
+            candidates = None
+            matrix = version.embeddings
+
+        scores = queries @ matrix.T
+        k = min(n_results, scores.shape[1])
+        results: dict[str, list] = {key: [] for key in ("ids", "documents", "metadatas", "distances", "embeddings")}
+        for q in range(len(queries)):
+            top = np.argpartition(-scores[q], k - 1)[:k] if k else np.zeros(0, dtype=np.int64)
+            top = top[np.argsort(-scores[q][top], kind="stable")]
+            rows = candidates[top] if candidates is not None else top
+            found = self._rows(version, rows.tolist(), include)
+            for key, values in found.items():
+                results[key].append(values)
+            results["distances"].append((1 - scores[q][top]).tolist() if "distances" in include else None)
+        return {key: (value if any(v is not None for v in value) else None) for key, value in results.items()}
+
+    def _rows(self, version: _Version, rows: list[int], include: list[str]) -> dict[str, Any]:
+        return {
+            "ids": [version.ids[r] for r in rows],
+            "documents": [version.documents[r] for r in rows] if "documents" in include else None,
+            "metadatas": [version.metadata(r) for r in rows] if "metadatas" in include else None,
+            "embeddings": np.asarray(version.embeddings[rows]) if "embeddings" in include else None,
+        }
+
+    def _embed(self, texts: list[str]):
+        if self._embedding_function is None:
+            from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+            self._embedding_function = DefaultEmbeddingFunction()
+        return self._embedding_function(texts)
+
+
+_collections: dict[str, MmapCollection] = {}
+_registry_lock = threading.Lock()
+
+
+def get_mmap_collection(root: str | Path) -> MmapCollection:
+    """Return the process-wide MmapCollection for a snapshot root."""
+    key = os.path.abspath(root)
+    collection = _collections.get(key)
+    if collection is None:
+        with _registry_lock:
+            collection = _collections.get(key)
+            if collection is None:
+                collection = MmapCollection(root)
+                _collections[key] = collection
+    return collection
+
+
+def close_mmap_collections() -> None:
+    """Drop cached snapshot readers; mappings close once unreferenced."""
+    with _registry_lock:
+        _collections.clear()
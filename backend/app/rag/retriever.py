@@ -2,7 +2,7 @@
 
 from typing import TypedDict
 
-from .vectorstore import get_vectorstore
+from .vectorstore import get_aliased_vectorstore
 
 
 class RetrievalResult(TypedDict):
@@ -17,6 +17,7 @@ def search(
     query: str,
     n_results: int = 5,
     where: dict | None = None,
+    query_embedding=None,
 ) -> list[RetrievalResult]:
     """
     Perform vector similarity search.
@@ -26,27 +27,80 @@ def search(
         query: Search query text
         n_results: Number of results to return
         where: Optional metadata filter
+        query_embedding: Optional pre-computed embedding of the query;
+            when omitted the collection embeds the text
         
     Returns:
         List of retrieval results with text, metadata, and distance
     """
-    query_params = {
-        "query_texts": [query],
-        "n_results": n_results,
-    }
+    query_params = {"n_results": n_results}
+    if query_embedding is not None:
+        query_params["query_embeddings"] = [query_embedding]
+    else:
+        query_params["query_texts"] = [query]
     
     if where:
         query_params["where"] = where
     
     results = collection.query(**query_params)
     
-    # Format results
+    return _format_results(results, 0)
+
+
+def search_batch(
+    collection,
+    queries: list[str],
+    n_results: int = 5,
+    where: dict | None = None,
+    query_embeddings=None,
+) -> list[list[RetrievalResult]]:
+    """
+    Perform vector similarity search for many queries in one call.
+    
+    All queries are embedded together and sent to ChromaDB as a single
+    multi-query request, which amortizes the per-call overhead of
+    embedding and index lookup across the batch.
+    
+    Args:
+        collection: ChromaDB collection
+        queries: List of search query texts
+        n_results: Number of results to return per query
+        where: Optional metadata filter applied to every query
+        query_embeddings: Optional pre-computed query embeddings (one row
+            per query); when omitted the collection embeds the texts
+        
+    Returns:
+        One list of retrieval results per query, in input order
+    """
+    if not queries:
+        return []
+    
+    query_params = {"n_results": n_results}
+    if query_embeddings is not None:
+        query_params["query_embeddings"] = query_embeddings
+    else:
+        query_params["query_texts"] = list(queries)
+    
+    if where:
+        query_params["where"] = where
+    
+    results = collection.query(**query_params)
+    
+    return [_format_results(results, q) for q in range(len(queries))]
+
+
+def _format_results(results: dict, q: int) -> list[RetrievalResult]:
+    """Format the results of the q-th query in a ChromaDB query response."""
+    documents = results["documents"][q]
+    metadatas = results["metadatas"][q] if results["metadatas"] else None
+    distances = results["distances"][q] if results["distances"] else None
+    
     formatted = []
-    for i in range(len(results["documents"][0])):
+    for i in range(len(documents)):
         formatted.append({
-            "text": results["documents"][0][i],
-            "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-            "distance": results["distances"][0][i] if results["distances"] else 0.0,
+            "text": documents[i],
+            "metadata": (metadatas[i] or {}) if metadatas else {},
+            "distance": distances[i] if distances else 0.0,
         })
     
     return formatted
@@ -75,7 +129,7 @@ def retrieve_context(
     Returns:
         Combined context string from relevant documents
     """
-    collection = get_vectorstore(persist_dir, collection_name)
+    collection = get_aliased_vectorstore(persist_dir, collection_name)
     results = search(collection, query, n_results)
     
     context_parts = []
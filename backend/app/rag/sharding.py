@@ -0,0 +1,298 @@
+"""
+Collections sharded by a metadata key, searched with parallel fan-out.
+
+A sharded collection "<name>" is stored as one Chroma collection per value of
+its shard key, "<name>__s_<value>-<hash>" (e.g. one per docs subfolder), and is
+registered in SHARDS_FILE with that key. ShardedCollection exposes the
+subset of the collection API the ingestion and retrieval code uses, so it
+can stand in anywhere a collection is expected:
+
+- writes (add/upsert/update) are routed by each record's shard-key value;
+- a query whose where clause pins the shard key ({"category": "policies"},
+  $eq, $in, or either inside a top-level $and) only searches those shards;
+- any other query runs on every shard concurrently, and the per-shard top-k
+  lists are merged by distance.
+
+Per-query work is thus proportional to the slice a filter selects rather
+than to the whole corpus.
+"""
+
+import hashlib
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+SHARDS_FILE = "shards.json"
+SHARD_SEPARATOR = "__s_"
+FANOUT_WORKERS = int(os.getenv("VECTORSTORE_FANOUT_WORKERS", "8"))
+
+_FIELDS = ("ids", "documents", "metadatas", "embeddings", "distances")
+_executor: ThreadPoolExecutor | None = None
+
+
+def _fanout_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="shard-fanout")
+    return _executor
+
+
+def shard_collection_name(name: str, value: Any) -> str:
+    """
+    Return the physical collection name holding one shard-key value.
+
+    The readable part is sanitised for Chroma's naming rules, so distinct
+    values can share it ("a.b" and "a-b"); the hash of the value's repr
+    (which also tells 1 from "1") keeps every value in its own shard.
+    """
+    safe = re.sub(r"[^A-Za-z0-9_-]", "-", str(value)).strip("-_")[:48] or "none"
+    digest = hashlib.blake2b(repr(value).encode(), digest_size=8).hexdigest()
+    return f"{name}{SHARD_SEPARATOR}{safe}-{digest}"
+
+
+def pinned_values(where: dict | None, key: str) -> set | None:
+    """
+    Return the shard-key values a where clause restricts results to.
+
+    None means the filter does not pin the key and every shard must be
+    searched.
+    """
+    if not where:
+        return None
+    condition = where.get(key)
+    if condition is not None:
+        if not isinstance(condition, dict):
+            return {condition}
+        if "$eq" in condition:
+            return {condition["$eq"]}
+        if "$in" in condition:
+            return set(condition["$in"])
+        return None
+    pinned = None
+    for clause in where.get("$and", ()):
+        values = pinned_values(clause, key)
+        if values is not None:
+            pinned = values if pinned is None else pinned & values
+    return pinned
+
+
+def without_key(where: dict | None, key: str) -> dict | None:
+    """
+    Drop the conditions on key that pinned_values used to choose shards.
+
+    Every record in a shard has the same key value, so once the query is
+    routed those conditions always hold; removing them lets Chroma run a
+    plain index search instead of a filtered one.
+    """
+    if not where or pinned_values(where, key) is None:
+        return where
+    if key in where:
+        rest = {k: v for k, v in where.items() if k != key}
+        return rest or None
+    clauses = [c for c in (without_key(c, key) for c in where["$and"]) if c is not None]
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {**where, "$and": clauses}
+
+
+class ShardedCollection:
+    """
+    Collection-like view over the shards of one sharded collection.
+
+    Shards created by another process (e.g. a ticket stream adding a new
+    category to the live collection) are discovered within refresh_interval.
+
+    Args:
+        name: Physical (unaliased) collection name
+        key: Metadata key the collection is sharded by
+        open_shard: Callable returning the Chroma collection for a shard name
+        list_shards: Callable returning the names of the existing shards
+        embedding_function: Embeds query_texts, once per query for all shards
+        refresh_interval: Seconds between shard discoveries
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key: str,
+        open_shard,
+        list_shards,
+        embedding_function=None,
+        refresh_interval: float = 5.0,
+    ):
+        self.name = name
+        self.key = key
+        self._embedding_function = embedding_function
+        self._open_shard = open_shard
+        self._list_shards = list_shards
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._shards: dict[str, Any] = {}
+        self._refreshed_at = 0.0
+        self._refresh()
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._refreshed_at < self._refresh_interval:
+            return
+        with self._lock:
+            if now - self._refreshed_at < self._refresh_interval:
+                return
+            for shard_name in self._list_shards():
+                suffix = shard_name[len(self.name) + len(SHARD_SEPARATOR):]
+                if suffix not in self._shards:
+                    self._shards = {**self._shards, suffix: self._open_shard(shard_name)}
+            self._shards = dict(sorted(self._shards.items()))
+            self._refreshed_at = now
+
+    @property
+    def metadata(self) -> dict:
+        return {"hnsw:space": "cosine", "shard_key": self.key, "shards": sorted(self._shards)}
+
+    @property
+    def shards(self) -> dict[str, Any]:
+        self._refresh()
+        return dict(self._shards)
+
+    def _shard(self, value: Any):
+        suffix = shard_collection_name("", value)[len(SHARD_SEPARATOR):]
+        shard = self._shards.get(suffix)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.get(suffix)
+                if shard is None:
+                    shard = self._open_shard(shard_collection_name(self.name, value))
+                    # Copy-on-write so readers iterate a stable mapping
+                    self._shards = dict(sorted({**self._shards, suffix: shard}.items()))
+        return shard
+
+    def count(self) -> int:
+        return sum(shard.count() for shard in self.shards.values())
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def _route(self, method: str, ids, metadatas, **columns) -> None:
+        groups: dict[str, list[int]] = {}
+        for i, metadata in enumerate(metadatas):
+            if self.key not in metadata:
+                raise ValueError(f"Record {ids[i]} has no {self.key!r} metadata to shard by")
+            groups.setdefault(metadata[self.key], []).append(i)
+        for value, rows in groups.items():
+            kwargs = {
+                column: [values[i] for i in rows]
+                for column, values in columns.items()
+                if values is not None
+            }
+            getattr(self._shard(value), method)(
+                ids=[ids[i] for i in rows], metadatas=[metadatas[i] for i in rows], **kwargs
+            )
+
+    def add(self, ids, documents=None, metadatas=None, embeddings=None) -> None:
+        self._route("add", ids, metadatas, documents=documents, embeddings=embeddings)
+
+    def upsert(self, ids, documents=None, metadatas=None, embeddings=None) -> None:
+        self._route("upsert", ids, metadatas, documents=documents, embeddings=embeddings)
+
+    def update(self, ids, metadatas=None, documents=None, embeddings=None) -> None:
+        self._route("update", ids, metadatas, documents=documents, embeddings=embeddings)
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def _targets(self, where: dict | None) -> list:
+        shards = self.shards
+        values = pinned_values(where, self.key)
+        if values is None:
+            return list(shards.values())
+        suffixes = {shard_collection_name("", v)[len(SHARD_SEPARATOR):] for v in values}
+        return [shard for suffix, shard in shards.items() if suffix in suffixes]
+
+    def get(self, ids=None, where=None, limit=None, offset=None, include=None) -> dict[str, Any]:
+        include = include or ["documents", "metadatas"]
+        merged: dict[str, list | None] = {"ids": []}
+        for field in ("documents", "metadatas", "embeddings"):
+            merged[field] = [] if field in include else None
+        skip, remaining = offset or 0, limit
+        # Shards are read in name order, so limit/offset page consistently
+        for shard in self._targets(where):
+            if remaining is not None and remaining <= 0:
+                break
+            if skip:
+                if ids is None and where is None:
+                    size = shard.count()
+                else:
+                    size = len(shard.get(ids=ids, where=where, include=[])["ids"])
+                if skip >= size:
+                    skip -= size
+                    continue
+            page = shard.get(ids=ids, where=where, limit=remaining, offset=skip, include=include)
+            skip = 0
+            for field, values in merged.items():
+                if values is not None and page.get(field) is not None:
+                    values.extend(page[field])
+            if remaining is not None:
+                remaining -= len(page["ids"])
+        return merged
+
+    def _embed(self, texts: list[str]):
+        if self._embedding_function is None:
+            raise ValueError("query_texts needs an embedding_function; pass query_embeddings instead")
+        return self._embedding_function(texts)
+
+    def query(
+        self,
+        query_embeddings=None,
+        query_texts: list[str] | None = None,
+        n_results: int = 10,
+        where: dict | None = None,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        include = list(include or ["documents", "metadatas", "distances"])
+        targets = self._targets(where)
+        num_queries = len(query_embeddings) if query_embeddings is not None else len(query_texts or [])
+        if not targets or not num_queries:
+            return {field: [[] for _ in range(num_queries)] if field == "ids" or field in include else None
+                    for field in _FIELDS}
+
+        if query_embeddings is None:
+            # Embed once here rather than once per shard
+            query_embeddings = self._embed(query_texts)
+        # Distances are needed to merge, even when the caller did not ask
+        shard_include = include if "distances" in include else [*include, "distances"]
+        shard_where = without_key(where, self.key)
+
+        def run(shard):
+            return shard.query(
+                query_embeddings=query_embeddings, n_results=n_results, where=shard_where, include=shard_include
+            )
+
+        if len(targets) == 1:
+            results = [run(targets[0])]
+        else:
+            results = list(_fanout_executor().map(run, targets))
+        return self._merge(results, num_queries, n_results, include)
+
+    @staticmethod
+    def _merge(results: list[dict], num_queries: int, n_results: int, include: list[str]) -> dict[str, Any]:
+        merged: dict[str, list | None] = {
+            field: [] if field == "ids" or field in include else None for field in _FIELDS
+        }
+        for q in range(num_queries):
+            candidates = (
+                (distance, s, i)
+                for s, result in enumerate(results)
+                for i, distance in enumerate(result["distances"][q])
+            )
+            top = heapq.nsmallest(n_results, candidates)
+            for field, values in merged.items():
+                if values is not None:
+                    values.append([results[s][field][q][i] for _, s, i in top])
+        return merged
@@ -0,0 +1,151 @@
+"""
+Stream support tickets from Postgres into the vector store.
+
+Tickets are read in ticket_id order through a server-side cursor, chunked,
+embedded and upserted one batch at a time, so memory stays bounded by the
+batch size however large the table is. After each batch the highest
+ticket_id is saved as the collection's watermark; an interrupted run resumes
+after it, and because chunk ids are derived from ticket ids, re-processing
+the last batch is an idempotent upsert.
+
+Chunk metadata carries channel, customer_id and created_at so retrieval can
+be narrowed with /rag filters, e.g. {"channel": "email"} or
+{"created_ts": {"$gte": 1735689600}} (Chroma range operators need numbers).
+"""
+
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from .chunker import chunk_documents
+from .embeddings import EmbeddingService
+from .vectorstore import read_watermark, set_watermark
+
+logger = logging.getLogger(__name__)
+
+SOURCE = "support_tickets"
+
+TICKETS_QUERY = """
+SELECT ticket_id, customer_id, subject, body, created_at, channel
+FROM support_tickets
+WHERE ticket_id > :after
+ORDER BY ticket_id
+"""
+
+
+@dataclass
+class TicketIngestStats:
+    tickets: int = 0
+    chunks: int = 0
+    watermark: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.tickets / self.seconds if self.seconds else 0.0
+
+
+def ticket_documents(rows: list[dict[str, Any]]) -> list[dict]:
+    """Shape ticket rows as documents for chunk_documents."""
+    documents = []
+    for row in rows:
+        metadata = {
+            "source": f"{SOURCE}/{row['ticket_id']}",
+            "category": SOURCE,
+            "ticket_id": row["ticket_id"],
+            "customer_id": row["customer_id"],
+            "channel": row["channel"],
+        }
+        if row["created_at"] is not None:
+            metadata["created_at"] = row["created_at"].isoformat()
+            metadata["created_ts"] = int(row["created_at"].timestamp())
+        documents.append({
+            "text": f"{row['subject'] or ''}\n\n{row['body'] or ''}".strip(),
+            # Chroma rejects None metadata values
+            "metadata": {k: v for k, v in metadata.items() if v is not None},
+        })
+    return documents
+
+
+def _upsert(collection, chunks: list[dict], embedder: EmbeddingService | None) -> None:
+    texts = [c["text"] for c in chunks]
+    metadatas = [c["metadata"] for c in chunks]
+    ids = [f"ticket_{m['ticket_id']}_{m['chunk_index']}" for m in metadatas]
+    if embedder is not None:
+        collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=embedder.embed_array(texts))
+    else:
+        collection.upsert(ids=ids, documents=texts, metadatas=metadatas)
+
+
+def stream_tickets(
+    db,
+    collection,
+    persist_dir: str,
+    batch_size: int = 500,
+    chunk_size: int = 500,
+    embedder: EmbeddingService | None = None,
+    limit: int | None = None,
+) -> Iterator[TicketIngestStats]:
+    """
+    Ingest tickets above the collection's watermark, one batch at a time.
+
+    Args:
+        db: DatabaseManager used for the streaming read
+        collection: Physical Chroma collection to upsert into
+        persist_dir: Vector database directory holding the watermark
+        batch_size: Tickets fetched, embedded and upserted per batch
+        chunk_size: Size of text chunks
+        embedder: Local/OpenAI embedder, or None to let Chroma embed
+        limit: Stop after roughly this many tickets (whole batches)
+
+    Yields:
+        Cumulative stats after every committed batch
+    """
+    stats = TicketIngestStats(watermark=read_watermark(persist_dir, collection.name, SOURCE))
+    logger.info("Streaming support tickets into %s after ticket_id %d", collection.name, stats.watermark)
+
+    start = time.perf_counter()
+    batches = db.stream_query(TICKETS_QUERY, {"after": stats.watermark}, batch_size=batch_size)
+    try:
+        for rows in batches:
+            chunks = [c for c in chunk_documents(ticket_documents(rows), chunk_size) if c["text"]]
+            if chunks:
+                _upsert(collection, chunks, embedder)
+            stats.watermark = rows[-1]["ticket_id"]
+            set_watermark(persist_dir, collection.name, SOURCE, stats.watermark)
+
+            stats.tickets += len(rows)
+            stats.chunks += len(chunks)
+            stats.seconds = time.perf_counter() - start
+            yield stats
+            if limit is not None and stats.tickets >= limit:
+                break
+    finally:
+        # Releases the server-side cursor and its connection on early exit
+        batches.close()
+
+    logger.info(
+        "Ingested %d tickets (%d chunks) into %s in %.1f s, %.0f rows/s, watermark %d",
+        stats.tickets, stats.chunks, collection.name, stats.seconds, stats.rows_per_second, stats.watermark,
+    )
+
+
+def ingest_tickets(
+    db,
+    collection,
+    persist_dir: str,
+    on_batch: Callable[[TicketIngestStats], None] | None = None,
+    **kwargs,
+) -> TicketIngestStats:
+    """
+    Run stream_tickets to completion and return the final stats.
+
+    on_batch, if given, is called after each committed batch with the
+    running stats; it may sleep to throttle the run or raise to abort it.
+    """
+    stats = TicketIngestStats(watermark=read_watermark(persist_dir, collection.name, SOURCE))
+    for stats in stream_tickets(db, collection, persist_dir, **kwargs):
+        if on_batch is not None:
+            on_batch(stats)
+    return stats
@@ -1,12 +1,86 @@
 """Vector store interface using ChromaDB."""
 
-import chromadb
-from chromadb.config import Settings
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
 
+from .sharding import SHARD_SEPARATOR, SHARDS_FILE, ShardedCollection
+
+if TYPE_CHECKING:
+    import chromadb
+    import numpy as np
+
+
+logger = logging.getLogger(__name__)
 
 # Default collection name
 DEFAULT_COLLECTION = "knowledge_base"
 
+# Process-wide registry of open clients and collection handles.
+# Opening a PersistentClient reopens the SQLite store and reloads segment
+# state, so handles are created once and shared by every caller.
+_clients: dict[str, "chromadb.ClientAPI"] = {}
+_collections: dict[tuple[str, str], object] = {}
+_registry_lock = threading.Lock()
+_embedding_function = None
+
+
+def _registry_key(persist_dir: str) -> str:
+    return os.path.abspath(persist_dir)
+
+
+def get_client(persist_dir: str = "./vectordb"):
+    """
+    Return the shared ChromaDB client for a persistence directory.
+    
+    Args:
+        persist_dir: Directory to persist the vector database
+        
+    Returns:
+        ChromaDB client, opened on first use
+    """
+    key = _registry_key(persist_dir)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    
+    with _registry_lock:
+        client = _clients.get(key)
+        if client is None:
+            start = time.perf_counter()
+            # Imported on first use: chromadb takes ~0.4 s to import
+            import chromadb
+
+            client = chromadb.PersistentClient(path=persist_dir)
+            _clients[key] = client
+            logger.info(
+                "Opened vector store client at %s in %.1f ms",
+                persist_dir, (time.perf_counter() - start) * 1000,
+            )
+    return client
+
+
+def get_embedding_function():
+    """
+    Return the embedding function every collection opened here embeds texts with.
+
+    This is Chroma's default model; callers that need query embeddings in
+    the collections' space (e.g. to reuse one embedding for routing and
+    retrieval) call it directly.
+    """
+    global _embedding_function
+    if _embedding_function is None:
+        with _registry_lock:
+            if _embedding_function is None:
+                from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+                _embedding_function = DefaultEmbeddingFunction()
+    return _embedding_function
+
 
 def get_vectorstore(
     persist_dir: str = "./vectordb",
@@ -15,6 +89,11 @@ def get_vectorstore(
     """
     Initialize ChromaDB with persistence.
     
+    Collection handles are cached per (persist_dir, collection_name), so
+    repeated calls are cheap and return the same object. A collection
+    registered as sharded (see create_sharded_collection) is returned as a
+    ShardedCollection over its shards.
+    
     Args:
         persist_dir: Directory to persist the vector database
         collection_name: Name of the collection to use
@@ -22,22 +101,253 @@ def get_vectorstore(
     Returns:
         ChromaDB collection object
     """
-    client = chromadb.PersistentClient(path=persist_dir)
+    key = (_registry_key(persist_dir), collection_name)
+    collection = _collections.get(key)
+    if collection is not None:
+        return collection
+    
+    client = get_client(persist_dir)
+    shard_key = _read_json(persist_dir, SHARDS_FILE).get(collection_name)
+    if shard_key is not None:
+        collection = ShardedCollection(
+            collection_name,
+            shard_key,
+            open_shard=lambda name: get_vectorstore(persist_dir, name),
+            list_shards=lambda: _shard_names(persist_dir, collection_name),
+            embedding_function=get_embedding_function(),
+        )
+        with _registry_lock:
+            return _collections.setdefault(key, collection)
     
-    collection = client.get_or_create_collection(
-        name=collection_name,
-        metadata={"hnsw:space": "cosine"}  # Use cosine similarity
-    )
+    # Resolved outside the lock, which get_embedding_function also takes
+    embedding_function = get_embedding_function()
+    with _registry_lock:
+        collection = _collections.get(key)
+        if collection is None:
+            collection = client.get_or_create_collection(
+                name=collection_name,
+                embedding_function=embedding_function,
+                metadata={"hnsw:space": "cosine"}  # Use cosine similarity
+            )
+            _collections[key] = collection
     
     return collection
 
 
+def _collection_names(persist_dir: str) -> list[str]:
+    # Older clients list names, newer ones Collection objects
+    return [getattr(c, "name", c) for c in get_client(persist_dir).list_collections()]
+
+
+def _shard_names(persist_dir: str, collection_name: str) -> list[str]:
+    prefix = f"{collection_name}{SHARD_SEPARATOR}"
+    return sorted(name for name in _collection_names(persist_dir) if name.startswith(prefix))
+
+
+def create_sharded_collection(persist_dir: str, collection_name: str, shard_key: str):
+    """
+    Register collection_name as sharded by a metadata key and return it.
+
+    Records are stored in one Chroma collection per key value, created as
+    values are first written; see app.rag.sharding.
+    """
+    os.makedirs(persist_dir, exist_ok=True)
+    shards = _read_json(persist_dir, SHARDS_FILE)
+    shards[collection_name] = shard_key
+    _write_json(persist_dir, SHARDS_FILE, shards)
+    return get_vectorstore(persist_dir, collection_name)
+
+
+# ----------------------------------------------------------------------------
+# Versioned collections
+# ----------------------------------------------------------------------------
+# A rebuild writes a new physical collection "<alias>__v<timestamp>" and then
+# points the alias at it in ALIAS_FILE, so readers never see a half-built
+# knowledge base. An alias with no entry resolves to the collection of the
+# same name, which keeps stores built before versioning working.
+ALIAS_FILE = "aliases.json"
+WATERMARK_FILE = "watermarks.json"
+VERSION_SEPARATOR = "__v"
+
+_resolved: dict[tuple[str, str], tuple[float, str]] = {}
+
+
+def _read_json(persist_dir: str, filename: str) -> dict:
+    try:
+        with open(os.path.join(persist_dir, filename), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_json(persist_dir: str, filename: str, data: dict) -> None:
+    """Replace a state file atomically, so readers see the old or new content."""
+    tmp_path = os.path.join(persist_dir, f".{filename}.{os.getpid()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(persist_dir, filename))
+
+
+def read_aliases(persist_dir: str = "./vectordb") -> dict[str, str]:
+    """Return the alias -> collection name mapping for a persistence directory."""
+    return _read_json(persist_dir, ALIAS_FILE)
+
+
+def set_alias(persist_dir: str, alias: str, collection_name: str) -> str | None:
+    """
+    Atomically point an alias at a collection.
+
+    Args:
+        persist_dir: Directory of the vector database
+        alias: Name clients ask for, e.g. "knowledge_base"
+        collection_name: Physical collection the alias should resolve to
+
+    Returns:
+        The collection the alias pointed at before, if any
+    """
+    aliases = read_aliases(persist_dir)
+    previous = aliases.get(alias)
+    aliases[alias] = collection_name
+    _write_json(persist_dir, ALIAS_FILE, aliases)
+    # Expire this process's cached resolution, so a rebuild run by the API goes live at once
+    key = (_registry_key(persist_dir), alias)
+    cached = _resolved.get(key)
+    if cached is not None:
+        _resolved[key] = (float("-inf"), cached[1])
+    logger.info("Alias %s -> %s (was %s)", alias, collection_name, previous)
+    return previous
+
+
+def resolve_alias(persist_dir: str, alias: str, max_age: float = 1.0) -> str:
+    """
+    Return the collection name an alias points at.
+
+    The alias file is re-read at most every max_age seconds per process, so
+    a swap published by the ingestion job is picked up without a restart.
+    """
+    key = (_registry_key(persist_dir), alias)
+    now = time.monotonic()
+    cached = _resolved.get(key)
+    if cached is not None and now - cached[0] < max_age:
+        return cached[1]
+
+    name = read_aliases(persist_dir).get(alias, alias)
+    if cached is not None and cached[1] != name:
+        logger.info("Alias %s switched from %s to %s", alias, cached[1], name)
+        # Requests already holding the old handle keep using it
+        with _registry_lock:
+            _collections.pop((key[0], cached[1]), None)
+    _resolved[key] = (now, name)
+    return name
+
+
+def get_aliased_vectorstore(persist_dir: str = "./vectordb", alias: str = DEFAULT_COLLECTION):
+    """Return the shared collection handle the alias currently points at."""
+    return get_vectorstore(persist_dir, resolve_alias(persist_dir, alias))
+
+
+def version_name(alias: str) -> str:
+    """Return a new, sortable physical collection name for an alias."""
+    return f"{alias}{VERSION_SEPARATOR}{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}"
+
+
+def list_versions(persist_dir: str, alias: str) -> list[str]:
+    """Return the alias's physical collections, oldest first."""
+    prefix = f"{alias}{VERSION_SEPARATOR}"
+    # A sharded version exists only as its shards
+    names = {name.split(SHARD_SEPARATOR)[0] for name in _collection_names(persist_dir)}
+    return sorted(name for name in names if name.startswith(prefix))
+
+
+def drop_collection(persist_dir: str, collection_name: str) -> None:
+    """Delete a physical (or sharded) collection and forget its cached handle."""
+    with _registry_lock:
+        _collections.pop((_registry_key(persist_dir), collection_name), None)
+    shards = _read_json(persist_dir, SHARDS_FILE)
+    if collection_name in shards:
+        for shard_name in _shard_names(persist_dir, collection_name):
+            drop_collection(persist_dir, shard_name)
+        del shards[collection_name]
+        _write_json(persist_dir, SHARDS_FILE, shards)
+    else:
+        get_client(persist_dir).delete_collection(collection_name)
+    watermarks = _read_json(persist_dir, WATERMARK_FILE)
+    if watermarks.pop(collection_name, None) is not None:
+        _write_json(persist_dir, WATERMARK_FILE, watermarks)
+    logger.info("Dropped collection %s", collection_name)
+
+
+def read_watermark(persist_dir: str, collection_name: str, source: str) -> int:
+    """
+    Return the highest source key already ingested into a physical collection.
+
+    Watermarks are kept per physical collection, so a blue/green rebuild
+    starts its new version from scratch.
+    """
+    return _read_json(persist_dir, WATERMARK_FILE).get(collection_name, {}).get(source, 0)
+
+
+def set_watermark(persist_dir: str, collection_name: str, source: str, value: int) -> None:
+    """Record the highest source key ingested into a physical collection."""
+    watermarks = _read_json(persist_dir, WATERMARK_FILE)
+    watermarks.setdefault(collection_name, {})[source] = value
+    _write_json(persist_dir, WATERMARK_FILE, watermarks)
+
+
+def warm_up(collection) -> dict:
+    """
+    Load a collection's index into memory before it serves traffic.
+    
+    ChromaDB loads the HNSW segment lazily on the first query; running a
+    query with a stored embedding forces that load (and the embedding
+    lookup path) up front without needing an embedding model.
+    
+    Args:
+        collection: ChromaDB collection
+        
+    Returns:
+        Dict with the collection count and warm-up time in milliseconds
+    """
+    start = time.perf_counter()
+    count = collection.count()
+    
+    if count:
+        sample = collection.get(limit=1, include=["embeddings"])
+        embeddings = sample.get("embeddings")
+        if embeddings is not None and len(embeddings):
+            collection.query(query_embeddings=[embeddings[0]], n_results=1)
+    
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info("Warmed up collection %s (%d documents) in %.1f ms", collection.name, count, elapsed_ms)
+    return {"count": count, "warmup_ms": elapsed_ms}
+
+
+def close_vectorstores() -> None:
+    """Drop all cached clients and collection handles."""
+    with _registry_lock:
+        opened = bool(_clients)
+        _collections.clear()
+        _clients.clear()
+    
+    # PersistentClient shares one System per path; clearing the cache
+    # stops those systems and releases the SQLite handles.
+    if opened:
+        from chromadb.api.client import SharedSystemClient
+
+        clear_cache = getattr(SharedSystemClient, "clear_system_cache", None)
+        if clear_cache is not None:
+            clear_cache()
+    logger.info("Vector store clients closed")
+
+
 def add_documents(
     collection,
     chunks: list[str],
     metadatas: list[dict],
     ids: list[str],
-    embeddings: list[list[float]] | None = None,
+    embeddings: "list[list[float]] | np.ndarray | None" = None,
 ):
     """
     Add chunked documents to vector store.
@@ -47,9 +357,10 @@ def add_documents(
         chunks: List of text chunks
         metadatas: List of metadata dicts for each chunk
         ids: List of unique IDs for each chunk
-        embeddings: Optional pre-computed embeddings
+        embeddings: Optional pre-computed embeddings (lists or a 2-D array,
+            which is passed through without conversion)
     """
-    if embeddings:
+    if embeddings is not None and len(embeddings):
         collection.add(
             documents=chunks,
             metadatas=metadatas,
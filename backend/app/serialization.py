@@ -0,0 +1,42 @@
+"""Fast JSON encoding for results the application produced itself."""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import Response
+
+# Naive timestamps are encoded as-is (YYYY-MM-DDTHH:MM:SS[.ffffff]); UTC
+# offsets as "Z", matching what Pydantic emitted for these values before.
+_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_UTC_Z
+
+
+def _default(value: Any) -> Any:
+    # NUMERIC columns arrive as Decimal; a string keeps every digit and is
+    # the representation clients already receive
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode content to JSON bytes with the app's Decimal/timestamp rules."""
+    return orjson.dumps(content, default=_default, option=_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response encoded with orjson.
+
+    Returning a Response makes FastAPI skip response_model validation and
+    jsonable_encoder, so only use it for content that already has the
+    documented shape. Pre-encoded bytes (e.g. shared between coalesced
+    requests) are sent unchanged.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
@@ -0,0 +1,94 @@
+"""Single-flight coalescing of concurrent identical requests."""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def make_key(*parts: Any) -> str:
+    """Build a stable coalescing key from JSON-serializable parts."""
+    return json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+class _Call:
+    """An in-flight execution shared by every waiter on the same key."""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Share one in-flight execution between concurrent callers of the same key.
+
+    The first caller for a key starts the work; callers arriving while it is
+    running await the same task and receive its result or its exception.
+    Each caller waits at most its own timeout. When the last waiter gives up
+    (timeout or cancellation) the shared execution is cancelled as well, so
+    abandoned work does not keep running.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._calls: dict[Hashable, _Call] = {}
+
+    def in_flight(self) -> int:
+        """Number of keys currently executing."""
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[T]],
+        timeout: float | None = None,
+    ) -> T:
+        """
+        Run fn() for key, or join the execution already running for it.
+
+        Args:
+            key: Identity of the request; equal keys are coalesced
+            fn: Zero-argument coroutine factory doing the actual work
+            timeout: Seconds this caller is willing to wait (None = no limit)
+
+        Returns:
+            The result of the shared execution
+
+        Raises:
+            asyncio.TimeoutError: If this caller's timeout elapses first
+            Exception: Whatever the shared execution raised
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _task, key=key, call=call: self._forget(key, call))
+        else:
+            logger.debug("%s: joined in-flight call for %s", self.name, key)
+
+        call.waiters += 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(call.task), timeout)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Unregister before cancelling: the task only finishes (and
+                # _forget runs) later, and a caller arriving in between must
+                # start a new execution rather than join the dying one
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+                call.task.cancel()
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        # Mark the exception as retrieved when every waiter already left
+        if not call.task.cancelled():
+            call.task.exception()
@@ -0,0 +1,99 @@
+"""In-memory snapshots of small, slowly changing analytics results."""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """A precomputed query result and the time it was computed."""
+
+    rows: list[dict[str, Any]]
+    computed_at: float
+
+    @property
+    def age(self) -> float:
+        """Seconds since the snapshot was computed."""
+        return time.time() - self.computed_at
+
+
+class SnapshotScheduler:
+    """
+    Recompute a fixed set of query results on a background thread.
+
+    Each key is passed to compute() every interval seconds and the result
+    replaces the stored snapshot. A failed refresh is logged and the previous
+    snapshot is kept; readers decide via max_age whether it is still usable.
+    """
+
+    def __init__(
+        self,
+        compute: Callable[[Hashable], list[dict[str, Any]]],
+        keys: Iterable[Hashable],
+        interval: float,
+    ):
+        self._compute = compute
+        self._keys = list(keys)
+        self._interval = interval
+        self._snapshots: dict[Hashable, Snapshot] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self, key: Hashable, max_age: float | None = None) -> Snapshot | None:
+        """
+        Return the snapshot for key, or None if missing or older than max_age.
+
+        Args:
+            key: Snapshot key
+            max_age: Maximum acceptable age in seconds (None = any age)
+        """
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            return None
+        if max_age is not None and snapshot.age > max_age:
+            return None
+        return snapshot
+
+    def refresh(self, key: Hashable) -> None:
+        """Recompute one snapshot now."""
+        start = time.perf_counter()
+        try:
+            rows = self._compute(key)
+        except Exception as e:
+            logger.warning("Snapshot refresh failed for %s: %s", key, e)
+            return
+        self._snapshots[key] = Snapshot(rows=rows, computed_at=time.time())
+        logger.debug("Snapshot %s refreshed in %.1f ms", key, (time.perf_counter() - start) * 1000)
+
+    def refresh_all(self) -> None:
+        """Recompute every snapshot now."""
+        for key in self._keys:
+            if self._stop.is_set():
+                return
+            self.refresh(key)
+
+    def start(self) -> None:
+        """Start the background refresh loop."""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="snapshot-scheduler", daemon=True)
+        self._thread.start()
+        logger.info("Snapshot scheduler started (%d keys, every %.0fs)", len(self._keys), self._interval)
+
+    def stop(self) -> None:
+        """Stop the background refresh loop."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.refresh_all()
+            self._stop.wait(self._interval)
@@ -0,0 +1,268 @@
+"""
+Record the hottest requests and replay them after a restart.
+
+Recording is opt-in (WARMUP_ENABLED=1). While serving, hot_requests counts
+the /ask (query, params) pairs that reach Postgres and the /rag/chat
+questions that reach the RAG pipeline. A background thread merges the
+counts into WARMUP_FILE every WARMUP_SAVE_SECONDS, and once more on
+shutdown. Saved counts decay with the time since they were written (x0.8
+per WARMUP_SAVE_SECONDS), so the file follows current traffic and a
+question that stops being asked ages out, across restarts too.
+
+Several worker processes may share one file: each merges only what it
+recorded since its last save, under an exclusive lock on WARMUP_FILE.lock.
+
+On startup the warm-up step loads the file and replays the entries before
+/ready reports ready: /ask queries run against Postgres (filling the
+connection pool and the server's buffer cache) and chat questions are
+embedded, routed and retrieved (paging in the vector index and embedding
+model). Replay never calls the LLM, is bounded by WARMUP_REPLAY_SECONDS,
+and a failing entry is skipped rather than failing startup.
+
+The file holds user questions in plain text; point WARMUP_FILE at storage
+with the same access controls as the logs.
+"""
+
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from .singleflight import make_key
+
+logger = logging.getLogger(__name__)
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "0") == "1"
+WARMUP_FILE = os.getenv("WARMUP_FILE", "./warmup/hot_requests.json")
+WARMUP_SAVE_SECONDS = float(os.getenv("WARMUP_SAVE_SECONDS", "300"))
+# Entries kept in the file and replayed on startup
+WARMUP_MAX_ENTRIES = int(os.getenv("WARMUP_MAX_ENTRIES", "100"))
+# Startup replay stops starting new entries after this many seconds
+WARMUP_REPLAY_SECONDS = float(os.getenv("WARMUP_REPLAY_SECONDS", "30"))
+WARMUP_REPLAY_CONCURRENCY = int(os.getenv("WARMUP_REPLAY_CONCURRENCY", "4"))
+
+# Multiplier applied to saved counts per WARMUP_SAVE_SECONDS of age (0.8
+# halves a count in ~3 intervals)
+_DECAY = 0.8
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Hold an exclusive lock shared by every process saving to path."""
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class HotRequests:
+    """
+    Thread-safe frequency table of recent requests, merged into a JSON file.
+
+    In memory it holds only the requests recorded since this process last
+    saved; the file holds the decayed totals of every process.
+    """
+
+    def __init__(
+        self,
+        path: str = WARMUP_FILE,
+        max_entries: int = WARMUP_MAX_ENTRIES,
+        enabled: bool = WARMUP_ENABLED,
+        decay_seconds: float = WARMUP_SAVE_SECONDS,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.decay_seconds = decay_seconds
+        self._lock = threading.Lock()
+        self._counts: dict[str, float] = {}
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def record(self, kind: str, **payload: Any) -> None:
+        """
+        Count one request.
+
+        Args:
+            kind: "ask" or "chat"
+            payload: JSON-serialisable fields needed to replay the request
+        """
+        if not self.enabled:
+            return
+        key = make_key(kind, payload)
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0.0) + 1
+            if key not in self._entries:
+                self._entries[key] = {"kind": kind, **payload}
+                # Bound memory under a long tail of one-off requests
+                if len(self._entries) > 10 * self.max_entries:
+                    self._prune(self.max_entries * 5)
+
+    def _prune(self, keep: int) -> None:
+        hottest = sorted(self._counts, key=self._counts.__getitem__, reverse=True)[:keep]
+        self._counts = {key: self._counts[key] for key in hottest}
+        self._entries = {key: self._entries[key] for key in hottest}
+
+    def hottest(self, n: int | None = None) -> list[dict[str, Any]]:
+        """The n most frequent entries recorded since the last save (max_entries by default), with their hits."""
+        with self._lock:
+            keys = sorted(self._counts, key=self._counts.__getitem__, reverse=True)[:n or self.max_entries]
+            return [{**self._entries[key], "hits": round(self._counts[key], 3)} for key in keys]
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def _read(self) -> tuple[list[dict[str, Any]], float]:
+        """Saved entries and the time they were saved ([] if there is no usable file)."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            return list(data["entries"]), float(data.get("saved_at", time.time()))
+        except FileNotFoundError:
+            return [], time.time()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring unreadable warm-up file %s: %s", self.path, e)
+            return [], time.time()
+
+    def load(self) -> list[dict[str, Any]]:
+        """
+        Read the saved entries for replay.
+
+        The counts stay in the file; saving merges new requests into them.
+
+        Returns:
+            Saved entries, hottest first ([] if disabled or there is no usable file)
+        """
+        if not self.enabled:
+            return []
+        return self._read()[0]
+
+    def save(self) -> int:
+        """
+        Merge the requests recorded since the last save into the file.
+
+        Under the file lock, the saved counts are decayed by their age, the
+        new counts added, and the hottest max_entries written atomically.
+
+        Returns:
+            Number of entries written
+        """
+        if not self.enabled:
+            return 0
+        with self._lock:
+            counts, entries = self._counts, self._entries
+            self._counts, self._entries = {}, {}
+
+        try:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            with _file_lock(self.path):
+                saved, saved_at = self._read()
+                now = time.time()
+                factor = _DECAY ** (max(0.0, now - saved_at) / self.decay_seconds)
+                merged_counts: dict[str, float] = {}
+                merged_entries: dict[str, dict[str, Any]] = {}
+                for entry in saved:
+                    entry = dict(entry)
+                    hits = float(entry.pop("hits", 1))
+                    key = make_key(entry["kind"], {k: v for k, v in entry.items() if k != "kind"})
+                    merged_counts[key] = merged_counts.get(key, 0.0) + hits * factor
+                    merged_entries[key] = entry
+                for key, count in counts.items():
+                    merged_counts[key] = merged_counts.get(key, 0.0) + count
+                    merged_entries.setdefault(key, entries[key])
+
+                hottest = sorted(merged_counts, key=merged_counts.__getitem__, reverse=True)[:self.max_entries]
+                rows = [{**merged_entries[key], "hits": round(merged_counts[key], 3)} for key in hottest]
+                tmp_path = os.path.join(directory, f".{os.path.basename(self.path)}.{os.getpid()}.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"saved_at": now, "entries": rows}, f, indent=2, default=str)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+        except BaseException:
+            # Keep the unsaved counts for the next attempt
+            with self._lock:
+                for key, count in counts.items():
+                    self._counts[key] = self._counts.get(key, 0.0) + count
+                    self._entries.setdefault(key, entries[key])
+            raise
+        return len(rows)
+
+    def start(self, interval: float = WARMUP_SAVE_SECONDS) -> None:
+        """Save on a background thread every interval seconds."""
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="warmup-save", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and save one last time."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self.enabled:
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning("Could not save warm-up file %s: %s", self.path, e)
+
+    def _run(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.save()
+            except OSError as e:
+                logger.warning("Could not save warm-up file %s: %s", self.path, e)
+
+
+def replay(
+    entries: list[dict[str, Any]],
+    handlers: dict[str, Callable[[dict[str, Any]], Any]],
+    budget: float = WARMUP_REPLAY_SECONDS,
+    concurrency: int = WARMUP_REPLAY_CONCURRENCY,
+) -> dict[str, int]:
+    """
+    Re-run saved requests, hottest first, on a small thread pool.
+
+    Args:
+        entries: Entries from HotRequests.load()
+        handlers: Replay function per entry kind
+        budget: Seconds after which remaining entries are skipped
+        concurrency: Entries replayed at once
+
+    Returns:
+        Counts of replayed, failed and skipped entries
+    """
+    deadline = time.monotonic() + budget
+    stats = {"replayed": 0, "failed": 0, "skipped": 0}
+    lock = threading.Lock()
+
+    def run(entry: dict[str, Any]) -> None:
+        if time.monotonic() > deadline or entry.get("kind") not in handlers:
+            outcome = "skipped"
+        else:
+            try:
+                handlers[entry["kind"]](entry)
+                outcome = "replayed"
+            except Exception as e:
+                logger.debug("Warm-up replay of %s failed: %s", entry, e)
+                outcome = "failed"
+        with lock:
+            stats[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="warmup-replay") as pool:
+        wait([pool.submit(run, entry) for entry in entries])
+    return stats
+
+
+hot_requests = HotRequests()
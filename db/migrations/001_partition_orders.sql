@@ -0,0 +1,112 @@
+-- Migration 001: move orders and order_items to monthly range partitions.
+--
+-- Converts a database created from db/schema.sql to the layout in
+-- db/schema_partitioned.sql. Runs in a single transaction and holds
+-- exclusive locks on orders, order_items and delivery_logs throughout, so
+-- schedule it in a maintenance window and take a backup first.
+--
+-- Usage:
+--     psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f db/migrations/001_partition_orders.sql
+
+BEGIN;
+
+LOCK TABLE orders, order_items, delivery_logs IN ACCESS EXCLUSIVE MODE;
+
+-- 1. Move the heap tables aside
+ALTER TABLE delivery_logs DROP CONSTRAINT IF EXISTS delivery_logs_order_id_fkey;
+ALTER TABLE order_items DROP CONSTRAINT IF EXISTS order_items_order_id_fkey;
+ALTER TABLE order_items RENAME TO order_items_legacy;
+ALTER TABLE orders RENAME TO orders_legacy;
+ALTER INDEX IF EXISTS idx_orders_order_date RENAME TO idx_orders_legacy_order_date;
+ALTER INDEX IF EXISTS idx_orders_customer RENAME TO idx_orders_legacy_customer;
+ALTER INDEX IF EXISTS idx_order_items_order RENAME TO idx_order_items_legacy_order;
+ALTER INDEX IF EXISTS idx_order_items_product RENAME TO idx_order_items_legacy_product;
+
+-- 2. Partitioned tables (same definitions as db/schema_partitioned.sql)
+CREATE TABLE orders (
+order_id SERIAL,
+customer_id INT NOT NULL REFERENCES customers(customer_id),
+order_date TIMESTAMP NOT NULL,
+total_amount NUMERIC(12,2) NOT NULL,
+status VARCHAR(50) DEFAULT 'completed',
+PRIMARY KEY (order_id, order_date)
+) PARTITION BY RANGE (order_date);
+
+CREATE TABLE order_items (
+order_item_id SERIAL,
+order_id INT NOT NULL,
+order_date TIMESTAMP NOT NULL,
+product_id INT NOT NULL REFERENCES products(product_id),
+quantity INT NOT NULL,
+unit_price NUMERIC(10,2) NOT NULL,
+PRIMARY KEY (order_item_id, order_date),
+FOREIGN KEY (order_id, order_date) REFERENCES orders(order_id, order_date) ON DELETE CASCADE
+) PARTITION BY RANGE (order_date);
+
+CREATE TABLE orders_default PARTITION OF orders DEFAULT;
+CREATE TABLE order_items_default PARTITION OF order_items DEFAULT;
+
+CREATE OR REPLACE FUNCTION create_monthly_partitions(parent TEXT, first_month DATE, last_month DATE)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    month DATE := date_trunc('month', first_month)::date;
+    partition_name TEXT;
+    created INT := 0;
+BEGIN
+    WHILE month <= last_month LOOP
+        partition_name := format('%s_y%sm%s', parent, to_char(month, 'YYYY'), to_char(month, 'MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent, month, (month + INTERVAL '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        month := (month + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION create_future_partitions(months_ahead INT DEFAULT 3)
+RETURNS INT
+LANGUAGE sql AS $$
+    SELECT create_monthly_partitions('orders', date_trunc('month', now())::date,
+                                     (date_trunc('month', now()) + make_interval(months => months_ahead))::date)
+         + create_monthly_partitions('order_items', date_trunc('month', now())::date,
+                                     (date_trunc('month', now()) + make_interval(months => months_ahead))::date);
+$$;
+
+-- 3. Partitions covering all existing history, then the months ahead
+SELECT create_monthly_partitions('orders', COALESCE(min(order_date), now())::date, now()::date) FROM orders_legacy;
+SELECT create_monthly_partitions('order_items', COALESCE(min(order_date), now())::date, now()::date) FROM orders_legacy;
+SELECT create_future_partitions(3);
+
+-- 4. Copy the data; order_items picks up its order's date
+INSERT INTO orders (order_id, customer_id, order_date, total_amount, status)
+SELECT order_id, customer_id, order_date, total_amount, status
+FROM orders_legacy;
+
+INSERT INTO order_items (order_item_id, order_id, order_date, product_id, quantity, unit_price)
+SELECT oi.order_item_id, oi.order_id, o.order_date, oi.product_id, oi.quantity, oi.unit_price
+FROM order_items_legacy oi
+JOIN orders_legacy o ON o.order_id = oi.order_id;
+
+SELECT setval(pg_get_serial_sequence('orders', 'order_id'), COALESCE(max(order_id), 0) + 1, false) FROM orders;
+SELECT setval(pg_get_serial_sequence('order_items', 'order_item_id'), COALESCE(max(order_item_id), 0) + 1, false) FROM order_items;
+
+-- 5. Indexes (created on every partition)
+CREATE INDEX idx_orders_order_date ON orders(order_date);
+CREATE INDEX idx_orders_customer ON orders(customer_id);
+CREATE INDEX idx_order_items_order ON order_items(order_id, order_date);
+CREATE INDEX idx_order_items_product ON order_items(product_id);
+
+-- 6. Drop the old tables
+DROP TABLE order_items_legacy;
+DROP TABLE orders_legacy;
+
+COMMIT;
+
+ANALYZE orders;
+ANALYZE order_items;
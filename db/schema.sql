@@ -64,6 +64,7 @@ status VARCHAR(50)
 -- Indexes to support analytical queries
 CREATE INDEX idx_orders_order_date ON orders(order_date);
 CREATE INDEX idx_orders_customer ON orders(customer_id);
+CREATE INDEX idx_order_items_order ON order_items(order_id);
 CREATE INDEX idx_order_items_product ON order_items(product_id);
 CREATE INDEX idx_products_category ON products(category);
 CREATE INDEX idx_customers_country ON customers(country);
\ No newline at end of file
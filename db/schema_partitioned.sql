@@ -0,0 +1,134 @@
+-- Database: smart_insights (partitioned layout)
+--
+-- Same tables as schema.sql, but orders and order_items are range
+-- partitioned by month on order_date so date-windowed queries only scan the
+-- partitions they need. order_items carries its order's order_date so it can
+-- be co-partitioned and pruned with the same predicate.
+--
+-- Set DB_PARTITIONED_SCHEMA=1 for the API to emit partition-aware queries.
+-- Future partitions are created by create_future_partitions(), see
+-- scripts/maintain_partitions.py.
+
+
+CREATE TABLE products (
+product_id SERIAL PRIMARY KEY,
+sku VARCHAR(50) UNIQUE NOT NULL,
+name VARCHAR(255) NOT NULL,
+category VARCHAR(100),
+price NUMERIC(10,2) NOT NULL,
+created_at TIMESTAMP DEFAULT NOW()
+);
+
+
+CREATE TABLE customers (
+customer_id SERIAL PRIMARY KEY,
+email VARCHAR(255) UNIQUE,
+first_name VARCHAR(100),
+last_name VARCHAR(100),
+country VARCHAR(100),
+signup_date DATE,
+is_premium BOOLEAN DEFAULT FALSE
+);
+
+
+-- Primary keys of partitioned tables must include the partition key
+CREATE TABLE orders (
+order_id SERIAL,
+customer_id INT NOT NULL REFERENCES customers(customer_id),
+order_date TIMESTAMP NOT NULL,
+total_amount NUMERIC(12,2) NOT NULL,
+status VARCHAR(50) DEFAULT 'completed',
+PRIMARY KEY (order_id, order_date)
+) PARTITION BY RANGE (order_date);
+
+
+CREATE TABLE order_items (
+order_item_id SERIAL,
+order_id INT NOT NULL,
+order_date TIMESTAMP NOT NULL,
+product_id INT NOT NULL REFERENCES products(product_id),
+quantity INT NOT NULL,
+unit_price NUMERIC(10,2) NOT NULL,
+PRIMARY KEY (order_item_id, order_date),
+FOREIGN KEY (order_id, order_date) REFERENCES orders(order_id, order_date) ON DELETE CASCADE
+) PARTITION BY RANGE (order_date);
+
+
+CREATE TABLE support_tickets (
+ticket_id SERIAL PRIMARY KEY,
+customer_id INT REFERENCES customers(customer_id),
+subject TEXT,
+body TEXT,
+created_at TIMESTAMP DEFAULT NOW(),
+resolved_at TIMESTAMP NULL,
+channel VARCHAR(50) -- email/chat/phone
+);
+
+
+-- order_id alone is not unique across partitions, so it cannot be a
+-- foreign key target; the loader is responsible for valid order ids.
+CREATE TABLE delivery_logs (
+delivery_id SERIAL PRIMARY KEY,
+order_id INT,
+shipped_at TIMESTAMP,
+delivered_at TIMESTAMP,
+carrier VARCHAR(100),
+status VARCHAR(50)
+);
+
+
+-- Rows outside every monthly partition land here; keep it empty by
+-- creating partitions ahead of time.
+CREATE TABLE orders_default PARTITION OF orders DEFAULT;
+CREATE TABLE order_items_default PARTITION OF order_items DEFAULT;
+
+
+-- Create parent_yYYYYmMM partitions for every month in [first_month, last_month]
+CREATE OR REPLACE FUNCTION create_monthly_partitions(parent TEXT, first_month DATE, last_month DATE)
+RETURNS INT
+LANGUAGE plpgsql AS $$
+DECLARE
+    month DATE := date_trunc('month', first_month)::date;
+    partition_name TEXT;
+    created INT := 0;
+BEGIN
+    WHILE month <= last_month LOOP
+        partition_name := format('%s_y%sm%s', parent, to_char(month, 'YYYY'), to_char(month, 'MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                partition_name, parent, month, (month + INTERVAL '1 month')::date
+            );
+            created := created + 1;
+        END IF;
+        month := (month + INTERVAL '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$;
+
+
+-- Ensure partitions exist from the current month through months_ahead months out
+CREATE OR REPLACE FUNCTION create_future_partitions(months_ahead INT DEFAULT 3)
+RETURNS INT
+LANGUAGE sql AS $$
+    SELECT create_monthly_partitions('orders', date_trunc('month', now())::date,
+                                     (date_trunc('month', now()) + make_interval(months => months_ahead))::date)
+         + create_monthly_partitions('order_items', date_trunc('month', now())::date,
+                                     (date_trunc('month', now()) + make_interval(months => months_ahead))::date);
+$$;
+
+
+-- Two years of history plus three months ahead
+SELECT create_monthly_partitions('orders', (now() - INTERVAL '24 months')::date, now()::date);
+SELECT create_monthly_partitions('order_items', (now() - INTERVAL '24 months')::date, now()::date);
+SELECT create_future_partitions(3);
+
+
+-- Indexes to support analytical queries (created on every partition)
+CREATE INDEX idx_orders_order_date ON orders(order_date);
+CREATE INDEX idx_orders_customer ON orders(customer_id);
+CREATE INDEX idx_order_items_order ON order_items(order_id, order_date);
+CREATE INDEX idx_order_items_product ON order_items(product_id);
+CREATE INDEX idx_products_category ON products(category);
+CREATE INDEX idx_customers_country ON customers(country);
@@ -12,15 +12,19 @@ import psycopg2
 
 fake = Faker()
 
-CREATE_TABLES_SQL = open('db/schema.sql').read()
+SCHEMA_PATHS = {
+    'plain': 'db/schema.sql',
+    'partitioned': 'db/schema_partitioned.sql',
+}
 
 def connect(db_url):
     conn = psycopg2.connect(db_url)
     return conn
 
-def seed(conn, n_products=100, n_customers=50, n_orders=200):
+def seed(conn, n_products=100, n_customers=50, n_orders=200, schema='plain'):
+    partitioned = schema == 'partitioned'
     cur = conn.cursor()
-    cur.execute(CREATE_TABLES_SQL)
+    cur.execute(open(SCHEMA_PATHS[schema]).read())
     conn.commit()
     
     products = []
@@ -65,10 +69,15 @@ def seed(conn, n_products=100, n_customers=50, n_orders=200):
             p = random.choice(products)
             qty = random.randint(1,3)
             unit = p['price']
-            cur.execute("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (%s,%s,%s,%s)",
-                        (oid, p['product_id'], qty, unit))
+            if partitioned:
+                # order_items carries its order's date in the partitioned layout
+                cur.execute("INSERT INTO order_items (order_id, order_date, product_id, quantity, unit_price) VALUES (%s,%s,%s,%s,%s)",
+                            (oid, order_date, p['product_id'], qty, unit))
+            else:
+                cur.execute("INSERT INTO order_items (order_id, product_id, quantity, unit_price) VALUES (%s,%s,%s,%s)",
+                            (oid, p['product_id'], qty, unit))
             total += qty * unit
-        cur.execute("UPDATE orders SET total_amount = %s WHERE order_id = %s", (round(total,2), oid))
+        cur.execute("UPDATE orders SET total_amount = %s WHERE order_id = %s AND order_date = %s", (round(total,2), oid, order_date))
 
 
         # delivery
@@ -98,8 +107,9 @@ def seed(conn, n_products=100, n_customers=50, n_orders=200):
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('--db-url', required=True)
+    parser.add_argument('--schema', choices=sorted(SCHEMA_PATHS), default='plain')
     args = parser.parse_args()
     conn = connect(args.db_url)
-    seed(conn)
+    seed(conn, schema=args.schema)
     conn.close()
     print('Seeding complete')
\ No newline at end of file
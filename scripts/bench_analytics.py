@@ -0,0 +1,129 @@
+"""
+Parity check and benchmark: SQL templates vs the columnar mirror.
+
+Runs every /ask template against Postgres and against ColumnarMirror,
+verifies the results are identical and reports per-query latency.
+
+Usage:
+    python scripts/bench_analytics.py
+    python scripts/bench_analytics.py --iterations 50
+"""
+
+import argparse
+import copy
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.analytics import ColumnarMirror
+from app.db import db_manager
+from app.queries import RANGE_QUERIES, QueryType, build_query
+
+# Metric column per template, used to accept tie-order differences under LIMIT
+METRIC_COLUMNS = {
+    QueryType.TOP_PRODUCTS_LAST_90_DAYS: "revenue",
+    QueryType.TOP_CUSTOMERS_LTV: "lifetime_value",
+    QueryType.TOP_PRODUCTS_BY_RANGE: "revenue",
+    QueryType.TOP_CATEGORIES_BY_RANGE: "revenue",
+    QueryType.TOP_COUNTRIES_BY_RANGE: "revenue",
+}
+# Window used for the date-range templates
+RANGE_PARAMS = {
+    "start": (date.today() - timedelta(days=120)).isoformat(),
+    "end": (date.today() - timedelta(days=30)).isoformat(),
+}
+# Templates without ORDER BY: compare as unordered row sets
+UNORDERED = {QueryType.AOV_BY_SEGMENT}
+
+
+def _compare(query: QueryType, sql_rows: list[dict], mirror_rows: list[dict]) -> str:
+    if query in UNORDERED:
+        sql_rows = sorted(sql_rows, key=repr)
+        mirror_rows = sorted(mirror_rows, key=repr)
+    if sql_rows == mirror_rows:
+        return "identical"
+
+    metric = METRIC_COLUMNS.get(query)
+    if metric and [r[metric] for r in sql_rows] == [r[metric] for r in mirror_rows]:
+        return "identical (tie order differs)"
+
+    for i, (expected, actual) in enumerate(zip(sql_rows, mirror_rows)):
+        if expected != actual:
+            return f"MISMATCH at row {i}: sql={expected!r} mirror={actual!r}"
+    return f"MISMATCH: sql returned {len(sql_rows)} rows, mirror {len(mirror_rows)}"
+
+
+def _report_cube(mirror: ColumnarMirror) -> None:
+    cube = mirror.cube
+    if cube is None:
+        print()
+        return
+    stats = cube.stats()
+    print(f"Revenue cube: {stats['days']} days x ({stats['products']} products + "
+          f"{stats['countries']} countries), {stats['nbytes'] / 1e6:.2f} MB")
+
+    # Cost of folding one new day of orders into the cube
+    trial = copy.deepcopy(cube)
+    n = 1000
+    rng = np.random.default_rng(0)
+    next_day = np.full(n, trial.origin + np.timedelta64(trial.days, "D"))
+    start = time.perf_counter()
+    trial._add(
+        next_day,
+        rng.integers(0, stats["products"], n),
+        rng.integers(0, stats["countries"], n),
+        rng.integers(100, 10_000, n),
+    )
+    print(f"Append one day ({n} items): {(time.perf_counter() - start) * 1000:.3f} ms\n")
+
+
+def _time_ms(fn, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar mirror parity check and benchmark")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    mirror = ColumnarMirror(db_manager)
+    start = time.perf_counter()
+    mirror.refresh()
+    print(f"Initial load: {len(mirror.order_ids)} orders, {len(mirror.item_order_ids)} items "
+          f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    mirror.refresh()
+    print(f"Incremental refresh (no new orders): {(time.perf_counter() - start) * 1000:.1f} ms")
+    _report_cube(mirror)
+
+    failures = 0
+    print(f"{'template':<30} {'sql ms':>9} {'mirror ms':>10}  parity")
+    for query in QueryType:
+        if not mirror.supports(query):
+            continue
+        sql, params = build_query(query, RANGE_PARAMS if query in RANGE_QUERIES else {})
+        db_now = db_manager.execute_query("SELECT LOCALTIMESTAMP AS now")[0]["now"]
+        parity = _compare(query, db_manager.execute_query(sql, params), mirror.run(query, params, now=db_now))
+        failures += parity.startswith("MISMATCH")
+
+        sql_ms = _time_ms(lambda: db_manager.execute_query(sql, params), args.iterations)
+        mirror_ms = _time_ms(lambda: mirror.run(query, params), args.iterations)
+        print(f"{query.value:<30} {sql_ms:9.3f} {mirror_ms:10.3f}  {parity}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Accuracy and cost of the approximate /ask mode.
+
+Synthetic: streams Zipf-distributed orders (customer id, order total) in
+batches into the sketches SketchStore uses and compares them with exact
+NumPy answers, reporting the distinct-customer and repeat-rate errors
+against their 95% bounds, top-k recall and value error, how often the
+exact value falls inside the reported bounds, update throughput, query
+latency and memory, as the stream grows.
+
+With --db, also loads the smart_insights database into a SketchStore and
+a ColumnarMirror and prints both answers side by side.
+
+Usage:
+    python scripts/bench_approximate.py
+    python scripts/bench_approximate.py --orders 1000000 5000000 --customers 2000000
+    python scripts/bench_approximate.py --db
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.analytics.sketches import CountMinSketch, HyperLogLog, KeySample, SpaceSaving
+
+
+def _stream(rng: np.random.Generator, n: int, customers: int) -> tuple[np.ndarray, np.ndarray]:
+    """Order customer ids (Zipf over a shuffled id space) and totals in cents."""
+    ids = rng.permutation(customers) + 1
+    customer_ids = ids[(rng.zipf(1.2, n) - 1) % customers]
+    totals = rng.lognormal(mean=8.5, sigma=1.0, size=n).astype(np.int64) + 100
+    return customer_ids, totals
+
+
+def _synthetic(n: int, args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(args.seed)
+    customer_ids, totals = _stream(rng, n, args.customers)
+
+    hll = HyperLogLog(args.hll_precision)
+    sample = KeySample(args.sample_size)
+    ltv = SpaceSaving(args.capacity)
+    cm = CountMinSketch(args.cm_width, args.cm_depth)
+    start = time.perf_counter()
+    for i in range(0, n, args.batch):
+        batch_ids, batch_totals = customer_ids[i:i + args.batch], totals[i:i + args.batch]
+        hll.add(batch_ids)
+        sample.add(batch_ids)
+        ltv.add(batch_ids, batch_totals)
+        cm.add(batch_ids, batch_totals)
+    update = time.perf_counter() - start
+
+    start = time.perf_counter()
+    distinct = hll.estimate()
+    rate, rate_low, rate_high = sample.proportion(sample.counts > 1, distinct)
+    upper = np.minimum(ltv.counts, cm.estimate(ltv.keys))
+    lower = ltv.counts - ltv.errors
+    estimate = (upper + lower) // 2
+    top = np.lexsort((ltv.keys, -estimate))[:args.top]
+    query_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    keys, inverse = np.unique(customer_ids, return_inverse=True)
+    order_counts = np.bincount(inverse)
+    exact_ltv = np.bincount(inverse, weights=totals)
+    exact_rate = float(np.mean(order_counts > 1))
+    exact_top = keys[np.lexsort((keys, -exact_ltv))[:args.top]]
+    exact_ms = (time.perf_counter() - start) * 1000
+
+    approx_top = ltv.keys[top]
+    true_values = exact_ltv[np.searchsorted(keys, approx_top)]
+    relative = np.abs(estimate[top] - true_values) / true_values
+    covered = np.mean((lower[top] <= true_values) & (true_values <= upper[top]))
+    nbytes = (
+        hll.registers.nbytes + cm.table.nbytes
+        + ltv.keys.nbytes + ltv.counts.nbytes + ltv.errors.nbytes
+        + sample.keys.nbytes + sample.hashes.nbytes + sample.counts.nbytes
+    )
+    print(
+        f"{n:>10,} {len(keys):>9,} {(distinct - len(keys)) / len(keys):>+8.2%} "
+        f"{rate - exact_rate:>+8.4f} {(rate_high - rate_low) / 2:>7.4f} "
+        f"{len(set(approx_top) & set(exact_top)) / args.top:>7.0%} {relative.mean():>8.2%} {covered:>8.0%} "
+        f"{n / update / 1e6:>8.2f} {query_ms:>8.2f} {exact_ms:>9.1f} {nbytes / 1e6:>7.2f}"
+    )
+
+
+def _database(args: argparse.Namespace) -> None:
+    from app.analytics import ColumnarMirror, SketchStore
+    from app.db import db_manager
+    from app.queries import QueryType
+
+    store = SketchStore(db_manager, sample_size=args.sample_size, customer_capacity=args.capacity)
+    start = time.perf_counter()
+    store.refresh()
+    print(f"\nSketch store: {store.orders_seen:,} orders in {time.perf_counter() - start:.2f} s, "
+          f"{store.nbytes() / 1e6:.2f} MB")
+    mirror = ColumnarMirror(db_manager, revenue_cube=False)
+    mirror.refresh()
+
+    columns = {
+        QueryType.REPEAT_PURCHASE_RATE: "repeat_purchase_rate",
+        QueryType.TOP_CUSTOMERS_LTV: "lifetime_value",
+        QueryType.TOP_PRODUCTS_LAST_90_DAYS: "revenue",
+    }
+    for query, column in columns.items():
+        params = {} if query == QueryType.REPEAT_PURCHASE_RATE else {"limit": 5}
+        now = store.now()
+        start = time.perf_counter()
+        rows, approximation = store.run(query, params, now)
+        elapsed = (time.perf_counter() - start) * 1000
+        exact = mirror.run(query, params, now)
+        print(f"{query.value} ({approximation['method']}, {elapsed:.2f} ms)")
+        for row, bounds, expected in zip(rows, approximation["bounds"], exact):
+            low, high = bounds[column]
+            print(f"  approx {row[column]!s:>24} in [{low}, {high}]   exact {expected[column]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the sketch-based approximate mode")
+    parser.add_argument("--orders", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--batch", type=int, default=50_000)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--hll-precision", type=int, default=14)
+    parser.add_argument("--sample-size", type=int, default=16_384)
+    parser.add_argument("--capacity", type=int, default=4096)
+    parser.add_argument("--cm-width", type=int, default=1 << 16)
+    parser.add_argument("--cm-depth", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", action="store_true", help="Also compare against the smart_insights database")
+    args = parser.parse_args()
+
+    print(
+        f"{'orders':>10} {'distinct':>9} {'hll err':>8} {'rate err':>8} {'rate ±':>7} "
+        f"{'recall':>7} {'ltv err':>8} {'in bnds':>8} {'M ord/s':>8} {'query ms':>8} {'exact ms':>9} {'MB':>7}"
+    )
+    for n in args.orders:
+        _synthetic(n, args)
+    if args.db:
+        _database(args)
+
+
+if __name__ == "__main__":
+    main()
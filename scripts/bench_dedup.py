@@ -0,0 +1,140 @@
+"""
+Benchmark near-duplicate chunk elimination at ingest time.
+
+Builds a corpus of the real docs plus synthetic support articles that quote
+policy sections with small edits (the way support articles restate return and
+shipping rules), ingests it with and without deduplication, and compares
+index size, search latency and the size of the prompt built from the top-k
+chunks for policy questions.
+
+Usage:
+    python scripts/bench_dedup.py
+    python scripts/bench_dedup.py --articles 200 --top-k 5
+"""
+
+import argparse
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.api import _build_prompt
+from app.rag.dedup import shingles
+from app.rag.ingest import ingest_directory
+from app.rag.retriever import search
+from app.rag.vectorstore import get_vectorstore
+
+DOCS_DIR = Path(__file__).parent.parent / "docs"
+QUESTIONS = [
+    "How long do I have to return an item?",
+    "How much does express shipping cost?",
+    "Do you ship internationally?",
+    "How are refunds issued?",
+    "What items cannot be returned?",
+    "How do I track my order?",
+]
+
+
+def _policy_sections() -> list[str]:
+    sections = []
+    for path in sorted((DOCS_DIR / "policies").glob("*.md")):
+        sections.extend(s.strip() for s in re.split(r"\n(?=## )", path.read_text(encoding="utf-8")) if s.startswith("## "))
+    return sections
+
+
+def _perturb(text: str, rng: random.Random) -> str:
+    """Quote text with the small edits copy-paste picks up: case, spacing, the odd word."""
+    words = text.split(" ")
+    for i in range(len(words)):
+        if rng.random() < 0.02:
+            words[i] = words[i].upper() if rng.random() < 0.5 else words[i] + ","
+    return " ".join(words).replace("\n\n", "\n\n" if rng.random() < 0.5 else "\n \n")
+
+
+def _build_corpus(root: Path, articles: int, seed: int) -> None:
+    rng = random.Random(seed)
+    shutil.copytree(DOCS_DIR, root, dirs_exist_ok=True)
+    sections = _policy_sections()
+    out = root / "support_articles" / "generated"
+    out.mkdir(parents=True, exist_ok=True)
+    for n in range(articles):
+        unique = " ".join(f"Case note {n}.{i}: customer {rng.randint(1, 99999)} reported issue {rng.randint(1, 999)}."
+                          for i in range(6))
+        quoted = [_perturb(s, rng) for s in rng.sample(sections, k=min(3, len(sections)))]
+        body = "\n\n".join([f"# Support article {n}", unique, "As our policy says:", *quoted])
+        (out / f"article_{n:04d}.md").write_text(body, encoding="utf-8")
+
+
+def _dir_mb(path: Path) -> float:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file()) / 1e6
+
+
+def _run(corpus: Path, persist_dir: Path, dedup: bool, top_k: int) -> dict:
+    collection = get_vectorstore(str(persist_dir), "bench")
+    start = time.perf_counter()
+    stats = ingest_directory(collection, corpus, dedup=dedup)
+    ingest_s = time.perf_counter() - start
+
+    latencies, prompt_chars, redundant = [], [], 0
+    for _ in range(5):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            results = search(collection, question, n_results=top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+    for question in QUESTIONS:
+        results = search(collection, question, n_results=top_k)
+        prompt_chars.append(len(_build_prompt(question, results)))
+        # Retrieved chunks that mostly repeat another retrieved chunk
+        seen: list[set[str]] = []
+        for item in results:
+            grams = shingles(item["text"])
+            if any(len(grams & s) / max(1, len(grams | s)) >= 0.5 for s in seen):
+                redundant += 1
+            seen.append(grams)
+
+    return {
+        "chunks": collection.count(),
+        "dropped": stats.duplicates,
+        "disk_mb": _dir_mb(persist_dir),
+        "ingest_s": ingest_s,
+        "p50_ms": statistics.median(latencies),
+        "prompt_chars": statistics.mean(prompt_chars),
+        "redundant": redundant / (len(QUESTIONS) * top_k),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate chunk elimination")
+    parser.add_argument("--articles", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / "docs"
+        _build_corpus(corpus, args.articles, args.seed)
+        rows = {dedup: _run(corpus, Path(tmp) / f"db-{dedup}", dedup, args.top_k) for dedup in (False, True)}
+
+    print(f"{args.articles} synthetic articles quoting policy sections, top-{args.top_k} retrieval")
+    print(f"{'':<24} {'no dedup':>10} {'dedup':>10}")
+    for key, label, fmt in (
+        ("chunks", "chunks stored", "{:>10,}"),
+        ("dropped", "near-duplicates dropped", "{:>10,}"),
+        ("disk_mb", "index on disk (MB)", "{:>10.1f}"),
+        ("ingest_s", "ingest time (s)", "{:>10.1f}"),
+        ("p50_ms", "search p50 (ms)", "{:>10.2f}"),
+        ("prompt_chars", "prompt chars (mean)", "{:>10,.0f}"),
+        ("redundant", "redundant contexts", "{:>10.0%}"),
+    ):
+        print(f"{label:<24} {fmt.format(rows[False][key])} {fmt.format(rows[True][key])}")
+
+
+if __name__ == "__main__":
+    main()
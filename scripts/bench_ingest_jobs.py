@@ -0,0 +1,201 @@
+"""
+Measure retrieval latency while a background ingestion job runs.
+
+Writes a synthetic corpus (copies of docs/ with varied text) to a temporary
+directory and starts the API under uvicorn with the offline stub embedding,
+so everything runs locally. For each scenario it sends a steady /rag/search
+load (retrieval only: the latency the ingestion throttle steers by) and
+reports its p50/p95:
+
+    idle         no ingestion job
+    unthrottled  a rebuild job with INGEST_TARGET_P95_MS effectively infinite
+    throttled    a rebuild job with INGEST_TARGET_P95_MS = --target-ms
+
+together with the job's duration, throughput, paused time and the ETA it
+reported along the way.
+
+Usage:
+    python scripts/bench_ingest_jobs.py
+    python scripts/bench_ingest_jobs.py --files 2000 --clients 8 --target-ms 150
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+DOCS_DIR = SCRIPTS_DIR.parent / "docs"
+
+QUESTIONS = [
+    "How many days do I have to return an item?",
+    "What does express shipping cost?",
+    "Is there a warranty on electronics?",
+    "How do I reset my password?",
+    "When will my refund appear on my card?",
+]
+
+
+def _request(url: str, payload: dict | None = None, timeout: float = 60.0) -> tuple[int, dict]:
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read() or b"{}")
+
+
+def _write_corpus(root: Path, files: int, seed: int) -> None:
+    """Copies of the sample documents with shuffled paragraphs, so chunks do not deduplicate."""
+    rng = random.Random(seed)
+    sources = sorted(DOCS_DIR.rglob("*.md"))
+    texts = [path.read_text(encoding="utf-8").split("\n\n") for path in sources]
+    for i in range(files):
+        k = i % len(sources)
+        paragraphs = texts[k][:]
+        rng.shuffle(paragraphs)
+        target = root / sources[k].parent.name / f"{sources[k].stem}_{i:05d}.md"
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(f"# Copy {i}\n\n" + "\n\n".join(paragraphs), encoding="utf-8")
+
+
+def _wait_ready(base: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if _request(f"{base}/ready", timeout=2)[0] == 200:
+                return
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("server did not become ready")
+
+
+def _search_load(base: str, clients: int, stop: threading.Event) -> list[float]:
+    """Send /rag/search from several clients until stop is set; returns latencies in ms."""
+    latencies: list[float] = []
+    lock = threading.Lock()
+
+    def client(n: int) -> None:
+        i = n
+        while not stop.is_set():
+            start = time.perf_counter()
+            status, _ = _request(f"{base}/rag/search", {"questions": [QUESTIONS[i % len(QUESTIONS)]]})
+            elapsed = (time.perf_counter() - start) * 1000
+            if status == 200:
+                with lock:
+                    latencies.append(elapsed)
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def _scenario(name: str, args: argparse.Namespace, env: dict, ingest: bool) -> None:
+    base = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        _wait_ready(base, args.timeout)
+        stop = threading.Event()
+        results: list[list[float]] = []
+        load = threading.Thread(target=lambda: results.append(_search_load(base, args.clients, stop)))
+        load.start()
+        # Let the latency window fill before the job starts
+        time.sleep(args.warmup)
+
+        job, etas = None, []
+        if ingest:
+            status, job = _request(f"{base}/rag/ingest/jobs", {"mode": "rebuild"})
+            if status != 202:
+                raise RuntimeError(f"submit failed: HTTP {status} {job}")
+            while job["status"] in ("queued", "running"):
+                time.sleep(0.5)
+                job = _request(f"{base}/rag/ingest/jobs/{job['id']}")[1]
+                eta = job["throughput"]["eta_seconds"]
+                if eta is not None:
+                    etas.append((job["throughput"]["elapsed_seconds"], eta))
+        else:
+            time.sleep(args.idle_seconds)
+        stop.set()
+        load.join()
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    latencies = sorted(results[0])
+    p95 = latencies[int(0.95 * (len(latencies) - 1))]
+    line = f"{name:<12} {len(latencies):>7} {statistics.median(latencies):>8.1f} {p95:>8.1f}"
+    if job is not None:
+        throughput = job["throughput"]
+        line += (
+            f" {job['status']:>10} {throughput['elapsed_seconds']:>7.1f} {throughput['paused_seconds']:>7.1f}"
+            f" {throughput['files_per_second']:>7.1f} {throughput['chunks_per_second']:>8.1f}"
+        )
+    print(line)
+    if etas:
+        # ETA reported a quarter and half of the way through vs. the actual finish
+        for elapsed, eta in (etas[len(etas) // 4], etas[len(etas) // 2]):
+            actual = job["throughput"]["elapsed_seconds"] - elapsed
+            print(f"{'':<12} ETA at {elapsed:5.1f} s: {eta:6.1f} s (actual {actual:.1f} s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval latency during background ingestion")
+    parser.add_argument("--files", type=int, default=1500, help="Documents in the synthetic corpus")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent /rag/search clients")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="INGEST_TARGET_P95_MS when throttled")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of load before the job starts")
+    parser.add_argument("--idle-seconds", type=float, default=10.0, help="Length of the idle scenario")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / "docs"
+        _write_corpus(corpus, args.files, args.seed)
+        env = {
+            **os.environ,
+            "RAG_EMBEDDING_BACKEND": "stub",
+            "VECTORSTORE_DIR": str(Path(tmp) / "vectordb"),
+            "INGEST_DOCS_ROOT": str(corpus),
+            "WARMUP_ENABLED": "0",
+        }
+        # Something to serve while the first job builds
+        subprocess.run(
+            [sys.executable, str(SCRIPTS_DIR / "ingest_docs.py"), "--docs-dir", str(DOCS_DIR),
+             "--persist-dir", env["VECTORSTORE_DIR"], "--embedding", "stub"],
+            check=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+
+        print(f"{args.files} files, {args.clients} search clients, target p95 {args.target_ms:.0f} ms\n")
+        print(f"{'scenario':<12} {'queries':>7} {'p50 ms':>8} {'p95 ms':>8} {'job':>10} {'job s':>7} "
+              f"{'pause s':>7} {'files/s':>7} {'chunks/s':>8}")
+        _scenario("idle", args, env, ingest=False)
+        _scenario("unthrottled", args, {**env, "INGEST_TARGET_P95_MS": "1e9"}, ingest=True)
+        _scenario("throttled", args, {**env, "INGEST_TARGET_P95_MS": str(args.target_ms)}, ingest=True)
+
+
+if __name__ == "__main__":
+    main()
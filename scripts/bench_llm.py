@@ -0,0 +1,109 @@
+"""
+Load test for the LLM execution layer against scripts/fake_llm_server.py.
+
+Sends an open-loop stream of chat completions (Poisson arrivals) through
+LLMExecutor and reports how many calls succeeded, were shed or timed out,
+plus latency percentiles, retries and hedges. Run it once with hedging off
+and once with --hedge-percentile to compare tail latency.
+
+Usage:
+    python scripts/fake_llm_server.py --latency-ms 300 --tail-rate 0.05 --tail-ms 4000 &
+    python scripts/bench_llm.py --requests 400 --rate 40
+    python scripts/bench_llm.py --requests 400 --rate 40 --hedge-percentile 0.9
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from openai import APIConnectionError, AsyncOpenAI
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.llm import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, LLMExecutor, LLMOverloadedError, is_retryable
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+async def _one(executor: LLMExecutor, client: AsyncOpenAI, priority: int, deadline_s: float):
+    async def call(timeout: float) -> str:
+        response = await client.chat.completions.create(
+            model="fake",
+            messages=[{"role": "user", "content": "How did revenue develop last quarter?"}],
+            timeout=timeout,
+        )
+        return response.choices[0].message.content
+
+    start = time.monotonic()
+    try:
+        await executor.run(call, priority=priority, deadline=start + deadline_s)
+        outcome = "ok"
+    except LLMOverloadedError:
+        outcome = "shed"
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+    except Exception as exc:
+        outcome = f"error:{type(exc).__name__}"
+    return outcome, priority, time.monotonic() - start
+
+
+async def _run(args) -> None:
+    client = AsyncOpenAI(base_url=args.base_url, api_key="fake", max_retries=0)
+    executor = LLMExecutor(
+        max_concurrency=args.concurrency,
+        max_queue=args.max_queue,
+        call_timeout=args.call_timeout,
+        hedge_percentile=args.hedge_percentile,
+        retryable=lambda exc: isinstance(exc, APIConnectionError) or is_retryable(exc),
+    )
+
+    tasks = []
+    for _ in range(args.requests):
+        priority = PRIORITY_BACKGROUND if random.random() < args.background_share else PRIORITY_INTERACTIVE
+        tasks.append(asyncio.ensure_future(_one(executor, client, priority, args.deadline)))
+        await asyncio.sleep(random.expovariate(args.rate))
+    results = await asyncio.gather(*tasks)
+    await client.close()
+
+    outcomes = Counter(outcome for outcome, _, _ in results)
+    print(f"{args.requests} requests at {args.rate}/s, concurrency {args.concurrency}, "
+          f"hedge percentile {args.hedge_percentile or 'off'}")
+    print("outcomes:", dict(outcomes))
+    for priority, label in ((PRIORITY_INTERACTIVE, "interactive"), (PRIORITY_BACKGROUND, "background")):
+        ok = [latency * 1000 for outcome, p, latency in results if p == priority and outcome == "ok"]
+        total = sum(1 for _, p, _ in results if p == priority)
+        if total:
+            print(f"{label:<12} ok {len(ok)}/{total}  p50 {_percentile(ok, 0.5):7.0f} ms  "
+                  f"p95 {_percentile(ok, 0.95):7.0f} ms  p99 {_percentile(ok, 0.99):7.0f} ms")
+    shed = [latency * 1000 for outcome, _, latency in results if outcome == "shed"]
+    if shed:
+        print(f"shed decisions took median {statistics.median(shed):.0f} ms")
+    print("executor:", executor.stats())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test LLMExecutor against the fake LLM server")
+    parser.add_argument("--base-url", default="http://localhost:8900/v1")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--rate", type=float, default=40, help="Mean arrivals per second")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--call-timeout", type=float, default=5)
+    parser.add_argument("--deadline", type=float, default=10, help="Seconds each caller is willing to wait")
+    parser.add_argument("--hedge-percentile", type=float, default=0)
+    parser.add_argument("--background-share", type=float, default=0.3)
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
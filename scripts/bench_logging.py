@@ -0,0 +1,150 @@
+"""
+Benchmark the logging cost a request pays, with logging off and on.
+
+Each simulated request makes the log calls an /ask that reaches Postgres
+makes (the "/ask request" record with its extra fields, the DEBUG
+"Executing query" line and the "Query returned" record from app.db), from
+several threads at once. Configurations:
+
+- off: level WARNING, so no records are created
+- sync text: a StreamHandler writing on the calling thread (the previous
+  basicConfig setup)
+- queue text / queue json: configure_logging's background handler
+- queue json sampled: plus LOG_SAMPLE_RATES-style sampling of app.db
+
+The sink is a file; --sink-delay-ms adds a sleep per write to model a slow
+log pipe (container log driver, remote syslog) under back-pressure.
+Reported latency is the time the caller spends in the log calls per
+request; "drain" is the time for the listener to write what was queued.
+
+Usage:
+    python scripts/bench_logging.py
+    python scripts/bench_logging.py --requests 20000 --threads 8 --sink-delay-ms 0.2
+"""
+
+import argparse
+import logging
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.logging_config import TEXT_FORMAT, configure_logging, shutdown_logging
+
+QUERY = """
+SELECT p.product_id, p.name AS product_name, SUM(oi.quantity * oi.unit_price) AS revenue
+FROM order_items oi JOIN products p ON p.product_id = oi.product_id
+"""
+
+
+class SlowStream:
+    """File wrapper whose writes take at least delay seconds."""
+
+    def __init__(self, stream, delay: float):
+        self._stream = stream
+        self._delay = delay
+
+    def write(self, text: str) -> int:
+        if self._delay:
+            time.sleep(self._delay)
+        return self._stream.write(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+def _request(app_logger: logging.Logger, db_logger: logging.Logger, i: int) -> None:
+    app_logger.info("/ask request", extra={"query": "top_products_last_90_days", "params": {"limit": 5}})
+    db_logger.debug("Executing query: %.100s...", QUERY)
+    db_logger.info("Query returned %d rows", i % 50, extra={"rows": i % 50})
+
+
+def _run(requests: int, threads: int) -> list[float]:
+    app_logger, db_logger = logging.getLogger("app"), logging.getLogger("app.db")
+    per_thread = requests // threads
+    latencies: list[list[float]] = [[] for _ in range(threads)]
+    barrier = threading.Barrier(threads)
+
+    def worker(slot: int) -> None:
+        barrier.wait()
+        out = latencies[slot]
+        for i in range(per_thread):
+            start = time.perf_counter()
+            _request(app_logger, db_logger, i)
+            out.append((time.perf_counter() - start) * 1e6)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return [latency for chunk in latencies for latency in chunk]
+
+
+def _configure_sync(stream) -> None:
+    shutdown_logging()
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-request logging overhead")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--sink-delay-ms", type=float, nargs="+", default=[0.0, 0.1])
+    parser.add_argument("--sample-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(f"{args.requests:,} requests from {args.threads} threads, 2 INFO records each")
+    print(f"{'config':<22} {'sink ms':>7} {'p50 us':>8} {'p99 us':>8} {'mean us':>8} {'drain s':>8} {'lines':>8} {'dropped':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for delay in args.sink_delay_ms:
+            configs = (
+                ("off", None),
+                ("sync text", None),
+                ("queue text", {"fmt": "text"}),
+                ("queue json", {"fmt": "json"}),
+                ("queue json sampled", {"fmt": "json", "sample_rates": {"app.db": args.sample_rate}}),
+            )
+            for name, options in configs:
+                path = Path(tmp) / f"{name.replace(' ', '_')}_{delay}.log"
+                with open(path, "w", encoding="utf-8") as sink:
+                    stream = SlowStream(sink, delay / 1000)
+                    handler = None
+                    if name == "off":
+                        configure_logging(level="WARNING", stream=stream, sample_rates="")
+                    elif options is None:
+                        _configure_sync(stream)
+                    else:
+                        handler = configure_logging(
+                            level="INFO", stream=stream, queue_size=args.requests * 2,
+                            **{"sample_rates": "", **options},
+                        )
+                    latencies = _run(args.requests, args.threads)
+                    start = time.perf_counter()
+                    shutdown_logging()
+                    drain = time.perf_counter() - start
+                lines = sum(1 for _ in open(path, encoding="utf-8"))
+                quantiles = statistics.quantiles(latencies, n=100)
+                print(
+                    f"{name:<22} {delay:>7.2f} {quantiles[49]:>8.1f} {quantiles[98]:>8.1f} "
+                    f"{statistics.fmean(latencies):>8.1f} {drain:>8.2f} {lines:>8,} "
+                    f"{handler.dropped if handler else 0:>8,}"
+                )
+
+    # Leave the process with plain stderr logging
+    _configure_sync(sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
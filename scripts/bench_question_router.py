@@ -0,0 +1,121 @@
+"""
+Evaluate the question router on held-out phrasings.
+
+Routes a labelled set of analytics and documentation questions (none of
+them router exemplars) at several similarity thresholds and reports how many
+analytics questions are answered from a template (coverage), how many of
+those went to the right template (precision), how many documentation
+questions were wrongly taken away from RAG, and the routing latency. Use it
+to pick RAG_ROUTER_THRESHOLD / RAG_ROUTER_MARGIN for an embedding model.
+
+Usage:
+    python scripts/bench_question_router.py
+    python scripts/bench_question_router.py --thresholds 0.6 0.7 0.8 --margin 0.05
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+
+from app.question_router import QuestionRouter
+from app.queries import QueryType
+from app.rag.embeddings import EmbeddingService
+
+ANALYTICS = [
+    ("Which products generated the most revenue last quarter?", QueryType.TOP_PRODUCTS_BY_RANGE),
+    ("top 3 products in Q1 2025", QueryType.TOP_PRODUCTS_BY_RANGE),
+    ("What are the best sellers at the moment?", QueryType.TOP_PRODUCTS_LAST_90_DAYS),
+    ("Show me the 10 top selling products", QueryType.TOP_PRODUCTS_LAST_90_DAYS),
+    ("Which product categories earned the most last month?", QueryType.TOP_CATEGORIES_BY_RANGE),
+    ("Top categories by sales in 2025", QueryType.TOP_CATEGORIES_BY_RANGE),
+    ("Which countries generated the most revenue this quarter?", QueryType.TOP_COUNTRIES_BY_RANGE),
+    ("Where are our biggest markets?", QueryType.TOP_COUNTRIES_BY_RANGE),
+    ("How much revenue did we make per month over the past year?", QueryType.MONTHLY_REVENUE_LAST_12M),
+    ("Revenue trend by month", QueryType.MONTHLY_REVENUE_LAST_12M),
+    ("What fraction of customers buy more than once?", QueryType.REPEAT_PURCHASE_RATE),
+    ("How good is our customer repeat rate?", QueryType.REPEAT_PURCHASE_RATE),
+    ("Do premium members have a higher average order value?", QueryType.AOV_BY_SEGMENT),
+    ("Average order size per customer segment", QueryType.AOV_BY_SEGMENT),
+    ("Who are the top 10 customers by total revenue?", QueryType.TOP_CUSTOMERS_LTV),
+    ("Which customers have the highest lifetime value?", QueryType.TOP_CUSTOMERS_LTV),
+]
+DOCUMENTS = [
+    "How many days do I have to send an item back?",
+    "What does express shipping cost?",
+    "Where is my package?",
+    "When will my refund arrive?",
+    "Can I ship to Canada?",
+    "How do I update my billing address?",
+    "What do customers complain about most in tickets?",
+    "What does the insights report recommend for next quarter?",
+    "Is there a warranty on electronics?",
+    "How do I cancel my subscription?",
+]
+
+
+def _embedder(backend: str):
+    if backend == "local":
+        return EmbeddingService(model_type="local").embed_array
+    return DefaultEmbeddingFunction()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the embedding question router")
+    parser.add_argument("--embedding", choices=["chroma", "local"], default="chroma")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.75, 0.8, 0.85])
+    parser.add_argument("--margin", type=float, default=0.05)
+    args = parser.parse_args()
+
+    router = QuestionRouter(_embedder(args.embedding), threshold=0.0, margin=0.0)
+    start = time.perf_counter()
+    router.route("warm up")
+    print(f"Embedded exemplars in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    questions = [q for q, _ in ANALYTICS] + DOCUMENTS
+    latencies, scored = [], []
+    for question in questions:
+        start = time.perf_counter()
+        embedding = router.embed([question])[0]
+        label, score, runner_up = router.classify(embedding)
+        latencies.append((time.perf_counter() - start) * 1000)
+        scored.append((question, label, score, runner_up))
+    print(f"Routing latency p50 {statistics.median(latencies):.2f} ms, max {max(latencies):.2f} ms\n")
+
+    expected = dict(ANALYTICS)
+    print(f"{'threshold':>9} {'coverage':>9} {'precision':>10} {'docs misrouted':>15}")
+    for threshold in args.thresholds:
+        router.threshold, router.margin = threshold, args.margin
+        routed = correct = misrouted = 0
+        for question, label, score, runner_up in scored:
+            if label is None or score < threshold or score - runner_up < args.margin:
+                continue
+            route = router.route(question)
+            if route is None:
+                continue
+            if question in expected:
+                routed += 1
+                # Either top-products template is right; the question's period picks between them
+                family = {QueryType.TOP_PRODUCTS_LAST_90_DAYS, QueryType.TOP_PRODUCTS_BY_RANGE}
+                correct += route.query == expected[question] or {route.query, expected[question]} <= family
+            else:
+                misrouted += 1
+        print(
+            f"{threshold:>9.2f} {routed / len(ANALYTICS):>9.0%} "
+            f"{(correct / routed if routed else 0):>10.0%} {misrouted:>8}/{len(DOCUMENTS)}"
+        )
+
+    print("\nNearest class per question:")
+    for question, label, score, runner_up in scored:
+        name = label.value if label is not None else "(documents)"
+        print(f"  {score:.2f} (+{score - runner_up:.2f}) {name:<28} {question}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Benchmark /ask response encoding: Pydantic response_model vs FastJSONResponse.
+
+Mounts the legacy endpoint (return AskResponse, validated and encoded by
+FastAPI) and the fast endpoint (pre-shaped rows encoded with orjson) on a
+throwaway app, checks that both produce the same bytes for every /ask
+template, then measures CPU time per request on a large synthetic result.
+
+Usage:
+    python scripts/bench_serialization.py
+    python scripts/bench_serialization.py --rows 10000 --iterations 50 --skip-parity
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.main import AskResponse
+from app.queries import RANGE_QUERIES, QueryType, build_query
+from app.serialization import FastJSONResponse, dumps
+
+RANGE_PARAMS = {
+    "start": (date.today() - timedelta(days=120)).isoformat(),
+    "end": (date.today() - timedelta(days=30)).isoformat(),
+}
+
+_rows: list[dict] = []
+bench_app = FastAPI()
+
+
+@bench_app.get("/legacy", response_model=AskResponse)
+def legacy() -> AskResponse:
+    return AskResponse(data=_rows)
+
+
+@bench_app.get("/fast", response_model=AskResponse)
+def fast() -> FastJSONResponse:
+    return FastJSONResponse(dumps({"data": _rows}))
+
+
+def _synthetic_rows(n: int) -> list[dict]:
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    return [
+        {
+            "product_id": i,
+            "product_name": f"Product {i} – {rng.choice(['Electronics', 'Apparel', 'Home'])}",
+            "revenue": Decimal(rng.randint(100, 10_000_000)) / 100,
+            "month": start + timedelta(days=rng.randint(0, 700), seconds=rng.randint(0, 86_399)),
+            "is_premium": rng.random() < 0.1,
+            "repeat_rate": rng.random(),
+        }
+        for i in range(n)
+    ]
+
+
+def _parity(client: TestClient) -> int:
+    from app.db import db_manager
+
+    global _rows
+    failures = 0
+    for query in QueryType:
+        sql, params = build_query(query, RANGE_PARAMS if query in RANGE_QUERIES else {})
+        _rows = db_manager.execute_query(sql, params)
+        old, new = client.get("/legacy").content, client.get("/fast").content
+        status = "identical" if old == new else "MISMATCH"
+        failures += old != new
+        print(f"{query.value:<30} {len(_rows):>4} rows  {status}")
+        if old != new:
+            print(f"  legacy: {old[:200]!r}\n  fast:   {new[:200]!r}")
+    return failures
+
+
+def _cpu_ms(fn, iterations: int) -> float:
+    samples = []
+    for _ in range(iterations):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /ask response serialization")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--skip-parity", action="store_true", help="Do not compare against database results")
+    args = parser.parse_args()
+
+    global _rows
+    client = TestClient(bench_app)
+    failures = 0 if args.skip_parity else _parity(client)
+
+    _rows = _synthetic_rows(args.rows)
+    if client.get("/legacy").content != client.get("/fast").content:
+        print("MISMATCH on synthetic rows")
+        failures += 1
+
+    legacy_ms = _cpu_ms(lambda: client.get("/legacy"), args.iterations)
+    fast_ms = _cpu_ms(lambda: client.get("/fast"), args.iterations)
+    encode_legacy_ms = _cpu_ms(lambda: AskResponse(data=_rows).model_dump_json(), args.iterations)
+    encode_fast_ms = _cpu_ms(lambda: dumps({"data": _rows}), args.iterations)
+
+    print(f"\n{args.rows} rows, median CPU ms of {args.iterations} runs")
+    print(f"{'':<24} {'legacy':>9} {'fast':>9} {'saved':>9}")
+    print(f"{'full request':<24} {legacy_ms:9.2f} {fast_ms:9.2f} {legacy_ms - fast_ms:9.2f}")
+    print(f"{'validate + encode only':<24} {encode_legacy_ms:9.2f} {encode_fast_ms:9.2f} "
+          f"{encode_legacy_ms - encode_fast_ms:9.2f}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
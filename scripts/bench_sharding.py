@@ -0,0 +1,115 @@
+"""
+Benchmark metadata-sharded collections against one monolithic collection.
+
+Loads the same synthetic corpus (skewed across categories, the way support
+tickets dwarf the docs subfolders) into a single collection and into a
+collection sharded by category, then compares query latency and recall@k
+against exact search for queries pinned to one category and for unfiltered
+queries that fan out to every shard.
+
+Usage:
+    python scripts/bench_sharding.py
+    python scripts/bench_sharding.py --docs 100000 --dim 384 --queries 200
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.rag.vectorstore import create_sharded_collection, get_vectorstore
+
+# Share of the corpus per category
+CATEGORIES = {
+    "support_tickets": 0.85,
+    "support_articles": 0.06,
+    "product_guides": 0.04,
+    "policies": 0.03,
+    "reports": 0.02,
+}
+_BATCH = 5000
+
+
+def _corpus(n: int, dim: int, seed: int):
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+    categories = rng.choice(len(names), size=n, p=list(CATEGORIES.values()))
+    # Give each category its own region of the space so filters matter
+    centers = rng.standard_normal((len(names), dim)).astype(np.float32)
+    embeddings = centers[categories] + rng.standard_normal((n, dim)).astype(np.float32) * 0.5
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings, [names[c] for c in categories]
+
+
+def _load(collection, embeddings: np.ndarray, categories: list[str]) -> None:
+    for start in range(0, len(embeddings), _BATCH):
+        stop = min(len(embeddings), start + _BATCH)
+        collection.add(
+            ids=[f"doc-{i}" for i in range(start, stop)],
+            embeddings=embeddings[start:stop],
+            metadatas=[{"category": categories[i]} for i in range(start, stop)],
+        )
+
+
+def _measure(collection, queries: np.ndarray, k: int, where, exact: list[set[str]]) -> tuple[float, float]:
+    latencies, hits = [], 0
+    for query, truth in zip(queries, exact):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=k, where=where, include=["distances"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += len(truth & set(result["ids"][0]))
+    return statistics.median(latencies), hits / (k * len(queries))
+
+
+def _exact(embeddings: np.ndarray, categories: np.ndarray, queries: np.ndarray, k: int, category: str | None):
+    mask = np.ones(len(embeddings), dtype=bool) if category is None else categories == category
+    rows = np.flatnonzero(mask)
+    scores = queries @ embeddings[rows].T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [{f"doc-{rows[i]}" for i in row} for row in top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sharded vs monolithic collections")
+    parser.add_argument("--docs", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    embeddings, categories = _corpus(args.docs, args.dim, seed=0)
+    category_array = np.array(categories)
+    queries = _corpus(args.queries, args.dim, seed=1)[0]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        mono = get_vectorstore(tmp, "bench_mono")
+        _load(mono, embeddings, categories)
+        mono_load = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sharded = create_sharded_collection(tmp, "bench_sharded", "category")
+        _load(sharded, embeddings, categories)
+        sharded_load = time.perf_counter() - start
+
+        print(f"{args.docs:,} docs, dim {args.dim}; load {mono_load:.1f} s monolithic, {sharded_load:.1f} s sharded")
+        print(f"{'query':<28} {'slice':>7} {'mono p50':>9} {'shard p50':>10} {'mono rec':>9} {'shard rec':>10}")
+        for category in [None, *reversed(CATEGORIES)]:
+            where = None if category is None else {"category": category}
+            exact = _exact(embeddings, category_array, queries, args.k, category)
+            mono_ms, mono_recall = _measure(mono, queries, args.k, where, exact)
+            shard_ms, shard_recall = _measure(sharded, queries, args.k, where, exact)
+            share = 1.0 if category is None else CATEGORIES[category]
+            label = "unfiltered (fan-out)" if category is None else f"category={category}"
+            print(f"{label:<28} {share:>7.0%} {mono_ms:>9.2f} {shard_ms:>10.2f} {mono_recall:>9.3f} {shard_recall:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
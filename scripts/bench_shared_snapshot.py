@@ -0,0 +1,146 @@
+"""
+Benchmark per-worker memory of the Chroma collection vs the mmap snapshot.
+
+Builds synthetic collections of two sizes, publishes a snapshot of each, then
+starts several worker processes per backend that open the collection and
+serve queries, the way uvicorn workers would. Each worker reports its
+proportional (Pss) and private memory from /proc/self/smaps_rollup. Mapped
+snapshot pages are shared, so their Pss is split between workers and private
+memory stays flat as the collection grows. Also reports recall@k of the HNSW
+index against the snapshot's exact search.
+
+Usage:
+    python scripts/bench_shared_snapshot.py
+    python scripts/bench_shared_snapshot.py --sizes 10000 80000 --workers 4 --dim 384
+"""
+
+import argparse
+import multiprocessing as mp
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.rag.mmap_store import MmapCollection, publish_snapshot
+from app.rag.vectorstore import get_vectorstore
+
+_BATCH = 5000
+
+
+def _build(persist_dir: str, size: int, dim: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    collection = get_vectorstore(persist_dir, "bench")
+    for start in range(0, size, _BATCH):
+        stop = min(size, start + _BATCH)
+        collection.add(
+            ids=[f"doc-{i}" for i in range(start, stop)],
+            embeddings=rng.standard_normal((stop - start, dim), dtype=np.float32),
+            documents=[f"synthetic document {i} " + "lorem ipsum " * 40 for i in range(start, stop)],
+            metadatas=[{"source": f"file-{i % 50}.md", "chunk_index": i} for i in range(start, stop)],
+        )
+    return collection
+
+
+def _memory_kb() -> dict[str, int]:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "pss": fields.get("Pss", 0),
+        "private": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def _worker(backend: str, location: str, queries: np.ndarray, ready, go, results) -> None:
+    if backend == "mmap":
+        collection = MmapCollection(location)
+    else:
+        collection = get_vectorstore(location, "bench")
+    for query in queries:
+        collection.query(query_embeddings=[query.tolist()], n_results=5)
+    # Measure once every worker has touched the data, so shared pages are
+    # split between all of them
+    ready.wait()
+    go.wait()
+    results.put(_memory_kb())
+
+
+def _measure(backend: str, location: str, workers: int, queries: np.ndarray) -> dict[str, float]:
+    ready, go = mp.Barrier(workers + 1), mp.Barrier(workers + 1)
+    results = mp.Queue()
+    procs = [mp.Process(target=_worker, args=(backend, location, queries, ready, go, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    ready.wait()
+    go.wait()
+    samples = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return {
+        "pss_mb": statistics.mean(s["pss"] for s in samples) / 1024,
+        "private_mb": statistics.mean(s["private"] for s in samples) / 1024,
+    }
+
+
+def _recall(collection, snapshot: MmapCollection, queries: np.ndarray, k: int) -> float:
+    hits = 0
+    for query in queries:
+        exact = set(snapshot.query(query_embeddings=[query], n_results=k, include=[])["ids"][0])
+        approx = set(collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])["ids"][0])
+        hits += len(exact & approx)
+    return hits / (k * len(queries))
+
+
+def _latency_ms(collection, queries: np.ndarray) -> float:
+    samples = []
+    for query in queries:
+        start = time.perf_counter()
+        collection.query(query_embeddings=[query.tolist()], n_results=5)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared mmap snapshots")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 60_000])
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    mp.set_start_method("spawn")
+    queries = np.random.default_rng(1).standard_normal((args.queries, args.dim), dtype=np.float32)
+
+    print(f"{'docs':>8} {'backend':<8} {'Pss MB':>9} {'private MB':>11} {'p50 ms':>8} {'recall@' + str(args.k):>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            persist_dir, snapshot_dir = f"{tmp}/chroma-{size}", f"{tmp}/snapshot-{size}"
+            collection = _build(persist_dir, size, args.dim)
+            publish_snapshot(collection, snapshot_dir)
+            snapshot = MmapCollection(snapshot_dir)
+            recall = _recall(collection, snapshot, queries, args.k)
+
+            for backend, location, handle in (
+                ("chroma", persist_dir, collection),
+                ("mmap", snapshot_dir, snapshot),
+            ):
+                memory = _measure(backend, location, args.workers, queries)
+                print(
+                    f"{size:>8} {backend:<8} {memory['pss_mb']:9.1f} {memory['private_mb']:11.1f} "
+                    f"{_latency_ms(handle, queries):8.2f} {recall if backend == 'chroma' else 1.0:10.3f}"
+                )
+    print(f"\nPer-worker averages over {args.workers} workers; recall of HNSW against exact search.")
+
+
+if __name__ == "__main__":
+    main()
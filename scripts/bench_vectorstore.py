@@ -0,0 +1,72 @@
+"""
+Measure vector store open, warm-up and per-call overhead.
+
+Compares opening a fresh PersistentClient per call (the old behaviour of
+get_vectorstore) with the shared client/collection registry.
+
+Usage:
+    python scripts/bench_vectorstore.py
+    python scripts/bench_vectorstore.py --persist-dir ./vectordb --iterations 200
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import chromadb
+
+from app.rag.vectorstore import close_vectorstores, get_vectorstore, warm_up
+
+
+def _timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000
+
+
+def _summary(label: str, samples: list[float]) -> None:
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1] if len(samples) > 1 else samples[0]
+    print(f"  {label:<28} mean={statistics.mean(samples):8.3f} ms  p95={p95:8.3f} ms")
+
+
+def _open_uncached(persist_dir: str, collection_name: str):
+    chromadb.api.client.SharedSystemClient.clear_system_cache()
+    client = chromadb.PersistentClient(path=persist_dir)
+    return client.get_or_create_collection(name=collection_name, metadata={"hnsw:space": "cosine"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark vector store handle reuse")
+    parser.add_argument("--persist-dir", type=str, default="./vectordb")
+    parser.add_argument("--collection", type=str, default="knowledge_base")
+    parser.add_argument("--iterations", type=int, default=100)
+    args = parser.parse_args()
+
+    print("Startup")
+    close_vectorstores()
+    open_ms = _timed(lambda: get_vectorstore(args.persist_dir, args.collection))
+    stats = warm_up(get_vectorstore(args.persist_dir, args.collection))
+    print(f"  open collection              {open_ms:8.3f} ms")
+    print(f"  warm-up ({stats['count']} documents)     {stats['warmup_ms']:8.3f} ms")
+
+    print(f"\nPer-call overhead ({args.iterations} iterations)")
+    _summary(
+        "new client per call",
+        [_timed(lambda: _open_uncached(args.persist_dir, args.collection).count()) for _ in range(args.iterations)],
+    )
+    close_vectorstores()
+    _summary(
+        "registry (shared handle)",
+        [_timed(lambda: get_vectorstore(args.persist_dir, args.collection).count()) for _ in range(args.iterations)],
+    )
+    close_vectorstores()
+
+
+if __name__ == "__main__":
+    main()
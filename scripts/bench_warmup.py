@@ -0,0 +1,142 @@
+"""
+Measure first-request latency after a restart, with and without warm-up replay.
+
+Starts the API under uvicorn (with scripts/fake_llm_server.py as the LLM),
+sends a workload of /ask and /rag/chat requests so the hot set is recorded,
+and stops it, which saves WARMUP_FILE. It then restarts the API twice with
+the same workload: once with WARMUP_ENABLED=0 (cold) and once replaying the
+saved file (warm), alternating for --trials rounds. For each start it
+reports the time to /ready and the latency of each workload request the
+first time it is sent after /ready.
+
+Postgres and the OS page cache stay warm between runs on one host, so this
+measures the in-process part of a cold start (pool connections, vector
+index, embedding model); restart Postgres between runs to include its
+buffer cache.
+
+Usage:
+    python scripts/bench_warmup.py
+    python scripts/bench_warmup.py --trials 5 --port 8799 --llm-port 8901
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).parent
+BACKEND_DIR = SCRIPTS_DIR.parent / "backend"
+
+WORKLOAD = [
+    ("/ask", {"query": "top_customers_ltv", "params": {"limit": 10}}),
+    ("/ask", {"query": "top_products_last_90_days", "params": {"limit": 5}}),
+    ("/ask", {"query": "top_products_by_range", "params": {"start": "2025-01-01", "end": "2025-04-01", "limit": 5}}),
+    ("/ask", {"query": "top_countries_by_range", "params": {"start": "2025-01-01", "end": "2025-07-01", "limit": 5}}),
+    ("/rag/chat", {"question": "How many days do I have to return an item?"}),
+    ("/rag/chat", {"question": "What does express shipping cost?"}),
+    ("/rag/chat", {"question": "Is there a warranty on electronics?"}),
+]
+
+
+def _request(url: str, payload: dict | None = None, timeout: float = 60.0) -> tuple[int, dict]:
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read() or b"{}")
+
+
+def _wait_ready(base: str, timeout: float) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status, body = _request(f"{base}/ready", timeout=2)
+            if status == 200:
+                return body
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(0.05)
+    raise RuntimeError("server did not become ready")
+
+
+def _run(port: int, env: dict, timeout: float, repeat: int) -> dict:
+    """Start the API, wait for /ready and time the workload; returns timings."""
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    try:
+        ready = _wait_ready(base, timeout)
+        ready_s = time.perf_counter() - start
+        latencies: dict[str, list[float]] = {"/ask": [], "/rag/chat": []}
+        for _ in range(repeat):
+            for path, payload in WORKLOAD:
+                request_start = time.perf_counter()
+                status, _ = _request(base + path, payload)
+                elapsed = (time.perf_counter() - request_start) * 1000
+                if status != 200:
+                    print(f"  {path} returned HTTP {status}")
+                latencies[path].append(elapsed)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return {"ready_s": ready_s, "ready": ready, "latencies": latencies}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare cold and replayed warm starts")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--llm-port", type=int, default=8901)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--trials", type=int, default=3, help="Cold/warm restarts, alternating")
+    args = parser.parse_args()
+
+    llm = subprocess.Popen(
+        [sys.executable, str(SCRIPTS_DIR / "fake_llm_server.py"), "--port", str(args.llm_port), "--latency-ms", "0"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {
+                **os.environ,
+                "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "fake"),
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{args.llm_port}/v1",
+                "WARMUP_FILE": str(Path(tmp) / "hot_requests.json"),
+                "WARMUP_ENABLED": "1",
+            }
+            _run(args.port, env, args.timeout, repeat=3)
+            saved = json.loads(Path(env["WARMUP_FILE"]).read_text())["entries"]
+            print(f"Recorded {len(saved)} hot requests\n")
+
+            print(f"{'start':<6} {'ready s':>8} {'replayed':>9} {'/ask mean':>10} {'/ask max':>9} "
+                  f"{'chat mean':>10} {'chat max':>9}  (ms, first hit of each request)")
+            for _ in range(args.trials):
+                for name, enabled in (("cold", "0"), ("warm", "1")):
+                    result = _run(args.port, {**env, "WARMUP_ENABLED": enabled}, args.timeout, repeat=1)
+                    replayed = result["ready"].get("replay", {}).get("replayed", 0)
+                    ask, chat = result["latencies"]["/ask"], result["latencies"]["/rag/chat"]
+                    print(
+                        f"{name:<6} {result['ready_s']:>8.2f} {replayed:>9} "
+                        f"{statistics.fmean(ask):>10.1f} {max(ask):>9.1f} "
+                        f"{statistics.fmean(chat):>10.1f} {max(chat):>9.1f}"
+                    )
+    finally:
+        llm.terminate()
+        llm.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+"""
+Exact parity check: SQL templates vs the columnar mirror and revenue cube.
+
+Creates a scratch database from db/schema.sql, fills it with deterministic
+synthetic sales, and checks that ColumnarMirror returns exactly what the SQL
+templates return. The data includes the cases approximate arithmetic gets
+wrong:
+
+    - per-group sums above 2**53 cents (float64 drops cents there),
+    - orders on the 90-day and 12-month window boundaries,
+    - NULL names, countries, categories and is_premium.
+
+The range templates (answered by the RevenueCube) are checked over window
+edges: the first and last day of history, windows entirely before or after
+it, single days, and an end date that excludes an order placed a
+microsecond before midnight.
+
+Then it runs three refresh scenarios:
+
+    1. orders appended above the watermark but dated in the past, before
+       the cube's origin, and for a new product and country: the cube's
+       incremental update must stay exact,
+    2. an order committed below the watermark: an incremental refresh must
+       miss it,
+    3. a full rebuild must reconcile it.
+
+Exits with status 1 on any mismatch, so it can gate CI.
+
+Uses the DB_* connection settings; the user needs CREATEDB. The scratch
+database is dropped afterwards unless --keep is given.
+
+Usage:
+    python scripts/check_analytics_parity.py
+    python scripts/check_analytics_parity.py --database parity_check --keep
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Add backend to path for imports
+sys.path.insert(0, str(ROOT / "backend"))
+
+# Metric column per template, used to accept tie-order differences under LIMIT
+METRIC_COLUMNS = {
+    "top_products_last_90_days": "revenue",
+    "top_customers_ltv": "lifetime_value",
+    "top_products_by_range": "revenue",
+    "top_categories_by_range": "revenue",
+    "top_countries_by_range": "revenue",
+}
+# Templates without ORDER BY: compare as unordered row sets
+UNORDERED = {"avg_order_value_by_segment"}
+
+WHALE_ORDERS = 12_000          # x 9,999,999,999.99 > 2**53 cents for one customer
+WHALE_TOTAL = Decimal("9999999999.99")
+BULK_ITEMS = 1_500             # x 999 x 99,999,999.97 > 2**53 cents for one product
+BULK_PRICE = Decimal("99999999.97")
+
+
+def _admin_engine():
+    from sqlalchemy import create_engine
+
+    from app.db import DatabaseConfig
+
+    config = DatabaseConfig()
+    config.database = "postgres"
+    return create_engine(config.connection_url, isolation_level="AUTOCOMMIT")
+
+
+def _create_database(name: str) -> None:
+    from sqlalchemy import text
+
+    engine = _admin_engine()
+    with engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    engine.dispose()
+
+
+def _drop_database(name: str) -> None:
+    from sqlalchemy import text
+
+    engine = _admin_engine()
+    with engine.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{name}"'))
+    engine.dispose()
+
+
+def _edge_dates(db_now: datetime) -> dict[str, datetime]:
+    """Timestamps on (and just off) the relative window boundaries."""
+    month_start = db_now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    twelve_months = month_start.replace(year=month_start.year - 1)
+    ninety_days = db_now - timedelta(days=90)
+    return {
+        "twelve_months": twelve_months,
+        "before_twelve_months": twelve_months - timedelta(microseconds=1),
+        "inside_ninety_days": ninety_days + timedelta(hours=1),
+        "outside_ninety_days": ninety_days - timedelta(hours=1),
+    }
+
+
+def _generate(db_now: datetime, seed: int) -> dict[str, list[dict]]:
+    """Deterministic products, customers, orders and items relative to the DB clock."""
+    rng = random.Random(seed)
+    categories = ["Electronics", "Clothing", "Home", None]
+    countries = ["US", "DE", "FR", "BR", None]
+
+    products = [
+        {"product_id": i, "sku": f"SKU-{i}", "name": f"Product {i}",
+         "category": categories[i % len(categories)], "price": Decimal("10.00")}
+        for i in range(1, 41)
+    ]
+    customers = []
+    for i in range(1, 301):
+        named = i % 17 != 0
+        customers.append({
+            "customer_id": i,
+            "email": f"c{i}@example.com",
+            "first_name": f"First{i}" if named else None,
+            "last_name": f"Last{i}" if named else None,
+            "country": countries[i % len(countries)],
+            "is_premium": (None, True, False)[i % 3],
+        })
+
+    dates = list(_edge_dates(db_now).values())
+    dates += [db_now - timedelta(days=rng.uniform(0, 800)) for _ in range(4_000)]
+
+    orders, items = [], []
+
+    def add_order(customer_id: int, order_date: datetime, total: Decimal) -> int:
+        order_id = len(orders) + 1
+        orders.append({"order_id": order_id, "customer_id": customer_id, "order_date": order_date,
+                       "total_amount": total})
+        return order_id
+
+    def add_item(order_id: int, product_id: int, quantity: int, unit_price: Decimal) -> None:
+        items.append({"order_item_id": len(items) + 1, "order_id": order_id, "product_id": product_id,
+                      "quantity": quantity, "unit_price": unit_price})
+
+    for order_date in dates:
+        order_id = add_order(rng.randint(2, 300), order_date, Decimal(rng.randint(100, 5_000_000)).scaleb(-2))
+        for _ in range(rng.randint(1, 4)):
+            add_item(order_id, rng.randint(2, 40), rng.randint(1, 5), Decimal(rng.randint(100, 99_999)).scaleb(-2))
+
+    # Customer 1 and product 1 accumulate sums that float64 cannot hold
+    # exactly; product 1's all fall on one day, so a single cube cell does too
+    for i in range(WHALE_ORDERS):
+        add_order(1, db_now - timedelta(days=i % 60, minutes=i), WHALE_TOTAL)
+    for _ in range(BULK_ITEMS):
+        add_item(len(orders), 1, 999, BULK_PRICE)
+    return {"products": products, "customers": customers, "orders": orders, "order_items": items}
+
+
+def _back_dated(data: dict[str, list[dict]], db_now: datetime, seed: int) -> dict[str, list[dict]]:
+    """
+    Orders with ids above every loaded order but dates in the past.
+
+    Includes one dated before the first order (the cube shifts its origin)
+    and one for a new product bought by a customer in a new country (the
+    cube adds columns). A free sample product in its own category, given
+    away to a customer in its own country, gives each range template a
+    group with rows but zero revenue, which SQL still returns.
+    """
+    rng = random.Random(seed + 1)
+    first_order = min(r["order_date"] for r in data["orders"])
+    next_order = max(r["order_id"] for r in data["orders"]) + 1
+    next_item = max(r["order_item_id"] for r in data["order_items"]) + 1
+    rows = {
+        "products": [{"product_id": 41, "sku": "SKU-41", "name": "Product 41", "category": "Garden",
+                      "price": Decimal("10.00")},
+                     {"product_id": 42, "sku": "SKU-42", "name": "Sample", "category": "Samples",
+                      "price": Decimal("0.00")}],
+        "customers": [{"customer_id": 301, "email": "c301@example.com", "first_name": "First301",
+                       "last_name": "Last301", "country": "JP", "is_premium": True},
+                      {"customer_id": 302, "email": "c302@example.com", "first_name": "First302",
+                       "last_name": "Last302", "country": "NZ", "is_premium": False}],
+        "orders": [],
+        "order_items": [],
+    }
+    dates = [first_order - timedelta(days=10), db_now - timedelta(days=400), db_now - timedelta(days=1), db_now]
+    dates += [db_now - timedelta(days=rng.uniform(0, 800)) for _ in range(50)]
+    for i, order_date in enumerate(dates):
+        order_id = next_order + i
+        customer_id = 301 if i == len(dates) - 1 else rng.randint(1, 300)
+        rows["orders"].append({"order_id": order_id, "customer_id": customer_id, "order_date": order_date,
+                               "total_amount": Decimal(rng.randint(100, 5_000_000)).scaleb(-2)})
+        rows["order_items"].append({"order_item_id": next_item + i, "order_id": order_id,
+                                    "product_id": 41 if i == len(dates) - 1 else rng.randint(1, 40),
+                                    "quantity": rng.randint(1, 5),
+                                    "unit_price": Decimal(rng.randint(100, 99_999)).scaleb(-2)})
+    for i, order_date in enumerate([db_now - timedelta(days=3), db_now - timedelta(days=3, hours=2)]):
+        order_id = next_order + len(dates) + i
+        rows["orders"].append({"order_id": order_id, "customer_id": 302, "order_date": order_date,
+                               "total_amount": Decimal("0.00")})
+        rows["order_items"].append({"order_item_id": next_item + len(dates) + i, "order_id": order_id,
+                                    "product_id": 42, "quantity": 2, "unit_price": Decimal("0.00")})
+    return rows
+
+
+def _load(url: str, data: dict[str, list[dict]], held_back: int) -> dict:
+    """Create the schema and insert everything except the held-back order; returns that order and its items."""
+    from sqlalchemy import create_engine, text
+
+    late = {
+        "orders": [r for r in data["orders"] if r["order_id"] == held_back],
+        "order_items": [r for r in data["order_items"] if r["order_id"] == held_back],
+    }
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql((ROOT / "db" / "schema.sql").read_text())
+        for table, rows in data.items():
+            rows = [r for r in rows if r.get("order_id") != held_back]
+            columns = list(rows[0])
+            conn.execute(
+                text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"),
+                rows,
+            )
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+    return late
+
+
+def _insert(url: str, rows: dict) -> None:
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for table, table_rows in rows.items():
+            columns = list(table_rows[0])
+            conn.execute(
+                text(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"),
+                table_rows,
+            )
+    engine.dispose()
+
+
+def _compare(name: str, sql_rows: list[dict], mirror_rows: list[dict]) -> str | None:
+    """None when identical, else a description of the first difference."""
+    if name in UNORDERED:
+        sql_rows, mirror_rows = sorted(sql_rows, key=repr), sorted(mirror_rows, key=repr)
+    if sql_rows == mirror_rows:
+        return None
+    metric = METRIC_COLUMNS.get(name)
+    if metric and [r[metric] for r in sql_rows] == [r[metric] for r in mirror_rows]:
+        return None
+    for i, (expected, actual) in enumerate(zip(sql_rows, mirror_rows)):
+        if expected != actual:
+            return f"row {i}: sql={expected!r} mirror={actual!r}"
+    return f"sql returned {len(sql_rows)} rows, mirror {len(mirror_rows)}"
+
+
+def _check(db_manager, mirror, cases) -> int:
+    """Run (label, query, params) cases against both engines; returns the number of mismatches."""
+    from app.queries import build_query
+
+    failures = 0
+    for label, query, params in cases:
+        sql, safe_params = build_query(query, params)
+        db_now = db_manager.execute_query("SELECT LOCALTIMESTAMP AS now")[0]["now"]
+        problem = _compare(query.value, db_manager.execute_query(sql, safe_params),
+                           mirror.run(query, safe_params, now=db_now))
+        failures += problem is not None
+        print(f"  {label:<52} {'ok' if problem is None else 'MISMATCH ' + problem}")
+    return failures
+
+
+def _template_cases():
+    from app.queries import QueryType
+
+    return [
+        ("top_products_last_90_days", QueryType.TOP_PRODUCTS_LAST_90_DAYS, {"limit": 50}),
+        ("monthly_revenue_last_12m", QueryType.MONTHLY_REVENUE_LAST_12M, {}),
+        ("repeat_purchase_rate", QueryType.REPEAT_PURCHASE_RATE, {}),
+        ("avg_order_value_by_segment", QueryType.AOV_BY_SEGMENT, {}),
+        ("top_customers_ltv", QueryType.TOP_CUSTOMERS_LTV, {"limit": 100}),
+    ]
+
+
+def _range_cases(url: str, db_now: datetime, seed: int):
+    """Range-template cases over window edges and a few random windows."""
+    from sqlalchemy import create_engine, text
+
+    from app.queries import RANGE_QUERIES
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        first = conn.execute(text("SELECT min(order_date)::date FROM orders")).scalar()
+    engine.dispose()
+    today = db_now.date()
+    boundary = _edge_dates(db_now)["twelve_months"].date()
+    day = timedelta(days=1)
+    windows = {
+        "all history": (first - day, today + day),
+        "first day only": (first, first + day),
+        "from first day": (first, today),
+        "before history": (first - 60 * day, first - 30 * day),
+        "ending on first day": (first - 30 * day, first),
+        "today only": (today, today + day),
+        "after today": (today + day, today + 30 * day),
+        "day before 12m boundary": (boundary - day, boundary),
+        "from 12m boundary": (boundary, boundary + day),
+    }
+    rng = random.Random(seed + 2)
+    for i in range(6):
+        start = first + rng.randrange((today - first).days) * day
+        windows[f"random window {i}"] = (start, start + rng.randint(1, 200) * day)
+
+    return [
+        (f"{query.value} {label}", query, {"start": start.isoformat(), "end": end.isoformat(), "limit": 50})
+        for query in RANGE_QUERIES
+        for label, (start, end) in windows.items()
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the columnar mirror and revenue cube against the SQL templates")
+    parser.add_argument("--database", default="smart_insights_parity", help="Scratch database to create")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database afterwards")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Must be set before app.db creates its connection pool
+    os.environ["DB_NAME"] = args.database
+    from app.analytics import ColumnarMirror
+    from app.db import db_manager
+
+    _create_database(args.database)
+    try:
+        url = db_manager._config.connection_url
+        db_now = datetime.now()
+        data = _generate(db_now, args.seed)
+        # One of the ordinary orders, which all have items
+        held_back = 2_000
+        late = _load(url, data, held_back)
+        print(f"Loaded {len(data['orders']) - 1} orders, {len(data['order_items'])} items into {args.database}")
+
+        # Small batches so keyset pagination crosses many pages
+        mirror = ColumnarMirror(db_manager, batch_size=1_000)
+        mirror.refresh()
+
+        print("Templates:")
+        failures = _check(db_manager, mirror, _template_cases() + _range_cases(url, db_now, args.seed))
+
+        _insert(url, _back_dated(data, db_now, args.seed))
+        mirror.refresh()
+        print("After back-dated orders above the watermark (incremental cube update):")
+        failures += _check(db_manager, mirror, _template_cases() + _range_cases(url, db_now, args.seed))
+
+        _insert(url, late)
+        mirror.refresh()
+        print(f"Order {held_back} committed below watermark {mirror.watermark}:")
+        missed = int(held_back) not in set(mirror.order_ids.tolist())
+        print(f"  {'incremental refresh leaves it out':<52} {'ok' if missed else 'UNEXPECTED: picked up'}")
+        failures += not missed
+        mirror.refresh(full=True)
+        print("After a full rebuild:")
+        failures += _check(db_manager, mirror, _template_cases() + _range_cases(url, db_now, args.seed))
+    finally:
+        db_manager.close()
+        if not args.keep:
+            _drop_database(args.database)
+
+    print("FAILED" if failures else "All checks passed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
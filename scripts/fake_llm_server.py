@@ -0,0 +1,113 @@
+"""
+Local fake of the OpenAI chat completions API with injectable latency and errors.
+
+Point the backend (or scripts/bench_llm.py) at it to exercise timeouts,
+retries, hedging and load shedding without calling a real provider:
+
+    python scripts/fake_llm_server.py --latency-ms 300 --tail-rate 0.05 --tail-ms 5000
+    OPENAI_BASE_URL=http://localhost:8900/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+
+Behaviour can be changed while it runs, e.g. to simulate a provider slowdown:
+
+    curl -X POST localhost:8900/control -H 'content-type: application/json' \\
+         -d '{"latency_ms": 4000, "error_rate": 0.2}'
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class Behaviour(BaseModel):
+    latency_ms: float = 300.0         # median latency
+    jitter: float = 0.3               # lognormal sigma around the median
+    tail_rate: float = 0.0            # fraction of requests hitting the slow tail
+    tail_ms: float = 5000.0           # latency of tail requests
+    error_rate: float = 0.0           # fraction of requests failing
+    error_status: int = 503           # status code of failures
+
+
+class BehaviourUpdate(BaseModel):
+    latency_ms: Optional[float] = None
+    jitter: Optional[float] = None
+    tail_rate: Optional[float] = None
+    tail_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    error_status: Optional[int] = None
+
+
+app = FastAPI(title="Fake LLM")
+behaviour = Behaviour()
+counters = {"requests": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(body: Dict[str, Any]):
+    counters["requests"] += 1
+    counters["in_flight"] += 1
+    counters["max_in_flight"] = max(counters["max_in_flight"], counters["in_flight"])
+    try:
+        if random.random() < behaviour.tail_rate:
+            latency = behaviour.tail_ms
+        else:
+            latency = behaviour.latency_ms * random.lognormvariate(0, behaviour.jitter)
+        await asyncio.sleep(latency / 1000)
+
+        if random.random() < behaviour.error_rate:
+            counters["errors"] += 1
+            return JSONResponse(
+                status_code=behaviour.error_status,
+                content={"error": {"message": "injected failure", "type": "server_error"}},
+            )
+
+        question = body.get("messages", [{}])[-1].get("content", "")
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Fake answer ({len(question)} chars of prompt)."},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(question) // 4, "completion_tokens": 8, "total_tokens": len(question) // 4 + 8},
+        }
+    finally:
+        counters["in_flight"] -= 1
+
+
+@app.get("/control")
+async def get_control():
+    return {"behaviour": behaviour.dict(), "counters": counters}
+
+
+@app.post("/control")
+async def set_control(update: BehaviourUpdate):
+    global behaviour
+    behaviour = behaviour.copy(update={k: v for k, v in update.dict().items() if v is not None})
+    return {"behaviour": behaviour.dict()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server")
+    parser.add_argument("--port", type=int, default=8900)
+    for name, field in Behaviour.__fields__.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(field.default), default=field.default)
+    args = parser.parse_args()
+
+    global behaviour
+    behaviour = Behaviour(**{name: getattr(args, name) for name in Behaviour.__fields__})
+    uvicorn.run(app, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,88 +1,127 @@
 """
-One-time script to ingest all documents into the vector store.
+Ingest all documents into the vector store.
+
+By default the knowledge base is rebuilt blue/green: documents go into a new
+versioned collection, which is validated and then made live by flipping the
+alias the API reads. --in-place adds to the live collection instead.
 
 Usage:
     python scripts/ingest_docs.py
     python scripts/ingest_docs.py --docs-dir ./docs --persist-dir ./vectordb
+    python scripts/ingest_docs.py --validate-query "What is our refund policy?" --max-p95-ms 100
+    python scripts/ingest_docs.py --publish-snapshot ./vectordb_snapshots
+    python scripts/ingest_docs.py --tickets
+    python scripts/ingest_docs.py --shard-by category
+
+Use ingest_tickets.py to add new support tickets to the live collection.
 """
 
 import argparse
+import logging
 import sys
 from pathlib import Path
 
 # Add backend to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 
-from app.rag.chunker import chunk_document
-from app.rag.vectorstore import get_vectorstore, add_documents, get_collection_stats
-
-
-SUPPORTED_EXTENSIONS = {".md", ".txt", ".html"}
-
+from app.db import get_db
+from app.rag.embeddings import EmbeddingService
+from app.rag.ingest import CollectionValidationError, ingest_directory, rebuild_collection
+from app.rag.mmap_store import publish_snapshot
+from app.rag.vectorstore import get_aliased_vectorstore, get_collection_stats, get_vectorstore
 
-def load_document(filepath: Path) -> str:
-    """Load a document from file."""
-    return filepath.read_text(encoding="utf-8")
 
-
-def ingest_file(collection, filepath: Path, chunk_size: int = 500):
-    """Ingest a single file into the vector store."""
-    text = load_document(filepath)
-    chunks = chunk_document(text, chunk_size=chunk_size)
-    
-    # Generate unique IDs and metadata for each chunk
-    ids = [f"{filepath.stem}_{i}" for i in range(len(chunks))]
-    metadatas = [
-        {
-            "source": str(filepath),
-            "filename": filepath.name,
-            "chunk_index": i,
-            "total_chunks": len(chunks),
-        }
-        for i in range(len(chunks))
-    ]
+def _report(collection, snapshot_dir: str | None) -> None:
+    stats = get_collection_stats(collection)
+    print(f"  Collection size: {stats['count']} documents")
     
-    add_documents(collection, chunks, metadatas, ids)
-    return len(chunks)
+    if snapshot_dir:
+        version = publish_snapshot(collection, snapshot_dir)
+        print(f"  Published snapshot: {version}")
 
 
-def ingest_directory(
+def ingest_in_place(
     docs_dir: Path,
     persist_dir: str = "./vectordb",
     collection_name: str = "knowledge_base",
     chunk_size: int = 500,
+    embedding: str = "chroma",
+    snapshot_dir: str | None = None,
+    dedup: bool = True,
 ):
     """
-    Ingest all documents from a directory into the vector store.
+    Add all documents from a directory to the live collection.
     
     Args:
         docs_dir: Directory containing documents
         persist_dir: Directory to persist vector database
-        collection_name: Name of the collection
+        collection_name: Name (or alias) of the collection
         chunk_size: Size of text chunks
+        embedding: "chroma" to let the collection embed, "local" to use
+            the shared sentence-transformers model, or "stub" for offline
+            hashed embeddings
+        snapshot_dir: If set, publish a memory-mapped snapshot of the
+            collection there once ingestion is done
+        dedup: Drop chunks that nearly duplicate another chunk of this run
     """
-    collection = get_vectorstore(persist_dir, collection_name)
-    
-    total_files = 0
-    total_chunks = 0
-    
-    for ext in SUPPORTED_EXTENSIONS:
-        for filepath in docs_dir.rglob(f"*{ext}"):
-            try:
-                num_chunks = ingest_file(collection, filepath, chunk_size)
-                total_files += 1
-                total_chunks += num_chunks
-                print(f"✓ Ingested {filepath}: {num_chunks} chunks")
-            except Exception as e:
-                print(f"✗ Failed to ingest {filepath}: {e}")
+    collection = get_aliased_vectorstore(persist_dir, collection_name)
+    embedder = EmbeddingService(model_type=embedding) if embedding in ("local", "stub") else None
+    stats = ingest_directory(collection, docs_dir, chunk_size, embedder, dedup)
     
     print(f"\n{'='*50}")
-    print(f"Ingestion complete!")
-    print(f"  Files processed: {total_files}")
-    print(f"  Total chunks: {total_chunks}")
+    print("Ingestion complete!")
+    print(f"  Files processed: {stats.files}")
+    print(f"  Total chunks: {stats.chunks} ({stats.duplicates} near-duplicates dropped)")
+    _report(collection, snapshot_dir)
+
+
+def rebuild(
+    docs_dir: Path,
+    persist_dir: str,
+    alias: str,
+    chunk_size: int,
+    embedding: str,
+    keep: int,
+    questions: list[str],
+    max_p95_ms: float,
+    snapshot_dir: str | None,
+    tickets: bool = False,
+    dedup: bool = True,
+    shard_by: str | None = None,
+):
+    """Build a new collection version, validate it and flip the alias to it."""
+    try:
+        result = rebuild_collection(
+            docs_dir,
+            persist_dir=persist_dir,
+            alias=alias,
+            chunk_size=chunk_size,
+            embedding=embedding,
+            keep=keep,
+            questions=questions,
+            max_p95_ms=max_p95_ms,
+            db=get_db() if tickets else None,
+            dedup=dedup,
+            shard_by=shard_by,
+        )
+    except CollectionValidationError as e:
+        print(f"✗ Validation failed, {alias} left unchanged: {e}")
+        sys.exit(1)
     
-    stats = get_collection_stats(collection)
-    print(f"  Collection size: {stats['count']} documents")
+    print(f"\n{'='*50}")
+    print("Rebuild complete!")
+    print(f"  Files processed: {result['files']} ({len(result['failed'])} failed)")
+    print(f"  Total chunks: {result['chunks']} ({result['duplicates']} near-duplicates dropped)")
+    if tickets:
+        print(f"  Support ticket chunks: {result['ticket_chunks']}")
+    print(f"  Self-retrieval recall: {result['self_recall']:.2f}, p95 query: {result['p95_ms']:.1f} ms")
+    print(f"  {alias} -> {result['collection']} (was {result['previous']})")
+    if shard_by:
+        shards = get_vectorstore(persist_dir, result["collection"]).shards
+        print(f"  Shards by {shard_by}: " + ", ".join(f"{k} ({v.count()})" for k, v in shards.items()))
+    if result["dropped"]:
+        print(f"  Dropped: {', '.join(result['dropped'])}")
+    _report(get_vectorstore(persist_dir, result["collection"]), snapshot_dir)
 
 
 def main():
@@ -105,7 +144,7 @@ def main():
         "--collection",
         type=str,
         default="knowledge_base",
-        help="Name of the vector store collection",
+        help="Name (alias) of the vector store collection",
     )
     parser.add_argument(
         "--chunk-size",
@@ -113,19 +152,91 @@ def main():
         default=500,
         help="Size of text chunks in characters",
     )
+    parser.add_argument(
+        "--embedding",
+        choices=["chroma", "local", "stub"],
+        default="chroma",
+        help="Embed with the collection's default function, the local model or offline stub embeddings",
+    )
+    parser.add_argument(
+        "--publish-snapshot",
+        metavar="DIR",
+        default=None,
+        help="Publish a memory-mapped snapshot for VECTORSTORE_BACKEND=mmap",
+    )
+    parser.add_argument(
+        "--in-place",
+        action="store_true",
+        help="Add to the live collection instead of building a new version",
+    )
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=2,
+        help="Collection versions to retain, including the new one",
+    )
+    parser.add_argument(
+        "--validate-query",
+        action="append",
+        default=[],
+        help="Sample question the new version must answer (repeatable)",
+    )
+    parser.add_argument(
+        "--max-p95-ms",
+        type=float,
+        default=250.0,
+        help="p95 query latency the new version must meet",
+    )
+    parser.add_argument(
+        "--tickets",
+        action="store_true",
+        help="Also stream support_tickets from Postgres into the new version",
+    )
+    parser.add_argument(
+        "--no-dedup",
+        action="store_true",
+        help="Keep near-duplicate chunks instead of merging their sources",
+    )
+    parser.add_argument(
+        "--shard-by",
+        metavar="KEY",
+        default=None,
+        help="Shard the new version by a metadata key, e.g. category (docs subfolder)",
+    )
     
     args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     
     if not args.docs_dir.exists():
         print(f"Error: Documents directory '{args.docs_dir}' does not exist")
         print("Please create the directory and add some documents first.")
         sys.exit(1)
     
-    ingest_directory(
+    if args.in_place:
+        ingest_in_place(
+            docs_dir=args.docs_dir,
+            persist_dir=args.persist_dir,
+            collection_name=args.collection,
+            chunk_size=args.chunk_size,
+            embedding=args.embedding,
+            snapshot_dir=args.publish_snapshot,
+            dedup=not args.no_dedup,
+        )
+        return
+    
+    rebuild(
         docs_dir=args.docs_dir,
         persist_dir=args.persist_dir,
-        collection_name=args.collection,
+        alias=args.collection,
         chunk_size=args.chunk_size,
+        embedding=args.embedding,
+        keep=args.keep,
+        questions=args.validate_query,
+        max_p95_ms=args.max_p95_ms,
+        snapshot_dir=args.publish_snapshot,
+        tickets=args.tickets,
+        dedup=not args.no_dedup,
+        shard_by=args.shard_by,
     )
 
 
@@ -0,0 +1,75 @@
+"""
+Stream support tickets from Postgres into the live knowledge base collection.
+
+Only tickets above the collection's ticket_id watermark are read, so running
+this periodically (or after an interruption) picks up where the last run
+stopped. Progress and throughput are printed as it goes.
+
+Usage:
+    python scripts/ingest_tickets.py
+    python scripts/ingest_tickets.py --batch-size 2000 --embedding local
+    python scripts/ingest_tickets.py --from-scratch --limit 100000
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.db import get_db
+from app.rag.embeddings import EmbeddingService
+from app.rag.tickets import SOURCE, stream_tickets
+from app.rag.vectorstore import get_aliased_vectorstore, set_watermark
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream support tickets into the vector store")
+    parser.add_argument("--persist-dir", default="./vectordb")
+    parser.add_argument("--collection", default="knowledge_base", help="Name (alias) of the collection")
+    parser.add_argument("--batch-size", type=int, default=500, help="Tickets per fetch/embed/upsert batch")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--embedding", choices=["chroma", "local"], default="chroma")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after about this many tickets")
+    parser.add_argument("--from-scratch", action="store_true", help="Ignore the watermark and re-ingest every ticket")
+    parser.add_argument("--progress-seconds", type=float, default=5.0)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+
+    collection = get_aliased_vectorstore(args.persist_dir, args.collection)
+    if args.from_scratch:
+        set_watermark(args.persist_dir, collection.name, SOURCE, 0)
+    embedder = EmbeddingService(model_type="local") if args.embedding == "local" else None
+
+    stats = None
+    reported = time.perf_counter()
+    for stats in stream_tickets(
+        get_db(),
+        collection,
+        args.persist_dir,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        embedder=embedder,
+        limit=args.limit,
+    ):
+        if time.perf_counter() - reported >= args.progress_seconds:
+            reported = time.perf_counter()
+            print(f"  {stats.tickets:>10,} tickets  {stats.chunks:>10,} chunks  "
+                  f"{stats.rows_per_second:>8,.0f} rows/s  watermark {stats.watermark}")
+
+    if stats is None:
+        print(f"No new tickets for {collection.name}")
+        return
+    print(f"\n{'='*50}")
+    print("Ticket ingestion complete!")
+    print(f"  Collection: {collection.name}")
+    print(f"  Tickets: {stats.tickets:,} ({stats.chunks:,} chunks) in {stats.seconds:.1f} s")
+    print(f"  Throughput: {stats.rows_per_second:,.0f} rows/s")
+    print(f"  Watermark: ticket_id {stats.watermark}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Create upcoming monthly partitions for orders and order_items.
+
+Only needed for the partitioned layout (db/schema_partitioned.sql). Run it
+daily from cron or a scheduler; it is idempotent and only creates missing
+partitions, so rows never fall through to the default partition.
+
+Usage:
+    python scripts/maintain_partitions.py
+    python scripts/maintain_partitions.py --months-ahead 6
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from sqlalchemy import create_engine, text
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.db import DatabaseConfig
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create future order partitions")
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=3,
+        help="Number of months beyond the current one to pre-create",
+    )
+    args = parser.parse_args()
+
+    engine = create_engine(DatabaseConfig().connection_url)
+    with engine.begin() as conn:
+        created = conn.execute(
+            text("SELECT create_future_partitions(:months)"), {"months": args.months_ahead}
+        ).scalar()
+        default_rows = conn.execute(
+            text("SELECT (SELECT count(*) FROM orders_default) + (SELECT count(*) FROM order_items_default)")
+        ).scalar()
+    engine.dispose()
+
+    print(f"Created {created} partitions")
+    if default_rows:
+        print(f"Warning: {default_rows} rows are in the default partitions; "
+              "create partitions for their months and move them out")
+
+
+if __name__ == "__main__":
+    main()
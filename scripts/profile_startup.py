@@ -0,0 +1,176 @@
+"""
+Profile API cold start: import time per module and time to first request.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+reports the slowest top-level packages and app modules, then starts the API
+under uvicorn and measures how long it takes to answer its first request
+(/health), to report ready (/ready, including the warm-up breakdown) and to
+serve a first /ask and /rag/search.
+
+With --max-import-ms / --max-ready-seconds it exits non-zero when a budget
+is exceeded, so it can run as a CI check against startup regressions.
+
+Usage:
+    python scripts/profile_startup.py
+    python scripts/profile_startup.py --runs 5 --max-import-ms 800 --max-ready-seconds 20
+    python scripts/profile_startup.py --skip-serve
+"""
+
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent.parent / "backend"
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def import_profile(module: str) -> list[tuple[str, int, int, int]]:
+    """Import module in a fresh interpreter; return (name, self_us, cumulative_us, depth) per module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            rows.append((name, int(own), int(cumulative), len(indent) // 2))
+    return rows
+
+
+def _request(url: str, payload: dict | None = None, timeout: float = 30.0) -> tuple[int, dict]:
+    data = json.dumps(payload).encode() if payload is not None else None
+    request = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status, json.loads(response.read() or b"{}")
+    except urllib.error.HTTPError as exc:
+        return exc.code, json.loads(exc.read() or b"{}")
+
+
+def _wait_for(predicate, timeout: float, interval: float = 0.02) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if predicate():
+                return True
+        except (urllib.error.URLError, ConnectionError, TimeoutError):
+            pass
+        time.sleep(interval)
+    return False
+
+
+def serve_profile(app: str, port: int, timeout: float, question: str) -> dict:
+    """Start uvicorn and time the first responses."""
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    timings: dict = {}
+    try:
+        if not _wait_for(lambda: _request(f"{base}/health", timeout=2)[0] == 200, timeout):
+            raise RuntimeError("server did not answer /health")
+        timings["first_response_s"] = time.perf_counter() - start
+
+        ready: dict = {}
+
+        def is_ready() -> bool:
+            status, body = _request(f"{base}/ready", timeout=2)
+            ready.update(body)
+            return status == 200
+
+        if _wait_for(is_ready, timeout, interval=0.05):
+            timings["ready_s"] = time.perf_counter() - start
+        timings["warmup_ms"] = ready.get("warmup_ms", {})
+        timings["ready_status"] = ready.get("status")
+
+        for name, path, payload in (
+            ("first_ask_ms", "/ask", {"query": "repeat_purchase_rate"}),
+            ("first_search_ms", "/rag/search", {"questions": [question], "score_threshold": 0}),
+        ):
+            request_start = time.perf_counter()
+            status, _ = _request(base + path, payload)
+            timings[name] = (time.perf_counter() - request_start) * 1000
+            timings[name.replace("_ms", "_status")] = status
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile API import time and time to first request")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--app", default="app.main:app")
+    parser.add_argument("--runs", type=int, default=3, help="Import runs; the median total is reported")
+    parser.add_argument("--top", type=int, default=12)
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--question", default="What is the return policy?")
+    parser.add_argument("--skip-serve", action="store_true", help="Only profile imports")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if importing the module takes longer")
+    parser.add_argument("--max-ready-seconds", type=float, help="Fail if /ready takes longer to turn 200")
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.runs)]
+    totals = [next(c for name, _, c, _ in rows if name == args.module) / 1000 for rows in profiles]
+    rows = profiles[totals.index(statistics.median_low(totals))]
+    import_ms = statistics.median_low(totals)
+
+    print(f"import {args.module}: {import_ms:.0f} ms (median of {args.runs}; runs {', '.join(f'{t:.0f}' for t in totals)})")
+    packages = sorted(
+        ((name, cumulative) for name, _, cumulative, _ in rows if "." not in name and name != args.module),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    print("\nSlowest top-level packages (cumulative ms):")
+    for name, cumulative in packages[:args.top]:
+        print(f"  {cumulative / 1000:>8.1f}  {name}")
+    app_modules = sorted(
+        ((name, own, cumulative) for name, own, cumulative, _ in rows if name.split(".")[0] == "app"),
+        key=lambda item: item[2],
+        reverse=True,
+    )
+    print("\napp modules (self / cumulative ms):")
+    for name, own, cumulative in app_modules[:args.top]:
+        print(f"  {own / 1000:>8.1f} {cumulative / 1000:>8.1f}  {name}")
+
+    failures = []
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms:.0f} ms > {args.max_import_ms:.0f} ms")
+
+    if not args.skip_serve:
+        timings = serve_profile(args.app, args.port, args.timeout, args.question)
+        print(f"\nuvicorn {args.app}:")
+        print(f"  first response (/health)  {timings['first_response_s']:>7.2f} s")
+        if "ready_s" in timings:
+            print(f"  ready (/ready = 200)      {timings['ready_s']:>7.2f} s")
+        else:
+            print(f"  not ready after {args.timeout:.0f} s (status {timings['ready_status']})")
+        for step, ms in timings["warmup_ms"].items():
+            print(f"    warm-up {step:<16} {ms:>7.0f} ms")
+        print(f"  first /ask                {timings['first_ask_ms']:>7.0f} ms (HTTP {timings['first_ask_status']})")
+        print(f"  first /rag/search         {timings['first_search_ms']:>7.0f} ms (HTTP {timings['first_search_status']})")
+        if args.max_ready_seconds is not None and timings.get("ready_s", float("inf")) > args.max_ready_seconds:
+            failures.append(f"ready took longer than {args.max_ready_seconds:.1f} s")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
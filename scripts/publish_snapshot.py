@@ -0,0 +1,38 @@
+"""
+Publish a memory-mapped snapshot of an existing vector store collection.
+
+Workers running with VECTORSTORE_BACKEND=mmap pick up the new version within
+a second, without a restart. Use ingest_docs.py --publish-snapshot to ingest
+and publish in one step.
+
+Usage:
+    python scripts/publish_snapshot.py
+    python scripts/publish_snapshot.py --persist-dir ./vectordb --snapshot-dir ./vectordb_snapshots --keep 3
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from app.rag.mmap_store import publish_snapshot
+from app.rag.vectorstore import get_aliased_vectorstore
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish a memory-mapped collection snapshot")
+    parser.add_argument("--persist-dir", default="./vectordb")
+    parser.add_argument("--collection", default="knowledge_base")
+    parser.add_argument("--snapshot-dir", default="./vectordb_snapshots")
+    parser.add_argument("--keep", type=int, default=2, help="Versions to retain, including the new one")
+    args = parser.parse_args()
+
+    collection = get_aliased_vectorstore(args.persist_dir, args.collection)
+    version = publish_snapshot(collection, args.snapshot_dir, keep=args.keep)
+    print(f"Published {collection.count()} documents as {version}")
+
+
+if __name__ == "__main__":
+    main()